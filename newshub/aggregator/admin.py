@@ -10,8 +10,9 @@ from datetime import timedelta
 
 from .models import (
     Article, Bookmark, TopicFollow, UserPreference, 
-    KeywordAlert, AlertClick, Notification, 
-    NotificationPreference, PushNotificationSubscription
+    KeywordAlert, AlertKeyword, AlertClick, Notification, 
+    NotificationPreference, PushNotificationSubscription, FetchState, FeedSource,
+    PollSchedule, WebSubSubscription
 )
 
 User = get_user_model()
@@ -140,11 +141,19 @@ class UserPreferenceAdmin(admin.ModelAdmin):
 @admin.register(KeywordAlert)
 class KeywordAlertAdmin(admin.ModelAdmin):
     """Admin configuration for the KeywordAlert model."""
-    list_display = ('user', 'keyword', 'created_at')
-    list_filter = ('created_at',)
+    list_display = ('user', 'keyword', 'is_active')
+    list_filter = ('is_active',)
     search_fields = ('user__username', 'keyword')
 
 
+@admin.register(AlertKeyword)
+class AlertKeywordAdmin(admin.ModelAdmin):
+    """Admin configuration for the AlertKeyword model."""
+    list_display = ('keyword', 'recent_hits', 'hits_updated_at', 'last_queried_at')
+    search_fields = ('keyword',)
+    readonly_fields = ('recent_hits', 'hits_updated_at', 'last_queried_at')
+
+
 @admin.register(AlertClick)
 class AlertClickAdmin(admin.ModelAdmin):
     """Admin configuration for the AlertClick model."""
@@ -157,6 +166,66 @@ class AlertClickAdmin(admin.ModelAdmin):
     article_title.short_description = 'Article'
 
 
+@admin.register(FetchState)
+class FetchStateAdmin(admin.ModelAdmin):
+    """Admin configuration for the FetchState model."""
+    list_display = ('endpoint', 'category', 'query', 'newest_published_at', 'updated_at')
+    list_filter = ('endpoint', 'category')
+    search_fields = ('query',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(FeedSource)
+class FeedSourceAdmin(admin.ModelAdmin):
+    """Admin configuration for the FeedSource model."""
+    list_display = ('name', 'category', 'is_active', 'newest_entry_at')
+    list_filter = ('is_active', 'category')
+    search_fields = ('name', 'url')
+    readonly_fields = ('etag', 'last_modified', 'newest_entry_at')
+    actions = ['subscribe_websub']
+    
+    def subscribe_websub(self, request, queryset):
+        """Subscribe to the WebSub hub of each selected feed that advertises one."""
+        from .websub import WebSubService
+        service = WebSubService()
+        subscribed = 0
+        for feed in queryset:
+            try:
+                if service.subscribe(feed):
+                    subscribed += 1
+            except Exception as e:
+                self.message_user(request, f"Could not subscribe to {feed.name}: {str(e)}", level='warning')
+        self.message_user(request, f"Sent {subscribed} WebSub subscription request(s).")
+    subscribe_websub.short_description = "Subscribe via WebSub (push)"
+
+
+@admin.register(PollSchedule)
+class PollScheduleAdmin(admin.ModelAdmin):
+    """Admin configuration for the PollSchedule model."""
+    list_display = ('kind', 'target', 'is_active', 'interval', 'new_items_ewma', 'next_poll_at',
+                    'last_new_items', 'consecutive_failures', 'lease_expires_at')
+    list_filter = ('kind', 'is_active')
+    search_fields = ('target', 'feed__name')
+    readonly_fields = ('new_items_ewma', 'last_polled_at', 'last_new_items', 'consecutive_failures',
+                       'lease_token', 'lease_expires_at')
+    actions = ['poll_now']
+    
+    def poll_now(self, request, queryset):
+        """Make the selected entries due on the next dispatcher tick."""
+        updated = queryset.update(next_poll_at=timezone.now())
+        self.message_user(request, f"{updated} poll(s) scheduled.")
+    poll_now.short_description = "Poll on the next dispatch"
+
+
+@admin.register(WebSubSubscription)
+class WebSubSubscriptionAdmin(admin.ModelAdmin):
+    """Admin configuration for the WebSubSubscription model."""
+    list_display = ('feed', 'hub_url', 'state', 'lease_expires_at', 'last_delivery_at')
+    list_filter = ('state',)
+    search_fields = ('feed__name', 'topic_url', 'hub_url')
+    readonly_fields = ('token', 'secret', 'requested_at', 'verified_at', 'last_delivery_at')
+
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     """Admin configuration for the Notification model."""
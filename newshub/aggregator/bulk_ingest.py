@@ -0,0 +1,275 @@
+"""
+Streaming NDJSON bulk article ingest.
+
+Records are read from the request body one line at a time, validated,
+deduplicated by canonical URL and persisted in fixed-size batches. A request
+of any size holds at most one batch in memory, and since the body is only
+read once the previous batch is committed, a client can send no faster than
+the database writes.
+"""
+
+import json
+import logging
+import time
+from datetime import timezone as dt_timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import metrics
+from .canonical import url_hash
+from .ingest import bulk_upsert_articles, existing_urls
+from .models import Article
+from .summarization import STATE_PLACEHOLDER, TIER_LEAD, lead_summary
+
+logger = logging.getLogger(__name__)
+
+STATUS_CREATED = 'created'
+STATUS_DUPLICATE = 'duplicate'
+STATUS_INVALID = 'invalid'
+STATUS_FAILED = 'failed'
+
+# Article.url and Article.image_url are URLFields with the default max_length
+MAX_URL_LENGTH = 200
+
+
+class RecordError(ValueError):
+    """Raised for an NDJSON line that is not a valid article record."""
+
+
+def iter_lines(stream, max_line_bytes: int) -> Iterator[Optional[bytes]]:
+    """
+    Read a stream line by line without ever holding more than one line.
+
+    Args:
+        stream: File-like object with readline(size), e.g. the HttpRequest
+        max_line_bytes: Longest line accepted
+
+    Yields:
+        Each line, or None in place of a line longer than max_line_bytes
+    """
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            # Drain the rest of the oversized line
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes + 1)
+            yield None
+            continue
+        yield line
+
+
+def _string(record: Dict, key: str, max_length: int = None, required: bool = False) -> str:
+    value = record.get(key)
+    if value is None:
+        value = ''
+    if not isinstance(value, str):
+        raise RecordError(f"'{key}' must be a string")
+    value = value.strip()
+    if required and not value:
+        raise RecordError(f"'{key}' is required")
+    return value[:max_length] if max_length else value
+
+
+def _url(value: str, key: str) -> str:
+    parts = urlsplit(value)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        raise RecordError(f"'{key}' must be an absolute http(s) URL")
+    if len(value) > MAX_URL_LENGTH:
+        raise RecordError(f"'{key}' is longer than {MAX_URL_LENGTH} characters")
+    return value
+
+
+def validate_record(line: bytes) -> Dict:
+    """
+    Parse and validate one NDJSON line into a NewsAPI-shaped article dict.
+
+    Records use NewsAPI's article shape: url, title and source (a name or a
+    {"name": ...} object) are required; publishedAt defaults to now and an
+    optional category is kept as given.
+
+    Args:
+        line: Raw line of the request body
+
+    Returns:
+        Article dict in the shape returned by NewsAPIService
+
+    Raises:
+        RecordError: If the line is not a valid record
+    """
+    try:
+        record = json.loads(line)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise RecordError(f"Invalid JSON: {str(e)}")
+    if not isinstance(record, dict):
+        raise RecordError("Record must be a JSON object")
+
+    source = record.get('source')
+    if isinstance(source, dict):
+        source = source.get('name')
+    if not isinstance(source, str) or not source.strip():
+        raise RecordError("'source' is required")
+
+    published_at = timezone.now()
+    if record.get('publishedAt'):
+        try:
+            published_at = parse_datetime(_string(record, 'publishedAt'))
+        except ValueError:
+            published_at = None
+        if published_at is None:
+            raise RecordError("'publishedAt' must be an ISO 8601 datetime")
+        if timezone.is_naive(published_at):
+            published_at = published_at.replace(tzinfo=dt_timezone.utc)
+
+    image = _string(record, 'urlToImage')
+    return {
+        'source': {'id': None, 'name': source.strip()[:100]},
+        'title': _string(record, 'title', max_length=300, required=True),
+        'url': _url(_string(record, 'url', required=True), 'url'),
+        'description': _string(record, 'description'),
+        'content': _string(record, 'content'),
+        'urlToImage': _url(image, 'urlToImage') if image else None,
+        'publishedAt': published_at,
+        'category': _string(record, 'category', max_length=50),
+    }
+
+
+class BulkIngestor:
+    """
+    Ingests a stream of NDJSON article records in fixed-size batches.
+
+    Articles are stored with the category they were sent with, a lead
+    summary and blank model versions, so the request path never runs model
+    inference. `reprocess_articles` classifies and summarizes them later, or,
+    with enrichment, each batch's new articles are handed to
+    enrich_articles_task on the enrich queue.
+    """
+
+    def __init__(self, batch_size: int = None, enrich: bool = False, max_records: int = None):
+        """
+        Initialize the ingestor.
+
+        Args:
+            batch_size: Records per batch (defaults to settings.INGEST_API_BATCH_SIZE)
+            enrich: Queue NLP enrichment and summarization of the stored articles
+            max_records: Records accepted per stream (defaults to settings.INGEST_API_MAX_RECORDS)
+        """
+        self.batch_size = batch_size or getattr(settings, 'INGEST_API_BATCH_SIZE', 500)
+        self.max_records = max_records or getattr(settings, 'INGEST_API_MAX_RECORDS', 100000)
+        self.enrich = enrich
+        self.stats = {STATUS_CREATED: 0, STATUS_DUPLICATE: 0, STATUS_INVALID: 0, STATUS_FAILED: 0}
+        self.truncated = False
+
+    def ingest(self, lines: Iterable[Optional[bytes]]) -> Iterator[Dict]:
+        """
+        Ingest records, yielding one result per non-blank line in input order.
+
+        Results of a batch are yielded once it is committed, and the next
+        line is only read after that, so callers streaming the results back
+        apply backpressure to the sender.
+
+        Args:
+            lines: Raw lines, as produced by iter_lines (None for oversized lines)
+
+        Yields:
+            Dicts with 'line' and 'status' keys, plus 'id' for created
+            articles and 'error' for invalid or failed ones
+        """
+        # Each entry is (line number, url hash, article dict) or (line number, result)
+        pending = []
+        batch_records = 0
+        seen = set()
+        accepted = 0
+
+        for line_number, line in enumerate(lines, start=1):
+            if line is not None and not line.strip():
+                continue
+            if accepted >= self.max_records:
+                self.truncated = True
+                break
+
+            accepted += 1
+            try:
+                if line is None:
+                    raise RecordError("Line too long")
+                article = validate_record(line)
+            except RecordError as e:
+                pending.append((line_number, {'line': line_number, 'status': STATUS_INVALID, 'error': str(e)}))
+                continue
+
+            digest = url_hash(article['url'])
+            if digest in seen:
+                pending.append((line_number, {'line': line_number, 'status': STATUS_DUPLICATE}))
+                continue
+            seen.add(digest)
+            pending.append((line_number, digest, article))
+            batch_records += 1
+
+            if batch_records >= self.batch_size:
+                yield from self._flush(pending)
+                pending, batch_records = [], 0
+
+        yield from self._flush(pending)
+
+    def _flush(self, pending: List) -> Iterator[Dict]:
+        if not pending:
+            return
+        records = [entry for entry in pending if len(entry) == 3]
+        outcomes = {}
+        if records:
+            started = time.monotonic()
+            try:
+                outcomes = self._persist(records)
+            except Exception as e:
+                logger.error(f"Bulk ingest batch of {len(records)} records failed: {str(e)}", exc_info=True)
+                outcomes = {line_number: {'status': STATUS_FAILED, 'error': 'Could not store batch'}
+                            for line_number, _, _ in records}
+            metrics.observe('bulk_ingest.batch', time.monotonic() - started)
+
+        for entry in pending:
+            line_number = entry[0]
+            result = entry[1] if len(entry) == 2 else {'line': line_number, **outcomes[line_number]}
+            self.stats[result['status']] += 1
+            metrics.incr(f"bulk_ingest.{result['status']}")
+            yield result
+
+    def _persist(self, records: List) -> Dict[int, Dict]:
+        """Store one batch and return each record's outcome by line number."""
+        from .tasks import check_keyword_matches_batch, enrich_articles_task
+
+        known = existing_urls(article['url'] for _, _, article in records)
+        rows = [
+            Article(
+                title=article['title'],
+                url=article['url'],
+                url_hash=digest,
+                source=article['source']['name'],
+                published_at=article['publishedAt'],
+                content=article['content'],
+                summary=lead_summary(article['content'], article['description']),
+                summary_tier=TIER_LEAD,
+                summary_state=STATE_PLACEHOLDER,
+                category=article['category'] or 'general',
+                image_url=article['urlToImage'],
+            )
+            for _, digest, article in records if article['url'] not in known
+        ]
+
+        created = bulk_upsert_articles(rows, batch_size=self.batch_size)
+        if created:
+            if self.enrich:
+                enrich_articles_task.delay(list(created.values()))
+            check_keyword_matches_batch.delay(list(created.values()))
+
+        outcomes = {}
+        for line_number, _, article in records:
+            if article['url'] in created:
+                outcomes[line_number] = {'status': STATUS_CREATED, 'id': created[article['url']]}
+            else:
+                outcomes[line_number] = {'status': STATUS_DUPLICATE}
+        return outcomes
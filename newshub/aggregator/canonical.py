@@ -0,0 +1,64 @@
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', 'ref_url', 'cmpid', 'ito', 'ncid', 'sr_share', 'smid',
+    'amp', 'outputtype',
+}
+TRACKING_PREFIXES = ('utm_', 'at_', 'pk_', '__twitter')
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+AMP_PATH = re.compile(r'/amp(?:\.html)?/?$', re.IGNORECASE)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL so tracking and AMP variants of one link compare equal.
+
+    Lowercases the scheme and host, drops default ports, fragments, tracking
+    query parameters and AMP suffixes, sorts the remaining query parameters
+    and removes trailing slashes.
+
+    Args:
+        url: Article URL
+
+    Returns:
+        Canonical URL
+    """
+    url = (url or '').strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower() or 'http'
+
+    host = (parts.hostname or '').lower()
+    if host.startswith('amp.'):
+        host = host[len('amp.'):]
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = AMP_PATH.sub('', parts.path) or '/'
+    path = re.sub(r'/{2,}', '/', path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PREFIXES)
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def url_hash(url: str) -> str:
+    """
+    Fixed-width key of a URL's canonical form, stored in Article.url_hash.
+
+    Args:
+        url: Article URL (canonicalized first)
+
+    Returns:
+        64-character hex SHA-256 digest
+    """
+    return hashlib.sha256(canonicalize_url(url).encode('utf-8')).hexdigest()
@@ -0,0 +1,141 @@
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+
+from .http_client import CircuitOpenError, get_session
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ArticleDownloader:
+    """
+    Downloads article pages concurrently.
+
+    Concurrency is bounded globally by the thread pool and per host by a
+    semaphore, so one slow publisher cannot take every slot. Connections are
+    reused through the shared publishers session from `http_client`, every
+    request has a timeout, and transient failures are retried with exponential
+    backoff.
+    """
+
+    def __init__(self, max_workers: int = None, per_host: int = None, timeout: float = None,
+                 retries: int = None, backoff: float = None, session: requests.Session = None):
+        """
+        Initialize the downloader.
+
+        Args:
+            max_workers: Global number of concurrent downloads (defaults to settings.ARTICLE_DOWNLOAD_WORKERS)
+            per_host: Concurrent downloads per host (defaults to settings.ARTICLE_DOWNLOAD_PER_HOST)
+            timeout: Per-request timeout in seconds (defaults to settings.ARTICLE_DOWNLOAD_TIMEOUT)
+            retries: Retries after the first attempt (defaults to settings.ARTICLE_DOWNLOAD_RETRIES)
+            backoff: Base backoff in seconds, doubled on each retry (defaults to settings.ARTICLE_DOWNLOAD_BACKOFF)
+            session: Session to use instead of the shared publishers session
+        """
+        self.max_workers = max_workers or getattr(settings, 'ARTICLE_DOWNLOAD_WORKERS', 16)
+        self.per_host = per_host or getattr(settings, 'ARTICLE_DOWNLOAD_PER_HOST', 4)
+        self.timeout = timeout or getattr(settings, 'ARTICLE_DOWNLOAD_TIMEOUT', 10)
+        self.retries = retries if retries is not None else getattr(settings, 'ARTICLE_DOWNLOAD_RETRIES', 2)
+        self.backoff = backoff if backoff is not None else getattr(settings, 'ARTICLE_DOWNLOAD_BACKOFF', 0.5)
+        self.session = session or get_session('publishers')
+
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_lock = threading.Lock()
+        self.stats = {'downloaded': 0, 'failed': 0, 'retries': 0, 'elapsed': 0.0}
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def download(self, url: str) -> str:
+        """
+        Download a single page, retrying transient failures.
+
+        Args:
+            url: Page URL
+
+        Returns:
+            Page HTML
+
+        Raises:
+            requests.exceptions.RequestException: If every attempt failed
+        """
+        with self._host_slot(url):
+            for attempt in range(self.retries + 1):
+                try:
+                    response = self.session.get(url, timeout=self.timeout)
+                    if response.status_code in RETRY_STATUS_CODES and attempt < self.retries:
+                        self._sleep_before_retry(attempt, response.headers.get('Retry-After'))
+                        continue
+                    response.raise_for_status()
+                    return response.text
+                except CircuitOpenError:
+                    raise
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if attempt >= self.retries:
+                        raise
+                    self._sleep_before_retry(attempt)
+        raise requests.exceptions.RetryError(f"Giving up on {url}")
+
+    def _sleep_before_retry(self, attempt: int, retry_after: str = None):
+        with self._host_lock:
+            self.stats['retries'] += 1
+        delay = self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+
+    @staticmethod
+    def _interleave_hosts(urls: Iterable[str]) -> List[str]:
+        """Order URLs round-robin by host so no host monopolises the workers."""
+        by_host = OrderedDict()
+        for url in urls:
+            by_host.setdefault(urlsplit(url).netloc.lower(), []).append(url)
+        ordered = []
+        while by_host:
+            for host in list(by_host):
+                ordered.append(by_host[host].pop(0))
+                if not by_host[host]:
+                    del by_host[host]
+        return ordered
+
+    def iter_downloads(self, urls: Iterable[str]) -> Iterator[Tuple[str, Optional[str], Optional[Exception]]]:
+        """
+        Download pages concurrently, yielding each one as soon as it arrives.
+
+        Args:
+            urls: Page URLs (duplicates are downloaded once)
+
+        Yields:
+            Tuples of (url, html, error); html is None when error is set
+        """
+        started = time.monotonic()
+        unique_urls = self._interleave_hosts(OrderedDict.fromkeys(urls))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='download') as pool:
+            futures = {pool.submit(self.download, url): url for url in unique_urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    html = future.result()
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    logger.warning(f"Failed to download {url}: {str(e)}")
+                    yield url, None, e
+                else:
+                    self.stats['downloaded'] += 1
+                    yield url, html, None
+
+        self.stats['elapsed'] = round(time.monotonic() - started, 2)
@@ -0,0 +1,235 @@
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from newspaper import Article as NewsArticle
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionTimeout(Exception):
+    """Raised when a document takes longer than the per-document timeout to extract."""
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+
+def extract_html(url: str, html: str, timeout: float = None) -> Dict:
+    """
+    Extract text, top image and metadata from raw article HTML.
+
+    Runs inside an extraction worker process. On platforms with SIGALRM the
+    parse is interrupted after `timeout` seconds.
+
+    Args:
+        url: Article URL
+        html: Raw page HTML
+        timeout: Per-document timeout in seconds
+
+    Returns:
+        Dictionary of extracted fields
+    """
+    use_alarm = timeout and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        news_article = NewsArticle(url)
+        news_article.download(input_html=html)
+        news_article.parse()
+        return {
+            'text': news_article.text,
+            'title': news_article.title,
+            'top_image': news_article.top_image,
+            'authors': news_article.authors,
+            'publish_date': news_article.publish_date.isoformat() if news_article.publish_date else None,
+            'meta_description': news_article.meta_description,
+            'meta_keywords': news_article.meta_keywords,
+        }
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_chunk(documents: List[Tuple[str, str]], timeout: float) -> List[Tuple[str, Optional[Dict], Optional[str]]]:
+    """Extract a chunk of documents in one worker task."""
+    results = []
+    for url, html in documents:
+        try:
+            results.append((url, extract_html(url, html, timeout), None))
+        except ExtractionTimeout:
+            results.append((url, None, f"extraction timed out after {timeout}s"))
+        except Exception as e:
+            results.append((url, None, str(e)))
+    return results
+
+
+class ExtractionStage:
+    """
+    Pipeline stage that extracts article content on a process pool.
+
+    Documents are submitted in chunks to amortise inter-process overhead, with
+    at most one chunk per worker in flight so memory stays flat however many
+    documents stream in. Each document has a soft timeout enforced inside the
+    worker; a chunk that overruns its hard deadline has its worker processes
+    killed and the pool restarted, so one pathological page cannot hang a run.
+
+    Workers are spawned rather than forked (settings.EXTRACTION_START_METHOD),
+    so they start without the parent's loaded NLP model or its threads, and
+    the parent's database connections are closed before the pool starts.
+    """
+
+    def __init__(self, max_workers: int = None, chunk_size: int = None, timeout: float = None):
+        """
+        Initialize the extraction stage.
+
+        Args:
+            max_workers: Number of worker processes (defaults to settings.EXTRACTION_WORKERS)
+            chunk_size: Documents per worker task (defaults to settings.EXTRACTION_CHUNK_SIZE)
+            timeout: Per-document timeout in seconds (defaults to settings.EXTRACTION_TIMEOUT)
+        """
+        self.max_workers = max_workers or getattr(settings, 'EXTRACTION_WORKERS', None) or os.cpu_count() or 1
+        self.chunk_size = chunk_size or getattr(settings, 'EXTRACTION_CHUNK_SIZE', 4)
+        self.timeout = timeout or getattr(settings, 'EXTRACTION_TIMEOUT', 20)
+        self._pool = None
+        self.stats = {'extracted': 0, 'failed': 0, 'killed': 0, 'elapsed': 0.0}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        if self._pool is None:
+            # Django reconnects on the next query; no worker may share these sockets
+            connections.close_all()
+            context = multiprocessing.get_context(getattr(settings, 'EXTRACTION_START_METHOD', 'spawn'))
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _restart_pool(self):
+        """Kill every worker process and start a fresh pool."""
+        pool, self._pool = self._pool, None
+        for process in list(getattr(pool, '_processes', {}).values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    @property
+    def items_per_second(self) -> float:
+        processed = self.stats['extracted'] + self.stats['failed']
+        return processed / self.stats['elapsed'] if self.stats['elapsed'] else 0.0
+
+    def get_stats(self) -> Dict:
+        """
+        Get throughput statistics, used to size the pool to the node's cores.
+
+        Returns:
+            Dictionary of stage statistics
+        """
+        return {
+            **self.stats,
+            'workers': self.max_workers,
+            'items_per_second': round(self.items_per_second, 2),
+        }
+
+    def _submit(self, in_flight: Dict, chunk: List[Tuple[str, str]]):
+        future = self._pool.submit(_extract_chunk, chunk, self.timeout)
+        # Hard deadline: every document may use its soft timeout, plus some slack
+        in_flight[future] = (chunk, time.monotonic() + self.timeout * len(chunk) + 5)
+
+    def _fill(self, in_flight: Dict, documents: Iterator[Tuple[str, str]]) -> bool:
+        """
+        Submit chunks until every worker has one.
+
+        One chunk per worker, so a chunk's deadline starts when it actually
+        starts running.
+
+        Returns:
+            False once the documents are exhausted
+        """
+        while len(in_flight) < self.max_workers:
+            chunk = list(islice(documents, self.chunk_size))
+            if not chunk:
+                return False
+            self._submit(in_flight, chunk)
+        return True
+
+    def _collect(self, in_flight: Dict, done) -> Iterator[Tuple[str, Optional[Dict], Optional[str]]]:
+        """Yield the results of finished chunks."""
+        for future in done:
+            chunk, _ = in_flight.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:
+                results = [(url, None, str(e)) for url, _ in chunk]
+            for url, fields, error in results:
+                self.stats['failed' if error else 'extracted'] += 1
+                yield url, fields, error
+
+    def _kill_overdue(self, in_flight: Dict) -> Iterator[Tuple[str, None, str]]:
+        """Fail the chunks past their hard deadline, restart the pool and resubmit the rest."""
+        now = time.monotonic()
+        overdue = [future for future, (_, deadline) in in_flight.items() if deadline <= now]
+        if not overdue:
+            return
+        survivors = [chunk for future, (chunk, _) in in_flight.items() if future not in overdue]
+        for future in overdue:
+            chunk, _ = in_flight[future]
+            for url, _ in chunk:
+                logger.warning(f"Killing extraction of {url}: exceeded hard deadline")
+                self.stats['killed'] += 1
+                self.stats['failed'] += 1
+                yield url, None, "extraction killed after hard deadline"
+        in_flight.clear()
+        self._restart_pool()
+        for chunk in survivors:
+            self._submit(in_flight, chunk)
+
+    def iter_extract(self, documents: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, Optional[Dict], Optional[str]]]:
+        """
+        Extract documents as they stream in, yielding results as chunks finish.
+
+        Args:
+            documents: Iterable of (url, html) tuples
+
+        Yields:
+            Tuples of (url, extracted fields, error); fields are None when error is set
+        """
+        self.start()
+        started = time.monotonic()
+        documents = iter(documents)
+        in_flight = {}
+        pending = True
+
+        while True:
+            pending = pending and self._fill(in_flight, documents)
+            if not in_flight:
+                break
+
+            next_deadline = min(deadline for _, deadline in in_flight.values())
+            done, _ = wait(in_flight, timeout=max(next_deadline - time.monotonic(), 0),
+                           return_when=FIRST_COMPLETED)
+            yield from self._collect(in_flight, done)
+            self.stats['elapsed'] = round(time.monotonic() - started, 2)
+
+            if not done:
+                # Nothing finished before the earliest hard deadline: kill the workers
+                yield from self._kill_overdue(in_flight)
+
+        self.stats['elapsed'] = round(time.monotonic() - started, 2)
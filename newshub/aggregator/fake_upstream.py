@@ -0,0 +1,423 @@
+"""
+Local stand-in for NewsAPI and the publisher sites it links to.
+
+FakeUpstream serves recorded NewsAPI /v2/top-headlines, /v2/everything and
+/v2/sources responses (aggregator/testdata/newsapi/) plus one HTML page per
+article, on a loopback port. Article URLs in the responses point back at the
+server, so NewsAPIService, the downloader and the fetch_articles command run
+against it unchanged once settings.NEWS_API_BASE_URL points at it.
+
+Latency, 5xx errors and 429s are injected per upstream from a seeded random
+generator, so a benchmark scenario behaves the same on every run. The server
+runs in a background thread (tests, `benchmark_ingest`) or in the foreground
+on a fixed port (`run_fake_upstream`).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from html import escape
+from statistics import median
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+from .canonical import url_hash
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'testdata', 'newsapi')
+
+UPSTREAM_NEWSAPI = 'newsapi'
+UPSTREAM_PUBLISHERS = 'publishers'
+
+# Standard benchmark suite: (description, FakeUpstream keyword arguments)
+BENCHMARK_SCENARIOS = {
+    'baseline': ('No injected faults', {}),
+    'slow-newsapi': ('NewsAPI answers in 200-300ms', {
+        'newsapi': {'latency': 0.2, 'jitter': 0.1},
+    }),
+    'slow-publishers': ('Article pages take 100-500ms', {
+        'publishers': {'latency': 0.1, 'jitter': 0.4},
+    }),
+    'flaky-publishers': ('10% of article pages fail with a 503', {
+        'publishers': {'latency': 0.02, 'error_rate': 0.1},
+    }),
+    'rate-limited': ('20% of NewsAPI requests get a 429', {
+        'newsapi': {'rate_limit_rate': 0.2, 'retry_after': 1},
+        'publishers': {'rate_limit_rate': 0.05, 'retry_after': 1},
+    }),
+    'degraded': ('Slow, flaky and rate-limited everywhere', {
+        'newsapi': {'latency': 0.1, 'jitter': 0.1, 'error_rate': 0.05, 'rate_limit_rate': 0.05},
+        'publishers': {'latency': 0.1, 'jitter': 0.3, 'error_rate': 0.05, 'rate_limit_rate': 0.05},
+    }),
+}
+
+
+@dataclass
+class FaultProfile:
+    """
+    Faults injected into one upstream's responses.
+
+    Attributes:
+        latency: Seconds added to every response
+        jitter: Up to this many further seconds, drawn uniformly
+        error_rate: Share of requests answered with a 503
+        rate_limit_rate: Share of requests answered with a 429
+        retry_after: Retry-After sent with each 429, in seconds
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+
+
+class UnthrottledRateLimiter:
+    """Drop-in for NewsAPIRateLimiter that never waits, for benchmarks without Redis."""
+
+    def acquire(self, priority: str = None, timeout: float = None):
+        pass
+
+    def record_retry_after(self, retry_after: str = None):
+        pass
+
+
+def load_fixture(name: str, fixtures_dir: str = None) -> Dict:
+    """
+    Load a recorded NewsAPI response.
+
+    Args:
+        name: Endpoint name, e.g. 'top-headlines'
+        fixtures_dir: Directory of recorded responses (defaults to FIXTURES_DIR)
+
+    Returns:
+        dict: The parsed response
+    """
+    with open(os.path.join(fixtures_dir or FIXTURES_DIR, f"{name}.json"), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def render_article_page(article: Dict) -> str:
+    """Render a publisher-style HTML page for an article."""
+    paragraphs = [article.get('description') or '']
+    content = (article.get('content') or '').split(' [+')[0]
+    paragraphs += [content] * 6
+    body = '\n'.join(f"<p>{escape(text)}</p>" for text in paragraphs if text)
+    title = escape(article.get('title') or '')
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>{title}</title>"
+        f'<meta property="og:title" content="{title}">'
+        "</head><body><header><nav>Home | World | Business</nav></header>"
+        f"<article><h1>{title}</h1>{body}</article>"
+        "<footer>Copyright Fake Publisher</footer></body></html>"
+    )
+
+
+class FakeUpstream:
+    """
+    Threaded HTTP server imitating NewsAPI and publisher sites.
+
+    Use as a context manager to serve from a background thread:
+
+        with FakeUpstream(articles=500) as upstream:
+            NewsAPIService(base_url=upstream.newsapi_url, ...)
+    """
+
+    def __init__(self, articles: int = 0, newsapi: FaultProfile = None, publishers: FaultProfile = None,
+                 seed: int = 0, host: str = '127.0.0.1', port: int = 0, fixtures_dir: str = None):
+        """
+        Initialize the server (it starts listening at once, on an ephemeral port by default).
+
+        Args:
+            articles: Total articles to serve; recorded ones are topped up with
+                synthetic articles up to this count (0 serves the recordings only)
+            newsapi: Faults for the NewsAPI endpoints
+            publishers: Faults for the article pages
+            seed: Seed for the synthetic articles and the fault generator
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one)
+            fixtures_dir: Directory of recorded responses (defaults to FIXTURES_DIR)
+        """
+        self.faults = {
+            UPSTREAM_NEWSAPI: newsapi or FaultProfile(),
+            UPSTREAM_PUBLISHERS: publishers or FaultProfile(),
+        }
+        self.seed = seed
+        self.stats = Counter()
+        self._attempts = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+
+        self.sources = load_fixture('sources', fixtures_dir)
+        self.articles = self._build_articles(load_fixture('top-headlines', fixtures_dir)['articles'],
+                                             load_fixture('everything', fixtures_dir)['articles'],
+                                             articles, seed)
+        self.pages = {article['url'].rsplit('/', 1)[-1]: article for article in self.articles}
+
+    @property
+    def newsapi_url(self) -> str:
+        """Value for settings.NEWS_API_BASE_URL."""
+        return f"{self.base_url}/v2"
+
+    def _build_articles(self, headlines: List[Dict], everything: List[Dict], count: int, seed: int) -> List[Dict]:
+        pool = list({article['url']: article for article in headlines + everything}.values())
+        if count > len(pool):
+            from .replay import synthetic_articles
+            pool += synthetic_articles(count - len(pool), seed=seed, duplicate_rate=0)
+        articles = []
+        for article in pool:
+            # Publishers are all served by this server; the slug keeps URLs stable across runs
+            slug = url_hash(article['url'])[:16]
+            articles.append({**article, 'url': f"{self.base_url}/articles/{slug}"})
+        articles.sort(key=lambda article: article['publishedAt'], reverse=True)
+        return articles
+
+    def _draw_fault(self, upstream: str, path: str):
+        """
+        Pick a request's delay and forced status (None for a normal response).
+
+        The draw depends only on the seed, the path and how often that path
+        was requested before, so concurrent clients see the same faults on
+        every run whatever order their requests arrive in.
+        """
+        profile = self.faults[upstream]
+        with self._lock:
+            attempt = self._attempts[path]
+            self._attempts[path] += 1
+        rng = random.Random(f"{self.seed}:{path}:{attempt}")
+        delay = profile.latency + (rng.uniform(0, profile.jitter) if profile.jitter else 0.0)
+        roll = rng.random()
+        if roll < profile.rate_limit_rate:
+            return delay, 429
+        if roll < profile.rate_limit_rate + profile.error_rate:
+            return delay, 503
+        return delay, None
+
+    def _record(self, upstream: str, status: int):
+        with self._lock:
+            self.stats[f"{upstream}.{status}"] += 1
+            self.stats[f"{upstream}.requests"] += 1
+
+    def _newsapi(self, endpoint: str, params: Dict[str, str]):
+        """Build a NewsAPI response for an endpoint, or (404, error)."""
+        if endpoint == 'sources':
+            return 200, self.sources
+        if endpoint not in ('top-headlines', 'everything'):
+            return 404, {'status': 'error', 'code': 'notFound', 'message': f"Unknown endpoint {endpoint}"}
+        if not params.get('apiKey'):
+            return 401, {'status': 'error', 'code': 'apiKeyMissing', 'message': 'Your API key is missing.'}
+
+        articles = self.articles
+        query = params.get('q', '').lower()
+        if query:
+            articles = [article for article in articles
+                        if query in f"{article['title']} {article.get('description') or ''}".lower()]
+        if params.get('from'):
+            articles = [article for article in articles if article['publishedAt'] >= params['from']]
+
+        try:
+            page_size = min(max(int(params.get('pageSize', 20)), 1), 100)
+            page = max(int(params.get('page', 1)), 1)
+        except ValueError:
+            return 400, {'status': 'error', 'code': 'parameterInvalid', 'message': 'Invalid paging parameters'}
+        start = (page - 1) * page_size
+        return 200, {'status': 'ok', 'totalResults': len(articles), 'articles': articles[start:start + page_size]}
+
+    def _handler_class(self):
+        upstream_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug(f"Fake upstream: {format % args}")
+
+            def _send(self, status: int, body: bytes, content_type: str, headers: Dict = None):
+                # Counted before the body goes out, so stats are current once a client has its response
+                if self.upstream:
+                    upstream_server._record(self.upstream, status)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path.startswith('/v2/'):
+                    upstream = UPSTREAM_NEWSAPI
+                elif parts.path.startswith('/articles/'):
+                    upstream = UPSTREAM_PUBLISHERS
+                else:
+                    self.upstream = None
+                    self._send(404, b'Not found', 'text/plain')
+                    return
+                self.upstream = upstream
+
+                delay, forced_status = upstream_server._draw_fault(upstream, self.path)
+                if delay:
+                    time.sleep(delay)
+                if forced_status == 429:
+                    retry_after = upstream_server.faults[upstream].retry_after
+                    body = json.dumps({'status': 'error', 'code': 'rateLimited',
+                                       'message': 'You have made too many requests recently.'}).encode()
+                    self._send(429, body, 'application/json', {'Retry-After': str(retry_after)})
+                elif forced_status:
+                    self._send(forced_status, b'Service unavailable', 'text/plain')
+                elif upstream == UPSTREAM_NEWSAPI:
+                    params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+                    status, payload = upstream_server._newsapi(parts.path[len('/v2/'):].strip('/'), params)
+                    body = json.dumps(payload).encode()
+                    etag = f'"{hashlib.md5(body).hexdigest()}"'
+                    if status == 200 and self.headers.get('If-None-Match') == etag:
+                        status, body = 304, b''
+                    self._send(status, body, 'application/json', {'ETag': etag} if status in (200, 304) else None)
+                else:
+                    article = upstream_server.pages.get(parts.path.rsplit('/', 1)[-1])
+                    if article is None:
+                        self._send(404, b'Not found', 'text/plain')
+                    else:
+                        self._send(200, render_article_page(article).encode('utf-8'), 'text/html; charset=utf-8')
+
+            do_HEAD = do_GET
+
+        return Handler
+
+    def start(self) -> 'FakeUpstream':
+        """Serve requests from a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-upstream', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve requests in the calling thread until interrupted."""
+        self.server.serve_forever()
+
+    def stop(self):
+        """Stop serving and release the port."""
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server.server_close()
+
+    def reset_stats(self):
+        """Forget request counts, so faults repeat as on a fresh server."""
+        with self._lock:
+            self.stats.clear()
+            self._attempts.clear()
+
+    def __enter__(self) -> 'FakeUpstream':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def scenario_upstream(name: str, articles: int = 500, seed: int = 0) -> FakeUpstream:
+    """
+    Build the fake upstream for a benchmark scenario.
+
+    Args:
+        name: Key of BENCHMARK_SCENARIOS
+        articles: Articles to serve
+        seed: Seed for articles and faults
+
+    Returns:
+        FakeUpstream, not yet started
+    """
+    _, config = BENCHMARK_SCENARIOS[name]
+    return FakeUpstream(
+        articles=articles,
+        newsapi=FaultProfile(**config.get(UPSTREAM_NEWSAPI, {})),
+        publishers=FaultProfile(**config.get(UPSTREAM_PUBLISHERS, {})),
+        seed=seed,
+    )
+
+
+def benchmark_client(upstream: FakeUpstream, page_size: int = 100) -> Dict:
+    """
+    Page through top headlines with NewsAPIService against a fake upstream.
+
+    Uses a fresh session (so circuit breakers start closed), no response
+    cache and no rate limiter, so only the client and the upstream are timed.
+
+    Returns:
+        dict: Requests, articles, elapsed seconds and throughput
+    """
+    from .http_client import build_session
+    from .services import NewsAPIService
+
+    service = NewsAPIService(api_key='benchmark', base_url=upstream.newsapi_url,
+                             session=build_session(UPSTREAM_NEWSAPI),
+                             rate_limiter=UnthrottledRateLimiter(), use_cache=False)
+    max_pages = max(-(-len(upstream.articles) // page_size), 1)
+    started = time.monotonic()
+    fetched = sum(len(page) for page in service.iter_pages(category='general', page_size=page_size,
+                                                          max_pages=max_pages))
+    elapsed = time.monotonic() - started
+    return {
+        'articles': fetched,
+        'expected': len(upstream.articles),
+        'elapsed_s': round(elapsed, 3),
+        'articles_per_s': round(fetched / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def benchmark_downloader(upstream: FakeUpstream, limit: int = None, backoff: float = 0.05) -> Dict:
+    """
+    Download article pages from a fake upstream with ArticleDownloader.
+
+    Args:
+        upstream: Running fake upstream
+        limit: Download at most this many pages
+        backoff: Retry backoff base, kept short so retries do not dominate the run
+
+    Returns:
+        dict: Download counts, elapsed seconds and throughput
+    """
+    from .downloader import ArticleDownloader
+    from .http_client import build_session
+
+    urls = [article['url'] for article in upstream.articles[:limit]]
+    downloader = ArticleDownloader(session=build_session(UPSTREAM_PUBLISHERS), backoff=backoff)
+    started = time.monotonic()
+    for _ in downloader.iter_downloads(urls):
+        pass
+    elapsed = time.monotonic() - started
+    return {
+        'downloaded': downloader.stats['downloaded'],
+        'failed': downloader.stats['failed'],
+        'retries': downloader.stats['retries'],
+        'elapsed_s': round(elapsed, 3),
+        'pages_per_s': round(downloader.stats['downloaded'] / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def median_report(runs: List[Dict]) -> Dict:
+    """Combine repeated runs of a benchmark into per-metric medians."""
+    combined = {}
+    for key in dict.fromkeys(key for run in runs for key in run):
+        values = [run[key] for run in runs if key in run]
+        if isinstance(values[0], dict):
+            combined[key] = median_report(values)
+        elif isinstance(values[0], (int, float)):
+            combined[key] = round(median(run.get(key, 0) for run in runs), 3)
+        else:
+            combined[key] = values[0]
+    return combined
@@ -0,0 +1,271 @@
+"""
+Archive of downloaded article HTML.
+
+Pages are compressed one zstd frame each and appended to numbered segment
+files; the ArchivedPage table maps a URL hash to its node, segment, offset
+and length, so a page is read back with one seek and one small
+decompression. A segment that reaches HTML_ARCHIVE_SEGMENT_BYTES is closed
+and a new one started, and whole segments are dropped, oldest first, once
+the archive outgrows HTML_ARCHIVE_MAX_BYTES.
+
+Segment numbers only count up within one directory, while the index is
+shared by every worker, so each node (HTML_ARCHIVE_NODE) appends under its
+own subdirectory and its rows carry the node name. A node reads another's
+pages only where HTML_ARCHIVE_DIR is shared storage; elsewhere they are
+simply missing.
+"""
+
+import logging
+import os
+import re
+import socket
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+import zstandard
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+from .canonical import url_hash
+from .models import ArchivedPage
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = re.compile(r'^segment-(\d{6})\.zst$')
+UNSAFE_NODE_CHARS = re.compile(r'[^\w.-]')
+
+_process_lock = threading.Lock()
+
+
+class HTMLArchive:
+    """Append-only, size-bounded store of zstd-compressed article pages."""
+
+    def __init__(self, root: str = None, segment_bytes: int = None, max_bytes: int = None,
+                 level: int = None, node: str = None):
+        """
+        Initialize the archive.
+
+        Args:
+            root: Directory holding the segments (defaults to settings.HTML_ARCHIVE_DIR)
+            segment_bytes: Size at which a segment is closed (defaults to settings.HTML_ARCHIVE_SEGMENT_BYTES)
+            max_bytes: Total size kept by this node (defaults to settings.HTML_ARCHIVE_MAX_BYTES)
+            level: zstd compression level (defaults to settings.HTML_ARCHIVE_LEVEL)
+            node: Name of the node appending (defaults to settings.HTML_ARCHIVE_NODE)
+        """
+        self.root = str(root or getattr(settings, 'HTML_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive')))
+        self.segment_bytes = segment_bytes or getattr(settings, 'HTML_ARCHIVE_SEGMENT_BYTES', 64 * 1024 * 1024)
+        self.max_bytes = max_bytes or getattr(settings, 'HTML_ARCHIVE_MAX_BYTES', 20 * 1024 ** 3)
+        self.level = level or getattr(settings, 'HTML_ARCHIVE_LEVEL', 10)
+        node = node or getattr(settings, 'HTML_ARCHIVE_NODE', None) or socket.gethostname()
+        self.node = UNSAFE_NODE_CHARS.sub('_', node)
+        os.makedirs(os.path.join(self.root, self.node), exist_ok=True)
+
+    def _path(self, segment: int, node: str = None) -> str:
+        node = self.node if node is None else node
+        return os.path.join(self.root, node, f"segment-{segment:06d}.zst")
+
+    def segments(self) -> Dict[int, int]:
+        """
+        List this node's segment files on disk.
+
+        Returns:
+            dict: Segment number to file size, in ascending order
+        """
+        found = {}
+        directory = os.path.join(self.root, self.node)
+        for name in os.listdir(directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                found[int(match.group(1))] = os.path.getsize(os.path.join(directory, name))
+        return dict(sorted(found.items()))
+
+    @contextmanager
+    def _locked(self):
+        """Serialize appends across threads and, where flock exists, processes."""
+        with _process_lock:
+            with open(os.path.join(self.root, self.node, '.lock'), 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def put_many(self, documents: Iterable[Tuple[str, str]]) -> int:
+        """
+        Compress and append pages, replacing any earlier copy of the same URL.
+
+        Args:
+            documents: (url, html) pairs
+
+        Returns:
+            Number of pages archived
+        """
+        compressor = zstandard.ZstdCompressor(level=self.level, write_content_size=True)
+        # One frame per canonical URL: an upsert cannot touch the same row twice
+        frames = {}
+        for url, html in documents:
+            raw = html.encode('utf-8')
+            digest = url_hash(url)
+            frames[digest] = (url, digest, compressor.compress(raw), len(raw))
+        if not frames:
+            return 0
+
+        entries = []
+        with self._locked():
+            segments = self.segments()
+            segment = max(segments, default=1)
+            f = open(self._path(segment), 'ab')
+            try:
+                offset = f.seek(0, os.SEEK_END)
+                for url, digest, frame, size in frames.values():
+                    if offset >= self.segment_bytes:
+                        f.close()
+                        segment += 1
+                        f = open(self._path(segment), 'ab')
+                        offset = 0
+                    f.write(frame)
+                    entries.append(ArchivedPage(url_hash=digest, url=url, node=self.node, segment=segment,
+                                                offset=offset, length=len(frame), size=size,
+                                                archived_at=timezone.now()))
+                    offset += len(frame)
+            finally:
+                f.close()
+
+            ArchivedPage.objects.bulk_create(
+                entries, update_conflicts=True, unique_fields=['url_hash'],
+                update_fields=['url', 'node', 'segment', 'offset', 'length', 'size', 'archived_at']
+            )
+            self._enforce_retention()
+
+        metrics.incr('archive.pages', len(entries))
+        metrics.incr('archive.bytes_raw', sum(entry.size for entry in entries))
+        metrics.incr('archive.bytes_stored', sum(entry.length for entry in entries))
+        return len(entries)
+
+    def put(self, url: str, html: str) -> int:
+        """Archive a single page."""
+        return self.put_many([(url, html)])
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, str]:
+        """
+        Read archived pages.
+
+        The index is read in one query and the frames in segment and offset
+        order, so a batch costs one sequential-ish pass per segment file. A
+        page that cannot be read (its segment dropped by retention since the
+        query, or held on another node's disk) is left out; the rest of the
+        batch is still returned.
+
+        Args:
+            urls: Article URLs (canonical variants share one archived copy)
+
+        Returns:
+            dict: URL to HTML for every URL found in the archive
+        """
+        by_hash = {}
+        for url in urls:
+            by_hash.setdefault(url_hash(url), []).append(url)
+        if not by_hash:
+            return {}
+
+        entries = ArchivedPage.objects.filter(url_hash__in=list(by_hash)).order_by('node', 'segment', 'offset')
+        decompressor = zstandard.ZstdDecompressor()
+        pages = {}
+        missed = 0
+        with ExitStack() as stack:
+            handles = {}
+            for entry in entries:
+                try:
+                    html = self._read_entry(entry, handles, stack, decompressor)
+                except (OSError, zstandard.ZstdError, UnicodeDecodeError) as e:
+                    missed += 1
+                    logger.warning(f"Could not read {entry.url} from the HTML archive: {str(e)}")
+                    continue
+                for url in by_hash[entry.url_hash]:
+                    pages[url] = html
+        metrics.incr('archive.hits', len(pages))
+        if missed:
+            metrics.incr('archive.read_errors', missed)
+        return pages
+
+    def _read_entry(self, entry: ArchivedPage, handles: dict, stack: ExitStack, decompressor) -> str:
+        """Read one indexed page, opening its segment once per batch."""
+        key = (entry.node, entry.segment)
+        if key not in handles:
+            # Remember a segment that will not open, so its other pages fail fast
+            handles[key] = None
+            handles[key] = stack.enter_context(open(self._path(entry.segment, entry.node), 'rb'))
+        handle = handles[key]
+        if handle is None:
+            raise FileNotFoundError(f"Segment {entry.node}/{entry.segment} could not be opened")
+        handle.seek(entry.offset)
+        return decompressor.decompress(handle.read(entry.length)).decode('utf-8')
+
+    def get(self, url: str) -> Optional[str]:
+        """Read one archived page, or None if it is not archived."""
+        return self.get_many([url]).get(url)
+
+    def _enforce_retention(self) -> int:
+        """Drop this node's oldest closed segments until they fit in max_bytes (lock held)."""
+        segments = self.segments()
+        total = sum(segments.values())
+        dropped = 0
+        for segment, size in list(segments.items())[:-1]:
+            if total <= self.max_bytes:
+                break
+            ArchivedPage.objects.filter(node=self.node, segment=segment).delete()
+            os.remove(self._path(segment))
+            total -= size
+            dropped += 1
+            logger.info(f"Dropped HTML archive segment {self.node}/{segment} ({size} bytes)")
+        if dropped:
+            metrics.incr('archive.segments_dropped', dropped)
+        metrics.set_gauge('archive.bytes_on_disk', total)
+        return dropped
+
+
+def archive_pages(documents: Iterable[Tuple[str, str]]) -> int:
+    """
+    Archive downloaded pages if the archive is enabled, never raising.
+
+    Args:
+        documents: (url, html) pairs
+
+    Returns:
+        Number of pages archived
+    """
+    if not getattr(settings, 'HTML_ARCHIVE_ENABLED', True):
+        return 0
+    try:
+        return HTMLArchive().put_many(documents)
+    except Exception as e:
+        logger.warning(f"Could not archive downloaded pages: {str(e)}")
+        return 0
+
+
+def archived_pages(urls: Iterable[str]) -> Dict[str, str]:
+    """
+    Read pages from the archive if it is enabled, never raising.
+
+    Args:
+        urls: Article URLs
+
+    Returns:
+        dict: URL to HTML for the URLs found
+    """
+    if not getattr(settings, 'HTML_ARCHIVE_ENABLED', True):
+        return {}
+    try:
+        return HTMLArchive().get_many(urls)
+    except Exception as e:
+        logger.warning(f"Could not read from the HTML archive: {str(e)}")
+        return {}
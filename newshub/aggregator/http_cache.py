@@ -0,0 +1,194 @@
+import hashlib
+import json
+import logging
+import time
+import uuid
+import zlib
+from typing import Callable, Dict, Optional
+from urllib.parse import urlencode
+
+import requests
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached response is served without revalidation, per NewsAPI endpoint
+DEFAULT_TTLS = {
+    'sources': 60 * 60 * 24,
+    'top-headlines': 60 * 5,
+    'everything': 60 * 2,
+}
+
+# Query parameters that must never become part of a cache key
+EXCLUDED_PARAMS = {'apiKey'}
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class CachedResponse:
+    """A response body served from, or stored into, the response cache."""
+
+    def __init__(self, status_code: int, text: str, headers: Dict = None, from_cache: bool = False):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+
+class ResponseCache:
+    """
+    Redis response cache for upstream JSON APIs.
+
+    Responses are kept for a per-endpoint TTL. After that they are revalidated
+    with If-None-Match / If-Modified-Since when the upstream sent an ETag or
+    Last-Modified header, so an unchanged resource costs a 304 and no body.
+    Bodies are stored zlib-compressed. Concurrent misses for the same URL are
+    collapsed: one caller takes a short Redis lock and fetches, the others
+    wait for its result.
+    """
+
+    KEY_PREFIX = 'httpcache'
+
+    def __init__(self, redis=None, ttls: Dict[str, int] = None, retention: int = None,
+                 lock_timeout: float = None):
+        """
+        Initialize the cache.
+
+        Args:
+            redis: Redis client (defaults to the django_redis 'default' connection)
+            ttls: Seconds to serve each endpoint without revalidation (defaults to settings.NEWS_API_CACHE_TTLS)
+            retention: Seconds an entry is kept for revalidation after its TTL
+                (defaults to settings.HTTP_CACHE_RETENTION_SECONDS)
+            lock_timeout: Seconds other callers wait for an in-flight fetch (defaults to settings.HTTP_CACHE_LOCK_TIMEOUT)
+        """
+        if redis is None:
+            from django_redis import get_redis_connection
+            redis = get_redis_connection('default')
+        self.redis = redis
+        self.ttls = {**DEFAULT_TTLS, **(ttls if ttls is not None else getattr(settings, 'NEWS_API_CACHE_TTLS', {}))}
+        self.retention = retention if retention is not None else getattr(
+            settings, 'HTTP_CACHE_RETENTION_SECONDS', 60 * 60 * 24)
+        self.lock_timeout = lock_timeout if lock_timeout is not None else getattr(
+            settings, 'HTTP_CACHE_LOCK_TIMEOUT', 10)
+
+    @classmethod
+    def cache_key(cls, url: str, params: Dict = None) -> str:
+        """
+        Build the cache key for a request; credentials are left out.
+
+        Args:
+            url: Request URL without query string
+            params: Query parameters
+
+        Returns:
+            Redis key
+        """
+        query = urlencode(sorted(
+            (name, str(value)) for name, value in (params or {}).items()
+            if name not in EXCLUDED_PARAMS and value is not None
+        ))
+        digest = hashlib.sha1(f"{url}?{query}".encode('utf-8')).hexdigest()
+        return f"{cls.KEY_PREFIX}:{digest}"
+
+    def _load(self, key: str) -> Optional[Dict]:
+        raw = self.redis.get(key)
+        if raw is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(raw))
+        except (zlib.error, ValueError):
+            return None
+
+    def _store(self, key: str, entry: Dict, ttl: int):
+        payload = zlib.compress(json.dumps(entry).encode('utf-8'))
+        self.redis.set(key, payload, ex=max(int(ttl + self.retention), 1))
+
+    @staticmethod
+    def _is_fresh(entry: Optional[Dict], ttl: int) -> bool:
+        return entry is not None and time.time() - entry['fetched_at'] < ttl
+
+    @staticmethod
+    def _to_response(entry: Dict, from_cache: bool) -> CachedResponse:
+        headers = {'ETag': entry.get('etag'), 'Last-Modified': entry.get('last_modified')}
+        return CachedResponse(200, entry['body'], {k: v for k, v in headers.items() if v}, from_cache)
+
+    def get(self, endpoint: str, url: str, params: Dict, send: Callable[[Dict], 'requests.Response']):
+        """
+        Serve a GET request from the cache, fetching or revalidating as needed.
+
+        Args:
+            endpoint: Endpoint name, used to pick the TTL
+            url: Request URL without query string
+            params: Query parameters
+            send: Makes the real request; called with the conditional headers to add
+
+        Returns:
+            CachedResponse for cached or successful responses, otherwise the
+            upstream response as returned by `send`
+        """
+        ttl = self.ttls.get(endpoint, 0)
+        key = self.cache_key(url, params)
+        entry = self._load(key)
+        if self._is_fresh(entry, ttl):
+            metrics.incr(f"http_cache.{endpoint}.hit")
+            return self._to_response(entry, from_cache=True)
+
+        lock_key, token = f"{key}:lock", uuid.uuid4().hex
+        if not self.redis.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)):
+            # Another worker is fetching this URL; wait for its result
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                waited = self._load(key)
+                if self._is_fresh(waited, ttl):
+                    metrics.incr(f"http_cache.{endpoint}.collapsed")
+                    return self._to_response(waited, from_cache=True)
+            token = None
+
+        try:
+            return self._fetch(endpoint, key, entry, ttl, send)
+        finally:
+            if token:
+                self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    def _fetch(self, endpoint: str, key: str, entry: Optional[Dict], ttl: int, send: Callable):
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = send(headers)
+
+        if response.status_code == 304 and entry:
+            metrics.incr(f"http_cache.{endpoint}.revalidated")
+            entry['fetched_at'] = time.time()
+            self._store(key, entry, ttl)
+            return self._to_response(entry, from_cache=True)
+
+        metrics.incr(f"http_cache.{endpoint}.miss")
+        if response.status_code == 200 and ttl > 0:
+            self._store(key, {
+                'body': response.text,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+            }, ttl)
+        return response
+
+    def invalidate(self, url: str, params: Dict = None):
+        """Drop the cached response for a request."""
+        self.redis.delete(self.cache_key(url, params))
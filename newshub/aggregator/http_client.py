@@ -0,0 +1,286 @@
+"""
+Shared HTTP client layer for every upstream the app talks to.
+
+Each named upstream (NewsAPI, publisher sites, publisher feeds, Web Push
+services) gets one process-wide `requests.Session` with connection pools sized
+for it, a urllib3 retry policy, a default timeout and a circuit breaker per
+host. Every request goes through the timing hooks, which by default record
+upstream latency and connection reuse in `aggregator.metrics`.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPSTREAMS = {
+    'newsapi': {
+        'pool_connections': 2,
+        'pool_maxsize': 10,
+        'timeout': 10,
+        'retries': 2,
+        'backoff': 0.5,
+        # 429s are left to the NewsAPI rate limiter
+        'status_forcelist': [500, 502, 503, 504],
+        'headers': {'User-Agent': 'NewsHub/1.0', 'Accept': 'application/json'},
+    },
+    'publishers': {
+        'pool_connections': 100,
+        'pool_maxsize': 4,
+        'timeout': 10,
+        # ArticleDownloader retries with its own backoff
+        'retries': 0,
+        'headers': {'User-Agent': 'NewsHub/1.0', 'Accept': 'text/html,application/xhtml+xml'},
+    },
+    'feeds': {
+        'pool_connections': 200,
+        'pool_maxsize': 2,
+        'timeout': 15,
+        'retries': 1,
+        'backoff': 1.0,
+        'headers': {
+            'User-Agent': 'NewsHub/1.0',
+            'Accept': 'application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8',
+        },
+    },
+    'webpush': {
+        'pool_connections': 10,
+        'pool_maxsize': 10,
+        'timeout': 10,
+        'retries': 2,
+        'backoff': 0.5,
+        'status_forcelist': [502, 503, 504],
+        'allowed_methods': ['POST'],
+    },
+}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host after consecutive failures.
+
+    After `failure_threshold` failures in a row the circuit opens and requests
+    fail immediately. Once `reset_timeout` has passed one trial request is let
+    through; success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+_timing_hooks: List[Callable] = []
+
+
+def add_timing_hook(hook: Callable):
+    """
+    Register a callable run after every request.
+
+    It is called with (upstream, method, url, status_code, elapsed, reused);
+    status_code is None when the request failed.
+    """
+    _timing_hooks.append(hook)
+
+
+def _record_metrics(upstream, method, url, status_code, elapsed, reused):
+    metrics.observe(f"http.{upstream}.latency", elapsed)
+    metrics.incr(f"http.{upstream}.connections_{'reused' if reused else 'new'}")
+    if status_code is None or status_code >= 500:
+        metrics.incr(f"http.{upstream}.errors")
+
+
+add_timing_hook(_record_metrics)
+
+
+class UpstreamAdapter(HTTPAdapter):
+    """HTTPAdapter with a default timeout, per-host circuit breakers and timing hooks."""
+
+    def __init__(self, upstream: str, timeout: float, failure_threshold: int,
+                 reset_timeout: float, **kwargs):
+        self.upstream = upstream
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._breaker_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._breaker_lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[host]
+
+    def send(self, request, timeout=None, **kwargs):
+        host = urlsplit(request.url).netloc.lower()
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            metrics.incr(f"http.{self.upstream}.circuit_open")
+            raise CircuitOpenError(f"Circuit open for {host}", request=request)
+
+        pool = self.poolmanager.connection_from_url(request.url)
+        connections_before = pool.num_connections
+        started = time.monotonic()
+        status_code = None
+        try:
+            response = super().send(request, timeout=timeout or self.timeout, **kwargs)
+            status_code = response.status_code
+        except Exception:
+            # Any error counts, or a failed half-open trial would never be settled
+            breaker.record_failure()
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            reused = pool.num_connections == connections_before
+            for hook in _timing_hooks:
+                try:
+                    hook(self.upstream, request.method, request.url, status_code, elapsed, reused)
+                except Exception as e:
+                    logger.debug(f"HTTP timing hook failed: {str(e)}")
+
+        if status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_upstream_config(upstream: str) -> Dict:
+    """Settings for an upstream: the defaults overridden by settings.HTTP_CLIENT_UPSTREAMS."""
+    overrides = getattr(settings, 'HTTP_CLIENT_UPSTREAMS', {})
+    return {
+        'pool_connections': 10,
+        'pool_maxsize': 10,
+        'timeout': 10,
+        'retries': 2,
+        'backoff': 0.5,
+        'status_forcelist': [502, 503, 504],
+        'allowed_methods': ['GET', 'HEAD'],
+        'failure_threshold': getattr(settings, 'HTTP_CIRCUIT_FAILURE_THRESHOLD', 5),
+        'reset_timeout': getattr(settings, 'HTTP_CIRCUIT_RESET_SECONDS', 30),
+        'headers': {},
+        **DEFAULT_UPSTREAMS.get(upstream, {}),
+        **overrides.get(upstream, {}),
+    }
+
+
+def build_session(upstream: str, **overrides) -> requests.Session:
+    """
+    Build a new session for an upstream.
+
+    Args:
+        upstream: Upstream name, e.g. 'newsapi', 'publishers' or 'webpush'
+        **overrides: Config values that replace the upstream's settings
+
+    Returns:
+        Configured requests.Session
+    """
+    config = {**get_upstream_config(upstream), **overrides}
+    retry = Retry(
+        total=config['retries'],
+        connect=config['retries'],
+        read=config['retries'],
+        status=config['retries'],
+        backoff_factor=config['backoff'],
+        status_forcelist=config['status_forcelist'],
+        allowed_methods=frozenset(config['allowed_methods']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = UpstreamAdapter(
+        upstream,
+        timeout=config['timeout'],
+        failure_threshold=config['failure_threshold'],
+        reset_timeout=config['reset_timeout'],
+        pool_connections=config['pool_connections'],
+        pool_maxsize=config['pool_maxsize'],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(config['headers'])
+    return session
+
+
+def get_session(upstream: str) -> requests.Session:
+    """
+    Get the process-wide session for an upstream, creating it on first use.
+
+    Args:
+        upstream: Upstream name, e.g. 'newsapi', 'publishers' or 'webpush'
+
+    Returns:
+        Shared requests.Session
+    """
+    with _sessions_lock:
+        if upstream not in _sessions:
+            _sessions[upstream] = build_session(upstream)
+        return _sessions[upstream]
+
+
+def get_circuit_states() -> Dict[str, Dict[str, str]]:
+    """
+    Get the circuit state of every host contacted through the shared sessions.
+
+    Returns:
+        dict: Upstream name to {host: state}
+    """
+    states = {}
+    for upstream, session in list(_sessions.items()):
+        adapter = session.get_adapter('https://')
+        states[upstream] = {host: breaker.state for host, breaker in list(adapter.breakers.items())}
+    return states
@@ -0,0 +1,134 @@
+import logging
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .canonical import url_hash
+from .models import Article
+from .seen_filter import get_seen_filter, record_screening, remember_urls
+
+logger = logging.getLogger(__name__)
+
+
+def existing_urls(urls: Iterable[str]) -> set:
+    """
+    Find which of the given URLs, or a canonical variant of them, are already stored.
+
+    URLs are screened against the Redis Bloom filter first; only the ones it
+    reports as maybe seen are checked in the database, in a single query on
+    the url_hash index.
+
+    Args:
+        urls: Article URLs
+
+    Returns:
+        Set of the given URLs that already have an Article
+    """
+    hashes = {}
+    for url in urls:
+        hashes.setdefault(url_hash(url), []).append(url)
+    if not hashes:
+        return set()
+
+    candidates = list(hashes)
+    screened = False
+    if getattr(settings, 'SEEN_FILTER_ENABLED', True):
+        try:
+            flags = get_seen_filter().might_contain(candidates)
+            candidates = [digest for digest, maybe_seen in zip(candidates, flags) if maybe_seen]
+            screened = True
+        except Exception as e:
+            logger.warning(f"Seen-URL filter unavailable, checking the database: {str(e)}")
+
+    stored = []
+    if candidates:
+        stored = list(Article.objects.filter(url_hash__in=candidates).values_list('url_hash', flat=True))
+    if screened:
+        record_screening(maybe_seen=len(candidates), confirmed=len(stored), screened=len(hashes))
+    return {url for digest in stored for url in hashes[digest]}
+
+
+def _stored_hashes(hashes: List[str]) -> set:
+    return set(Article.objects.filter(url_hash__in=hashes).values_list('url_hash', flat=True))
+
+
+def _insert_ignoring_conflicts(articles: List[Article], batch_size: int) -> Dict[str, int]:
+    """
+    INSERT ... ON CONFLICT (url_hash) DO NOTHING RETURNING id, url_hash.
+
+    Unlike bulk_create(ignore_conflicts=True), this reports exactly the rows
+    this statement inserted, so a row a concurrent worker inserted first is
+    never mistaken for ours.
+
+    Returns:
+        dict: url_hash to id of the inserted rows
+    """
+    fields = [field for field in Article._meta.concrete_fields if not field.primary_key]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    row = f"({', '.join(['%s'] * len(fields))})"
+
+    inserted = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(articles), batch_size):
+            batch = articles[start:start + batch_size]
+            params = [
+                # pre_save fills auto_now/auto_now_add fields as save() would
+                field.get_db_prep_save(field.pre_save(article, True), connection)
+                for article in batch for field in fields
+            ]
+            # Identifiers come from the model, values are parameters
+            sql = (f"INSERT INTO {quote(Article._meta.db_table)} ({columns}) "  # nosec B608
+                   f"VALUES {', '.join([row] * len(batch))} "
+                   f"ON CONFLICT ({quote('url_hash')}) DO NOTHING RETURNING {quote('id')}, {quote('url_hash')}")
+            cursor.execute(sql, params)
+            inserted.update((digest, pk) for pk, digest in cursor.fetchall())
+    return inserted
+
+
+def bulk_upsert_articles(articles: List[Article], batch_size: int = None) -> Dict[str, int]:
+    """
+    Persist unsaved Article instances with a fixed number of queries.
+
+    Existing articles are looked up by canonical URL hash in one query, and
+    the rest are inserted with ON CONFLICT (url_hash) DO NOTHING RETURNING, so
+    the ids come back with the insert. A row a concurrent worker inserted
+    between the lookup and the insert is left to that worker: it is neither
+    overwritten nor reported as created here.
+
+    Args:
+        articles: Unsaved Article instances (canonical duplicates keep the first)
+        batch_size: Rows per INSERT (defaults to settings.INGEST_BULK_BATCH_SIZE)
+
+    Returns:
+        dict: URL to id of every article this call created
+    """
+    batch_size = batch_size or getattr(settings, 'INGEST_BULK_BATCH_SIZE', 500)
+
+    # The raw insert bypasses Article.save(), so the hash is filled in here
+    unique = {}
+    for article in articles:
+        article.url_hash = article.url_hash or url_hash(article.url)
+        unique.setdefault(article.url_hash, article)
+
+    known = _stored_hashes(list(unique))
+    new_articles = [article for digest, article in unique.items() if digest not in known]
+    if not new_articles:
+        return {}
+
+    ids = _insert_ignoring_conflicts(new_articles, batch_size)
+    created = {}
+    for article in new_articles:
+        article.pk = ids.get(article.url_hash)
+        if article.pk:
+            created[article.url] = article.pk
+
+    if created:
+        # Only once the rows are committed: a rolled-back batch must not be remembered
+        stored = [article.url_hash for article in new_articles if article.pk]
+        transaction.on_commit(lambda: remember_urls(stored))
+
+    skipped = len(unique) - len(created)
+    logger.info(f"Bulk upsert: {len(created)} created, {skipped} already stored")
+    return created
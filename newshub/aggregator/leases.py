@@ -0,0 +1,226 @@
+"""
+Distributed ingest leases and node sharding, shared through Redis.
+
+A fetch of a NewsAPI category or query only runs while it holds that
+source's lease, so an overlong run, a retry and the fetch_articles command
+never work the same source at once. Leases expire unless renewed, so a
+holder that dies hands the source over automatically.
+
+Expiry also means a holder that stalls (a long pause, a partitioned node)
+can carry on after its lease has passed to someone else. Every lease
+therefore carries a fencing token from a per-source counter that only grows;
+writes made under a lease pass the token along, and FetchState rejects any
+write older than the newest token it has seen.
+
+NodeRegistry splits the poll queue between ingest nodes: nodes heartbeat
+into a sorted set, and each source belongs to one live node, chosen by
+rendezvous hashing so a node joining or leaving only moves its own share.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+from django.conf import settings
+
+from . import metrics
+from .http_cache import RELEASE_LOCK_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class LeaseUnavailable(Exception):
+    """Raised when a lease is held by someone else."""
+
+
+@dataclass
+class Lease:
+    """A held lease; `token` is its fencing token."""
+    name: str
+    token: int
+    value: str
+    ttl: float
+    lost: bool = False
+
+
+def fetch_lease_name(endpoint: str, category: str = None, query: str = None) -> str:
+    """Lease name for one NewsAPI request shape, as keyed by FetchState."""
+    query_digest = hashlib.sha1((query or '').encode('utf-8')).hexdigest()[:16]
+    return f"fetch:{endpoint}:{category or ''}:{query_digest}"
+
+
+class LeaseManager:
+    """Expiring, exclusive leases with fencing tokens."""
+
+    KEY_PREFIX = 'newshub:lease'
+
+    def __init__(self, redis=None, ttl: float = None):
+        """
+        Initialize the manager.
+
+        Args:
+            redis: Redis client (defaults to the django_redis 'default' connection)
+            ttl: Seconds a lease lasts unless renewed (defaults to settings.INGEST_LEASE_SECONDS)
+        """
+        if redis is None:
+            from django_redis import get_redis_connection
+            redis = get_redis_connection('default')
+        self.redis = redis
+        self.ttl = ttl or getattr(settings, 'INGEST_LEASE_SECONDS', 600)
+
+    def _key(self, name: str) -> str:
+        return f"{self.KEY_PREFIX}:{name}"
+
+    def _fence_key(self, name: str) -> str:
+        return f"{self.KEY_PREFIX}:{name}:fence"
+
+    def acquire(self, name: str, ttl: float = None) -> Optional[Lease]:
+        """
+        Take a lease if nobody holds it.
+
+        Args:
+            name: Lease name
+            ttl: Seconds the lease lasts unless renewed
+
+        Returns:
+            The Lease, or None if it is held elsewhere
+        """
+        ttl = ttl or self.ttl
+        # The token is drawn before the lease is tried: a failed attempt only
+        # skips a number, and fencing only needs tokens to grow
+        token = int(self.redis.incr(self._fence_key(name)))
+        value = f"{token}:{uuid.uuid4().hex}"
+        if not self.redis.set(self._key(name), value, nx=True, px=int(ttl * 1000)):
+            metrics.incr('lease.contended')
+            return None
+        metrics.incr('lease.acquired')
+        return Lease(name=name, token=token, value=value, ttl=ttl)
+
+    def renew(self, lease: Lease) -> bool:
+        """
+        Extend a lease by its ttl.
+
+        Returns:
+            False if the lease had expired or passed to someone else, in which
+            case `lease.lost` is set
+        """
+        renewed = bool(self.redis.eval(RENEW_LEASE_SCRIPT, 1, self._key(lease.name), lease.value,
+                                       int(lease.ttl * 1000)))
+        if not renewed and not lease.lost:
+            lease.lost = True
+            logger.warning(f"Lost lease {lease.name} (token {lease.token})")
+            metrics.incr('lease.lost')
+        return renewed
+
+    def release(self, lease: Lease) -> bool:
+        """Give a lease up, unless it has already passed to someone else."""
+        return bool(self.redis.eval(RELEASE_LOCK_SCRIPT, 1, self._key(lease.name), lease.value))
+
+    @contextmanager
+    def hold(self, name: str, ttl: float = None) -> Iterator[Lease]:
+        """
+        Hold a lease for the duration of a block, renewing it in the background.
+
+        The lease is renewed every third of its ttl, so it outlives the block
+        however long it runs, but expires soon after the process dies.
+
+        Args:
+            name: Lease name
+            ttl: Seconds the lease lasts without a renewal
+
+        Yields:
+            Lease: The held lease; `lost` is set if a renewal finds it gone
+
+        Raises:
+            LeaseUnavailable: If the lease is held elsewhere
+        """
+        lease = self.acquire(name, ttl)
+        if lease is None:
+            raise LeaseUnavailable(name)
+
+        stop = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(lease.ttl / 3):
+                try:
+                    if not self.renew(lease):
+                        return
+                except Exception as e:
+                    logger.warning(f"Could not renew lease {name}: {str(e)}")
+
+        renewer = threading.Thread(target=keep_alive, name=f"lease-{name}", daemon=True)
+        renewer.start()
+        try:
+            yield lease
+        finally:
+            stop.set()
+            renewer.join()
+            try:
+                self.release(lease)
+            except Exception as e:
+                # It expires on its own
+                logger.warning(f"Could not release lease {name}: {str(e)}")
+
+
+def shard_owner(key: str, nodes: List[str]) -> Optional[str]:
+    """
+    The node a key belongs to, by rendezvous (highest random weight) hashing.
+
+    Every node scores every key and the highest score wins, so all nodes
+    agree on the owner without coordinating, and removing a node only moves
+    the keys it owned.
+    """
+    if not nodes:
+        return None
+    return max(nodes, key=lambda node: hashlib.sha1(f"{node}|{key}".encode('utf-8')).digest())
+
+
+class NodeRegistry:
+    """Live ingest nodes, as a Redis sorted set of node name to heartbeat expiry."""
+
+    KEY = 'newshub:ingest:nodes'
+
+    def __init__(self, redis=None, ttl: int = None):
+        """
+        Initialize the registry.
+
+        Args:
+            redis: Redis client (defaults to the django_redis 'default' connection)
+            ttl: Seconds a node counts as live after its last heartbeat
+                (defaults to settings.INGEST_NODE_TTL)
+        """
+        if redis is None:
+            from django_redis import get_redis_connection
+            redis = get_redis_connection('default')
+        self.redis = redis
+        self.ttl = ttl or getattr(settings, 'INGEST_NODE_TTL', 60)
+
+    def heartbeat(self, node: str, now: float = None):
+        """Mark a node live, and drop nodes whose heartbeat has run out."""
+        now = now if now is not None else time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(self.KEY, {node: now + self.ttl})
+        pipe.zremrangebyscore(self.KEY, '-inf', now)
+        pipe.execute()
+
+    def leave(self, node: str):
+        """Remove a node at once, handing its share over without waiting for the ttl."""
+        self.redis.zrem(self.KEY, node)
+
+    def live_nodes(self, now: float = None) -> List[str]:
+        """Names of the nodes whose heartbeat has not run out."""
+        now = now if now is not None else time.time()
+        nodes = self.redis.zrangebyscore(self.KEY, now, '+inf')
+        return sorted(node.decode('utf-8') if isinstance(node, bytes) else node for node in nodes)
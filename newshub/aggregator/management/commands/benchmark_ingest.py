@@ -0,0 +1,105 @@
+import json
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from aggregator.fake_upstream import (BENCHMARK_SCENARIOS, benchmark_client, benchmark_downloader, median_report,
+                                      scenario_upstream)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark NewsAPI fetching and article downloads against a local fake upstream'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=list(BENCHMARK_SCENARIOS),
+                            help='Scenario to run (repeatable; default: the whole suite)')
+        parser.add_argument('--list', action='store_true', help='List the scenarios and exit')
+        parser.add_argument('--articles', type=int, default=500, help='Articles served by the fake NewsAPI')
+        parser.add_argument('--downloads', type=int, default=None,
+                            help='Article pages downloaded per run (default: every article served)')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per scenario; the report shows the median of each metric')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for articles and injected faults')
+        parser.add_argument('--fetch-command', action='store_true',
+                            help='Also time the fetch_articles command (needs Redis, the NLP model and permission '
+                                 'to create a throwaway test database)')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, (description, _) in BENCHMARK_SCENARIOS.items():
+                self.stdout.write(f"{name:<18} {description}")
+            return
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        live_database = connection.settings_dict['NAME']
+        if options['fetch_command']:
+            # fetch_articles stores what it fetches, so it runs against a test database
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = self._run_suite(options)
+        finally:
+            if options['fetch_command']:
+                connection.creation.destroy_test_db(live_database, verbosity=0)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    def _run_suite(self, options):
+        """Run every selected scenario, reporting the median of its runs."""
+        report = {}
+        for name in options['scenario'] or BENCHMARK_SCENARIOS:
+            runs = []
+            for _ in range(options['repeat']):
+                runs.append(self._run(name, options))
+            report[name] = median_report(runs)
+            if not options['json']:
+                self._print_scenario(name, report[name])
+        return report
+
+    def _run(self, name, options):
+        """One run of a scenario against a fresh fake upstream."""
+        with scenario_upstream(name, articles=options['articles'], seed=options['seed']) as upstream:
+            result = {
+                'newsapi': benchmark_client(upstream),
+                'downloads': benchmark_downloader(upstream, limit=options['downloads']),
+            }
+            if options['fetch_command']:
+                result['fetch_command'] = self._time_fetch_command(upstream)
+            result['upstream'] = dict(upstream.stats)
+        return result
+
+    def _time_fetch_command(self, upstream):
+        """
+        Run fetch_articles end to end with NewsAPI pointed at the fake upstream.
+
+        It runs against the test database handle() created, and pushes no
+        notifications and archives no pages, so the fake articles never reach
+        users or the live tables.
+        """
+        # A throwaway limiter budget so the benchmark neither waits on nor spends the real one
+        with override_settings(NEWS_API_BASE_URL=upstream.newsapi_url, NEWS_API_KEY='benchmark',
+                               NEWS_API_CACHE_ENABLED=False, NEWS_API_REQUESTS_PER_SECOND=1000,
+                               NEWS_API_BURST=1000, NEWS_API_DAILY_BUDGET=10 ** 9, HTML_ARCHIVE_ENABLED=False):
+            started = time.monotonic()
+            call_command('fetch_articles', notify=False, stdout=StringIO(), stderr=StringIO())
+            return {'elapsed_s': round(time.monotonic() - started, 3)}
+
+    def _print_scenario(self, name, result):
+        newsapi, downloads = result['newsapi'], result['downloads']
+        self.stdout.write(self.style.SUCCESS(f"✅ {name}: {BENCHMARK_SCENARIOS[name][0]}"))
+        self.stdout.write(
+            f"  newsapi    {newsapi['articles']}/{newsapi['expected']} articles in {newsapi['elapsed_s']}s "
+            f"({newsapi['articles_per_s']} articles/s)"
+        )
+        self.stdout.write(
+            f"  downloads  {downloads['downloaded']} ok, {downloads['failed']} failed, "
+            f"{downloads['retries']} retries in {downloads['elapsed_s']}s ({downloads['pages_per_s']} pages/s)"
+        )
+        if 'fetch_command' in result:
+            self.stdout.write(f"  fetch_articles  {result['fetch_command']['elapsed_s']}s")
@@ -0,0 +1,55 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from aggregator.services import NLPService, calibrate_urgency
+
+DEFAULT_LABELS = Path(__file__).resolve().parents[2] / 'testdata' / 'urgency_labels.jsonl'
+
+
+class Command(BaseCommand):
+    help = 'Calibrate the urgency head and the breaking-news threshold on labelled articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--labels', default=str(DEFAULT_LABELS),
+                            help='JSON lines with "title", optional "description" and a boolean "breaking"')
+        parser.add_argument('--output', default=None,
+                            help='Calibration file to write (defaults to settings.NLP_URGENCY_CALIBRATION_PATH)')
+        parser.add_argument('--min-precision', type=float, default=None,
+                            help='Share of pushes that must be breaking news '
+                                 '(defaults to settings.BREAKING_NEWS_MIN_PRECISION)')
+
+    def handle(self, *args, **options):
+        output = options['output'] or getattr(settings, 'NLP_URGENCY_CALIBRATION_PATH', '')
+        if not output:
+            raise CommandError('Pass --output or set NLP_URGENCY_CALIBRATION_PATH')
+        min_precision = options['min_precision'] or getattr(settings, 'BREAKING_NEWS_MIN_PRECISION', 0.9)
+
+        with open(options['labels'], encoding='utf-8') as handle:
+            examples = [json.loads(line) for line in handle if line.strip()]
+
+        nlp_service = NLPService()
+        margins = nlp_service.urgency_margins(examples)
+        try:
+            calibration = calibrate_urgency(margins, [bool(example['breaking']) for example in examples],
+                                            min_precision=min_precision)
+        except ValueError as e:
+            raise CommandError(str(e))
+        calibration['model'] = nlp_service.model_name
+
+        with open(output, 'w', encoding='utf-8') as handle:
+            json.dump(calibration, handle, indent=2)
+
+        if calibration['precision'] is None:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ No threshold reaches {min_precision} precision on {len(examples)} examples; "
+                f"breaking-news pushes are off until the head or the labels improve"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Threshold {calibration['threshold']:.3f}: precision {calibration['precision']}, "
+                f"recall {calibration['recall']} on {len(examples)} examples"
+            ))
+        self.stdout.write(f"  Wrote {output}")
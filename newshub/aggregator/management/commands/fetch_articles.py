@@ -1,92 +1,174 @@
-import requests
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from aggregator.models import Article
+from contextlib import ExitStack
 from datetime import datetime
-from newspaper import Article as NewsArticle
-from transformers import pipeline
+from itertools import chain
 from django.contrib.auth.models import User
-from webpush import send_user_notification
 from django.utils import timezone
-
-# NLP summarizer
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-
-def classify_category(title, summary):
-    text = f"{title} {summary}".lower()
-    if any(kw in text for kw in ['election', 'government', 'president']):
-        return 'Politics'
-    elif any(kw in text for kw in ['football', 'nba', 'cricket']):
-        return 'Sports'
-    elif any(kw in text for kw in ['ai', 'technology', 'tech', 'startup']):
-        return 'Tech'
-    elif any(kw in text for kw in ['market', 'stocks', 'economy']):
-        return 'Business'
-    else:
-        return 'General'
-
-def is_breaking_news(title, summary):
-    keywords = ['breaking', 'alert', 'emergency', 'just in', 'exclusive']
-    text = f"{title} {summary}".lower()
-    return any(k in text for k in keywords)
+from aggregator.downloader import ArticleDownloader
+from aggregator.extraction import ExtractionStage
+from aggregator.html_archive import archive_pages
+from aggregator.ingest import bulk_upsert_articles, existing_urls
+from aggregator.leases import LeaseManager, LeaseUnavailable, fetch_lease_name
+from aggregator.services import NewsAPIService, NLPService
+from aggregator.summarization import SummarizationScheduler
+from aggregator.webpush_service import WebPushService
 
 class Command(BaseCommand):
     help = 'Fetch news from NewsAPI and notify users of breaking news'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--no-notify', dest='notify', action='store_false',
+                            help='Store the articles without pushing breaking news to users')
+
     def handle(self, *args, **kwargs):
-        url = 'https://newsapi.org/v2/top-headlines?country=us&pageSize=100&apiKey=YOUR_NEWSAPI_KEY'
-        response = requests.get(url)
-        data = response.json()
+        news_service = NewsAPIService()
+        try:
+            with self._hold_headline_leases(news_service.endpoint_name()):
+                self._fetch(news_service, notify=kwargs.get('notify', True))
+        except LeaseUnavailable as e:
+            self.stderr.write(f"❌ Another fetch of the top headlines is running ({e})")
+
+    def _hold_headline_leases(self, endpoint):
+        """
+        Hold the lease of every scheduled category fetch, and of the unfiltered headlines.
+
+        All top headlines overlap each category's, so the command and the
+        scheduled category fetches (see scheduler.sync_schedules) never run
+        at once.
+
+        Raises:
+            LeaseUnavailable: If any of them is held elsewhere; those already taken are released
+        """
+        leases = LeaseManager()
+        categories = dict.fromkeys(getattr(settings, 'DEFAULT_CATEGORIES', ['general']))
+        stack = ExitStack()
+        try:
+            for category in [None, *categories]:
+                stack.enter_context(leases.hold(fetch_lease_name(endpoint, category)))
+        except BaseException:
+            stack.close()
+            raise
+        return stack
 
-        if 'articles' not in data:
+    def _fetch(self, news_service, notify=True):
+        # Goes through the shared NewsAPI session, rate limiter and response cache
+        items = news_service.fetch_articles(page_size=100)
+
+        if not items:
             self.stderr.write("❌ Failed to fetch articles")
             return
 
         sent_notifications = set()
+        nlp_service = NLPService()
+        versions = nlp_service.versions
+        scheduler = SummarizationScheduler(nlp_service=nlp_service)
+        breaking_threshold = nlp_service.breaking_threshold
 
-        for item in data['articles']:
-            try:
-                news_article = NewsArticle(item['url'])
-                news_article.download()
-                news_article.parse()
-                content = news_article.text[:5000]
-                summary = summarizer(content, max_length=100, min_length=30, do_sample=False)[0]['summary_text']
-            except Exception:
-                content = item.get('content', '')
-                summary = item.get('description', '')
-
-            category = classify_category(item['title'], summary)
-
-            article, created = Article.objects.get_or_create(
-                title=item['title'],
-                url=item['url'],
-                source=item['source']['name'],
-                published_at=item['publishedAt'],
-                defaults={
-                    'content': content,
-                    'summary': summary,
-                    'category': category,
-                    'image_url': item.get('urlToImage')
-                }
+        # Only headlines we have not stored yet are enriched, downloaded and extracted
+        known_urls = existing_urls(item['url'] for item in items)
+        items = [item for item in items if item['url'] not in known_urls]
+
+        # Sentiment and urgency for all headlines from one batched forward pass
+        enrichments = nlp_service.enrich_batch(items)
+
+        pending = {}
+        for item, enrichment in zip(items, enrichments):
+            pending.setdefault(item['url'], (item, enrichment))
+
+        # Pages are downloaded concurrently and handed to the extraction pool as they arrive
+        downloader = ArticleDownloader()
+        extractor = ExtractionStage()
+        failed_downloads = []
+        downloaded = []
+
+        def downloaded_pages():
+            for url, html, error in downloader.iter_downloads(pending):
+                if error:
+                    failed_downloads.append(url)
+                    continue
+                downloaded.append((url, html))
+                yield url, html
+
+        rows = []
+        with extractor:
+            results = chain(
+                extractor.iter_extract(downloaded_pages()),
+                ((url, None, None) for url in failed_downloads)
             )
+            for index, (url, extracted, error) in enumerate(results):
+                rows.append(self._build(item_data=pending[url], extracted=extracted, scheduler=scheduler,
+                                        queue_depth=len(pending) - index, versions=versions))
 
-            # Send push notification only for new articles
-            if created and is_breaking_news(item['title'], summary):
-                for user in User.objects.all():
-                    if user in sent_notifications:
-                        continue
-                    try:
-                        send_user_notification(
-                            user=user,
-                            payload={
-                                "head": "🚨 Breaking News!",
-                                "body": item['title'],
-                                "url": item['url']
-                            },
-                            ttl=1000
-                        )
-                        sent_notifications.add(user)
-                        self.stdout.write(self.style.SUCCESS(f"✅ Notified {user.username}"))
-                    except Exception as e:
-                        self.stderr.write(f"⚠️ Failed to notify {user.username}: {e}")
+        # Keep the raw pages so later extractor versions can re-run without downloading
+        archive_pages(downloaded)
 
+        # One bulk upsert for the whole run; only newly created articles trigger notifications
+        created = bulk_upsert_articles(rows)
+        self.stdout.write(f"Stored {len(created)} new articles")
+        for url in created if notify else ():
+            item, enrichment = pending[url]
+            if enrichment['urgency_score'] >= breaking_threshold:
+                self._notify_breaking(item, sent_notifications)
+
+        self.stdout.write(f"Downloads: {downloader.stats}")
+        self.stdout.write(f"Extraction: {extractor.get_stats()}")
+        stats = scheduler.get_stats()
+        self.stdout.write(f"Summarization tiers: {stats['counts']}, deferred: {stats['deferred']}")
         self.stdout.write(self.style.SUCCESS("✅ Fetch completed."))
+
+    def _build(self, item_data, extracted, scheduler, queue_depth, versions):
+        item, enrichment = item_data
+        if extracted and extracted['text']:
+            content = extracted['text'][:5000]
+        else:
+            content = item.get('content') or ''
+        image_url = item.get('urlToImage') or (extracted or {}).get('top_image') or None
+
+        summary, summary_tier, summary_state = scheduler.summarize_at_ingest(
+            content,
+            description=item.get('description') or '',
+            source=item['source']['name'],
+            queue_depth=queue_depth,
+            title=item['title'],
+            category=enrichment['category']
+        )
+
+        return Article(
+            title=item['title'],
+            url=item['url'],
+            source=item['source']['name'],
+            published_at=item['publishedAt'],
+            content=content,
+            summary=summary,
+            summary_tier=summary_tier,
+            summary_state=summary_state,
+            category=enrichment['category'],
+            sentiment=enrichment['sentiment'],
+            sentiment_score=enrichment['sentiment_score'],
+            urgency_score=enrichment['urgency_score'],
+            image_url=image_url,
+            summary_version=versions['summary_version'],
+            category_version=versions['category_version'],
+            enriched_at=timezone.now()
+        )
+
+    def _notify_breaking(self, item, sent_notifications):
+        for user in User.objects.all():
+            if user in sent_notifications:
+                continue
+            try:
+                WebPushService.push_to_user(
+                    user,
+                    payload={
+                        "head": "🚨 Breaking News!",
+                        "body": item['title'],
+                        "url": item['url']
+                    },
+                    ttl=1000
+                )
+                sent_notifications.add(user)
+                self.stdout.write(self.style.SUCCESS(f"✅ Notified {user.username}"))
+            except Exception as e:
+                self.stderr.write(f"⚠️ Failed to notify {user.username}: {e}")
@@ -0,0 +1,136 @@
+import json
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from aggregator.pipeline import chunked
+from aggregator.replay import ReplayRunner, read_jsonl, synthetic_articles
+from aggregator.summarization import TIER_RANK
+
+NLP_BACKENDS = {
+    'lexicon': 'aggregator.services.LexiconNLPService',
+    'model': 'aggregator.services.NLPService',
+}
+
+
+class Command(BaseCommand):
+    help = 'Replay NewsAPI-shaped article payloads from a JSONL dump (or a synthetic generator) through ingest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?',
+                            help="JSONL file of articles or NewsAPI responses ('-' for stdin)")
+        parser.add_argument('--synthetic', type=int, default=None,
+                            help='Generate this many synthetic articles instead of reading a file')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the synthetic generator')
+        parser.add_argument('--duplicate-rate', type=float, default=0.05,
+                            help='Share of synthetic articles that repeat an earlier URL')
+        parser.add_argument('--write', metavar='PATH',
+                            help='Write the synthetic articles to a JSONL file and exit')
+        parser.add_argument('--rate', type=float, default=None,
+                            help='Target articles per second (default: as fast as possible)')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after this many articles')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Articles per batch (defaults to settings.INGEST_STAGE_BATCH_SIZE)')
+        parser.add_argument('--nlp', default='lexicon',
+                            help="NLP backend: 'lexicon' (no model), 'model' or a dotted class path")
+        parser.add_argument('--max-tier', choices=list(TIER_RANK), default='extractive',
+                            help='Best summarization tier the enrich stage may use')
+        parser.add_argument('--extract', action='store_true',
+                            help='Re-extract pages found in the HTML archive before enriching')
+        parser.add_argument('--commit', action='store_true',
+                            help='Keep the replayed articles (by default the replay is rolled back)')
+        parser.add_argument('--celery', action='store_true',
+                            help='Submit batches to the Celery stage queues instead of running stages in-process '
+                                 '(stores them for good, so it needs --commit)')
+        parser.add_argument('--json', action='store_true',
+                            help='Print the final report as JSON')
+
+    def handle(self, *args, **options):
+        if options['synthetic']:
+            articles = synthetic_articles(options['synthetic'], options['seed'], options['duplicate_rate'])
+        elif options['path']:
+            articles = read_jsonl(options['path'])
+        else:
+            raise CommandError("Give a JSONL path or --synthetic N")
+        if options['limit']:
+            articles = islice(articles, options['limit'])
+
+        if options['write']:
+            written = 0
+            with open(options['write'], 'w', encoding='utf-8') as f:
+                for article in articles:
+                    f.write(json.dumps(article) + '\n')
+                    written += 1
+            self.stdout.write(self.style.SUCCESS(f"✅ Wrote {written} articles to {options['write']}"))
+            return
+
+        batch_size = options['batch_size'] or getattr(settings, 'INGEST_STAGE_BATCH_SIZE', 50)
+        if options['celery']:
+            if not options['commit']:
+                raise CommandError("The Celery stage workers store what they are given; pass --commit with --celery")
+            report = self._submit(articles, batch_size, options['rate'])
+        else:
+            report = self._replay(articles, batch_size, options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self._print_report(report)
+        if not options['commit'] and not options['celery']:
+            self.stdout.write("Rolled back; pass --commit to keep the replayed articles")
+
+    def _replay(self, articles, batch_size, options):
+        """Run the stages in-process, rolled back unless --commit is given."""
+        try:
+            nlp_service = import_string(NLP_BACKENDS.get(options['nlp'], options['nlp']))()
+        except ImportError as e:
+            raise CommandError(f"Unknown NLP backend {options['nlp']}: {e}")
+        runner = ReplayRunner(nlp_service, batch_size=batch_size, rate=options['rate'],
+                              extract=options['extract'], max_tier=options['max_tier'],
+                              commit=options['commit'])
+        return runner.run(articles, progress=None if options['json'] else self._progress)
+
+    def _submit(self, articles, batch_size, rate):
+        """Feed batches into the real stage queues at the target rate."""
+        from aggregator.tasks import _submit_articles
+
+        started = time.monotonic()
+        read = queued = 0
+        for batch in chunked(articles, batch_size):
+            if rate:
+                delay = started + read / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            queued += _submit_articles(batch)
+            read += len(batch)
+        elapsed = time.monotonic() - started
+        self.stdout.write("Stage latencies are recorded by the workers; see api/metrics/ (pipeline.*)")
+        return {
+            'read': read,
+            'queued': queued,
+            'elapsed_s': round(elapsed, 3),
+            'articles_per_s': round(read / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def _progress(self, report):
+        self.stdout.write(f"  {report['read']} read, {report['created']} created, "
+                          f"{report['articles_per_s']} articles/s")
+
+    def _print_report(self, report):
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Replayed {report['read']} articles in {report['elapsed_s']}s "
+            f"({report['articles_per_s']} articles/s)"
+        ))
+        for key in ('new', 'created', 'queued'):
+            if key in report:
+                self.stdout.write(f"  {key}: {report[key]}")
+        for stage, stats in report.get('stages', {}).items():
+            self.stdout.write(
+                f"  {stage:<8} {stats['batches']} batches, mean {stats['mean_ms']}ms, p95 {stats['p95_ms']}ms, "
+                f"{stats['queries']} queries ({stats['queries_per_article']}/article)"
+            )
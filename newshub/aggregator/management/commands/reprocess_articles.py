@@ -0,0 +1,186 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from aggregator.extraction import extract_html
+from aggregator.html_archive import HTMLArchive
+from aggregator.models import ArchivedPage, Article
+from aggregator.services import NLPService
+
+CHECKPOINT_KEY = 'reprocess_articles:checkpoint:{summary_version}:{category_version}'
+
+# Per-process NLP service, created once by the pool initializer
+_worker_nlp = None
+
+
+def _init_worker():
+    global _worker_nlp
+    _worker_nlp = NLPService()
+
+
+def _worker_ready():
+    return _worker_nlp is not None
+
+
+def _reprocess_batch(rows, versions):
+    """
+    Recompute the stale NLP outputs for a batch of article rows.
+
+    Runs inside a pool worker and never touches the database; the parent
+    process writes the results back. Rows carrying archived 'html' are
+    re-extracted first and always re-summarized.
+    """
+    for row in rows:
+        if not row.get('html'):
+            continue
+        try:
+            text = extract_html(row['url'], row.pop('html'), getattr(settings, 'EXTRACTION_TIMEOUT', 20))['text']
+        except Exception:
+            continue
+        if text:
+            row['content'] = text[:5000]
+            row['reextracted'] = True
+
+    results = {}
+    for row in rows:
+        fields = results[row['id']] = {'id': row['id']}
+        if row.get('reextracted'):
+            fields['content'] = row['content']
+        if row.get('reextracted') or row['summary_version'] != versions['summary_version']:
+            # Classified below against the new summary, not the one it replaces
+            row['summary'] = fields['summary'] = _worker_nlp.generate_summary(row['content'])
+            fields['summary_version'] = versions['summary_version']
+
+    # Category, sentiment and urgency come from one batched pass over the stale rows
+    stale_heads = [row for row in rows if row['category_version'] != versions['category_version']]
+    enrichments = _worker_nlp.enrich_batch([{'title': row['title'], 'description': row['summary']}
+                                            for row in stale_heads])
+    for row, enrichment in zip(stale_heads, enrichments):
+        results[row['id']].update(enrichment, category_version=versions['category_version'])
+    return list(results.values())
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Re-run summarization and classification for articles enriched by an outdated NLP version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=64,
+                            help='Articles per worker task')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched per round trip from the server-side cursor')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after this many articles')
+        parser.add_argument('--reset', action='store_true',
+                            help='Ignore the saved checkpoint and start from the first stale article')
+        parser.add_argument('--reextract', action='store_true',
+                            help='Re-extract the text of every archived article from the HTML archive, '
+                                 'then re-summarize it')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the stale articles')
+
+    def handle(self, *args, **options):
+        versions = NLPService.get_versions()
+        checkpoint_key = CHECKPOINT_KEY.format(**versions)
+        if options['reextract']:
+            checkpoint_key += ':reextract'
+        last_id = 0 if options['reset'] else (cache.get(checkpoint_key) or 0)
+
+        if options['reextract']:
+            stale = Article.objects.filter(url_hash__in=ArchivedPage.objects.values('url_hash'))
+        else:
+            stale = Article.objects.filter(
+                ~Q(summary_version=versions['summary_version']) |
+                ~Q(category_version=versions['category_version'])
+            )
+
+        if options['dry_run']:
+            self.stdout.write(f"{stale.count()} stale articles "
+                              f"(summary {versions['summary_version']}, category {versions['category_version']})")
+            return
+
+        rows = stale.filter(id__gt=last_id).order_by('id').values(
+            'id', 'url', 'title', 'content', 'summary', 'summary_version', 'category_version'
+        ).iterator(chunk_size=options['chunk_size'])
+        if options['limit']:
+            rows = islice(rows, options['limit'])
+
+        if last_id:
+            self.stdout.write(f"Resuming after article {last_id}")
+
+        # Workers are forked from this process, so they must not inherit its DB sockets
+        connections.close_all()
+
+        processed = 0
+        max_in_flight = options['workers'] * 2
+
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            # Start the workers (and load their models) before the cursor opens a connection
+            pool.submit(_worker_ready).result()
+            started = time.monotonic()
+            pending = deque()
+            archive = HTMLArchive() if options['reextract'] else None
+            for batch in _batched(rows, options['batch_size']):
+                if archive:
+                    pages = archive.get_many(row['url'] for row in batch)
+                    for row in batch:
+                        row['html'] = pages.get(row['url'])
+                pending.append(pool.submit(_reprocess_batch, batch, versions))
+                # Results are applied in submission order so the checkpoint only moves forward
+                while len(pending) >= max_in_flight:
+                    processed += self._apply(pending.popleft().result(), checkpoint_key)
+                    self._report(processed, started)
+            while pending:
+                processed += self._apply(pending.popleft().result(), checkpoint_key)
+                self._report(processed, started)
+
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Reprocessed {processed} articles in {elapsed:.1f}s ({rate:.1f} articles/s)"
+        ))
+
+    def _apply(self, results, checkpoint_key):
+        """Write a batch of results back and advance the checkpoint."""
+        now = timezone.now()
+        articles = []
+        for fields in results:
+            article = Article(**fields)
+            article.enriched_at = now
+            articles.append(article)
+
+        # Group by the set of changed fields to keep each bulk_update narrow
+        groups = {}
+        for article, fields in zip(articles, results):
+            key = tuple(sorted(name for name in fields if name != 'id'))
+            groups.setdefault(key, []).append(article)
+        for field_names, group in groups.items():
+            Article.objects.bulk_update(group, list(field_names) + ['enriched_at'])
+
+        if results:
+            cache.set(checkpoint_key, results[-1]['id'], timeout=None)
+        return len(results)
+
+    def _report(self, processed, started):
+        elapsed = time.monotonic() - started
+        if processed and elapsed:
+            self.stdout.write(f"  {processed} articles, {processed / elapsed:.1f} articles/s")
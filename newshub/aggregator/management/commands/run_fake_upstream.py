@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from aggregator.fake_upstream import FakeUpstream, FaultProfile
+
+
+class Command(BaseCommand):
+    help = 'Serve a local fake NewsAPI and publisher sites from recorded responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+        parser.add_argument('--articles', type=int, default=0,
+                            help='Top the recorded articles up to this many with synthetic ones')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed for synthetic articles and injected faults')
+        for upstream in ('newsapi', 'publishers'):
+            parser.add_argument(f'--{upstream}-latency', type=float, default=0.0,
+                                help=f'Seconds added to every {upstream} response')
+            parser.add_argument(f'--{upstream}-jitter', type=float, default=0.0,
+                                help=f'Up to this many further seconds per {upstream} response')
+            parser.add_argument(f'--{upstream}-error-rate', type=float, default=0.0,
+                                help=f'Share of {upstream} requests answered with a 503')
+            parser.add_argument(f'--{upstream}-429-rate', type=float, default=0.0,
+                                help=f'Share of {upstream} requests answered with a 429')
+        parser.add_argument('--retry-after', type=int, default=1,
+                            help='Retry-After sent with each 429, in seconds')
+
+    def _profile(self, upstream, options):
+        return FaultProfile(
+            latency=options[f'{upstream}_latency'],
+            jitter=options[f'{upstream}_jitter'],
+            error_rate=options[f'{upstream}_error_rate'],
+            rate_limit_rate=options[f'{upstream}_429_rate'],
+            retry_after=options['retry_after'],
+        )
+
+    def handle(self, *args, **options):
+        upstream = FakeUpstream(
+            articles=options['articles'],
+            newsapi=self._profile('newsapi', options),
+            publishers=self._profile('publishers', options),
+            seed=options['seed'],
+            host=options['host'],
+            port=options['port'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Serving {len(upstream.articles)} articles at {upstream.base_url}"
+        ))
+        self.stdout.write(f"  Set NEWS_API_BASE_URL={upstream.newsapi_url} (any NEWS_API_KEY is accepted)")
+        try:
+            upstream.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            upstream.stop()
+            self.stdout.write(f"  Requests served: {dict(upstream.stats)}")
@@ -24,7 +24,7 @@ class Command(BaseCommand):
                 continue
 
             categories = TopicFollow.objects.filter(user=user).values_list('category', flat=True)
-            keyword_alerts = KeywordAlert.objects.filter(user=user).values_list('keyword', flat=True)
+            keyword_alerts = KeywordAlert.objects.filter(user=user, is_active=True).values_list('keyword', flat=True)
 
             articles = Article.objects.none()
             keyword_articles = Article.objects.none()
@@ -0,0 +1,80 @@
+"""
+Cluster-wide ingest metrics kept in Redis.
+
+Counters, gauges and timings from every worker and web process land in one
+Redis hash, so a snapshot shows the whole cluster. Recording a metric never
+raises: if Redis is unavailable the sample is dropped.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'newshub:metrics'
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def incr(name: str, amount: int = 1):
+    """Increment a counter."""
+    try:
+        _redis().hincrby(METRICS_KEY, name, amount)
+    except Exception as e:
+        logger.debug(f"Dropped metric {name}: {str(e)}")
+
+
+def set_gauge(name: str, value: float):
+    """Set a gauge to its current value."""
+    try:
+        _redis().hset(METRICS_KEY, name, value)
+    except Exception as e:
+        logger.debug(f"Dropped metric {name}: {str(e)}")
+
+
+def observe(name: str, seconds: float):
+    """Record a duration; the snapshot reports its count, total and mean."""
+    try:
+        pipe = _redis().pipeline()
+        pipe.hincrby(METRICS_KEY, f"{name}.count", 1)
+        pipe.hincrbyfloat(METRICS_KEY, f"{name}.sum", seconds)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"Dropped metric {name}: {str(e)}")
+
+
+@contextmanager
+def timer(name: str):
+    """Time the enclosed block and record it with observe()."""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        observe(name, time.monotonic() - started)
+
+
+def snapshot() -> Dict[str, float]:
+    """
+    Get every recorded metric, with a mean added for each timing.
+
+    Returns:
+        dict: Metric name to value
+    """
+    raw = _redis().hgetall(METRICS_KEY)
+    values = {key.decode(): float(value) for key, value in raw.items()}
+    for key in [k for k in values if k.endswith('.count')]:
+        name = key[:-len('.count')]
+        if values[key] and f"{name}.sum" in values:
+            values[f"{name}.mean"] = values[f"{name}.sum"] / values[key]
+    return dict(sorted(values.items()))
+
+
+def reset():
+    """Clear all recorded metrics."""
+    _redis().delete(METRICS_KEY)
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0007_alertclick'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='summary_version',
+            field=models.CharField(blank=True, db_index=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='category_version',
+            field=models.CharField(blank=True, db_index=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='enriched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
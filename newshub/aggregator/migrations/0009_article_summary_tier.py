@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0008_article_enrichment_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='summary_tier',
+            field=models.CharField(blank=True, choices=[('lead', 'Lead sentences'), ('extractive', 'Extractive'), ('abstractive', 'Abstractive')], db_index=True, max_length=16),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0009_article_summary_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='summary_state',
+            field=models.CharField(choices=[('placeholder', 'Placeholder'), ('complete', 'Complete')], db_index=True, default='complete', max_length=16),
+        ),
+    ]
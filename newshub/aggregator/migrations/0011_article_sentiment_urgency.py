@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0010_article_summary_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='sentiment',
+            field=models.CharField(blank=True, choices=[('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative')], max_length=16),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='sentiment_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='urgency_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0011_article_sentiment_urgency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=50)),
+                ('category', models.CharField(blank=True, max_length=50)),
+                ('query', models.CharField(blank=True, max_length=500)),
+                ('newest_published_at', models.DateTimeField(blank=True, null=True)),
+                ('seen_url_digests', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('endpoint', 'category', 'query')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations, models
+
+
+def merge_duplicate_urls(apps, schema_editor):
+    """Keep the oldest article per URL, moving bookmarks and alert clicks onto it."""
+    Article = apps.get_model('aggregator', 'Article')
+    Bookmark = apps.get_model('aggregator', 'Bookmark')
+    AlertClick = apps.get_model('aggregator', 'AlertClick')
+
+    duplicated = (
+        Article.objects.values('url')
+        .annotate(count=models.Count('id'), keep_id=models.Min('id'))
+        .filter(count__gt=1)
+    )
+    for row in duplicated.iterator():
+        duplicate_ids = list(
+            Article.objects.filter(url=row['url']).exclude(id=row['keep_id']).values_list('id', flat=True)
+        )
+        # A user may already have bookmarked the article being kept
+        kept_by = set(Bookmark.objects.filter(article_id=row['keep_id']).values_list('user_id', flat=True))
+        Bookmark.objects.filter(article_id__in=duplicate_ids, user_id__in=kept_by).delete()
+        for bookmark in Bookmark.objects.filter(article_id__in=duplicate_ids).order_by('id'):
+            if bookmark.user_id in kept_by:
+                bookmark.delete()
+            else:
+                kept_by.add(bookmark.user_id)
+                bookmark.article_id = row['keep_id']
+                bookmark.save(update_fields=['article'])
+        AlertClick.objects.filter(article_id__in=duplicate_ids).update(article_id=row['keep_id'])
+        Article.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+    # Each operation gets its own transaction: PostgreSQL refuses to alter a
+    # table with pending deferred FK checks from the merge in the same one
+    atomic = False
+
+    dependencies = [
+        ('aggregator', '0012_fetchstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_urls, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='article',
+            name='url',
+            field=models.URLField(unique=True),
+        ),
+    ]
@@ -0,0 +1,121 @@
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# A frozen copy of aggregator.canonical as of this migration, so later
+# changes to the live rules cannot change what this migration computes
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', 'ref_url', 'cmpid', 'ito', 'ncid', 'sr_share', 'smid',
+    'amp', 'outputtype',
+}
+TRACKING_PREFIXES = ('utm_', 'at_', 'pk_', '__twitter')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+AMP_PATH = re.compile(r'/amp(?:\.html)?/?$', re.IGNORECASE)
+
+
+def canonicalize_url(url):
+    url = (url or '').strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower() or 'http'
+
+    host = (parts.hostname or '').lower()
+    if host.startswith('amp.'):
+        host = host[len('amp.'):]
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = AMP_PATH.sub('', parts.path) or '/'
+    path = re.sub(r'/{2,}', '/', path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PREFIXES)
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def url_hash(url):
+    return hashlib.sha256(canonicalize_url(url).encode('utf-8')).hexdigest()
+
+
+def backfill_url_hash(apps, schema_editor):
+    """Hash every article's canonical URL, in id-ordered batches."""
+    Article = apps.get_model('aggregator', 'Article')
+    last_id = 0
+    while True:
+        batch = list(
+            Article.objects.filter(id__gt=last_id, url_hash__isnull=True)
+            .order_by('id').only('id', 'url')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for article in batch:
+            article.url_hash = url_hash(article.url)
+        Article.objects.bulk_update(batch, ['url_hash'])
+        last_id = batch[-1].id
+
+
+def merge_canonical_duplicates(apps, schema_editor):
+    """Keep the oldest article per canonical URL, moving bookmarks and alert clicks onto it."""
+    Article = apps.get_model('aggregator', 'Article')
+    Bookmark = apps.get_model('aggregator', 'Bookmark')
+    AlertClick = apps.get_model('aggregator', 'AlertClick')
+
+    duplicated = (
+        Article.objects.values('url_hash')
+        .annotate(count=models.Count('id'), keep_id=models.Min('id'))
+        .filter(count__gt=1)
+    )
+    for row in duplicated.iterator():
+        duplicate_ids = list(
+            Article.objects.filter(url_hash=row['url_hash']).exclude(id=row['keep_id'])
+            .values_list('id', flat=True)
+        )
+        kept_by = set(Bookmark.objects.filter(article_id=row['keep_id']).values_list('user_id', flat=True))
+        for bookmark in Bookmark.objects.filter(article_id__in=duplicate_ids).order_by('id'):
+            if bookmark.user_id in kept_by:
+                bookmark.delete()
+            else:
+                kept_by.add(bookmark.user_id)
+                bookmark.article_id = row['keep_id']
+                bookmark.save(update_fields=['article'])
+        AlertClick.objects.filter(article_id__in=duplicate_ids).update(article_id=row['keep_id'])
+        Article.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+    # Batches commit as they go, and PostgreSQL refuses to alter a table with
+    # pending deferred FK checks from the merge in the same transaction
+    atomic = False
+
+    dependencies = [
+        ('aggregator', '0013_article_url_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='url_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_url_hash, migrations.RunPython.noop),
+        migrations.RunPython(merge_canonical_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='article',
+            name='url_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        # url_hash is the dedup key now; url itself no longer needs an index
+        migrations.AlterField(
+            model_name='article',
+            name='url',
+            field=models.URLField(),
+        ),
+    ]
@@ -0,0 +1,32 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0015_feedsource'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebSubSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hub_url', models.URLField()),
+                ('topic_url', models.URLField()),
+                ('token', models.CharField(max_length=64, unique=True)),
+                ('secret', models.CharField(max_length=64)),
+                ('state', models.CharField(choices=[('pending', 'Pending verification'), ('verified', 'Verified'), ('denied', 'Denied by hub'), ('unsubscribed', 'Unsubscribed')], db_index=True, default='pending', max_length=16)),
+                ('lease_seconds', models.PositiveIntegerField(blank=True, null=True)),
+                ('lease_expires_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('requested_at', models.DateTimeField(blank=True, null=True)),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+                ('last_delivery_at', models.DateTimeField(blank=True, null=True)),
+                ('feed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='websub_subscriptions', to='aggregator.feedsource')),
+            ],
+            options={
+                'unique_together': {('hub_url', 'topic_url')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0016_websubsubscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=64, unique=True)),
+                ('url', models.URLField(max_length=2000)),
+                ('segment', models.PositiveIntegerField(db_index=True)),
+                ('offset', models.BigIntegerField()),
+                ('length', models.PositiveIntegerField(help_text='Compressed bytes')),
+                ('size', models.PositiveIntegerField(help_text='Uncompressed bytes')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
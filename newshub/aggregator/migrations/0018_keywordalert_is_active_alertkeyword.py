@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0017_archivedpage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='keywordalert',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.CreateModel(
+            name='AlertKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=50, unique=True)),
+                ('recent_hits', models.FloatField(default=0)),
+                ('hits_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('last_queried_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def schedule_feeds(apps, schema_editor):
+    """Carry each feed's learned interval and next poll time over to its PollSchedule entry."""
+    FeedSource = apps.get_model('aggregator', 'FeedSource')
+    PollSchedule = apps.get_model('aggregator', 'PollSchedule')
+    PollSchedule.objects.bulk_create([
+        PollSchedule(
+            kind='feed',
+            target=str(feed.pk),
+            feed=feed,
+            interval=feed.poll_interval,
+            new_items_ewma=feed.last_new_entries,
+            next_poll_at=feed.next_poll_at,
+            last_polled_at=feed.last_polled_at,
+            last_new_items=feed.last_new_entries,
+            consecutive_failures=feed.consecutive_failures,
+        )
+        for feed in FeedSource.objects.all()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0018_keywordalert_is_active_alertkeyword'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('category', 'NewsAPI category'), ('query', 'NewsAPI query'), ('feed', 'RSS/Atom feed'), ('alerts', 'Keyword alert queries')], max_length=16)),
+                ('target', models.CharField(blank=True, help_text='Category, query or feed id', max_length=500)),
+                ('is_active', models.BooleanField(default=True)),
+                ('interval', models.PositiveIntegerField(default=900, help_text='Seconds between polls')),
+                ('new_items_ewma', models.FloatField(default=0, help_text='Smoothed new items per poll')),
+                ('next_poll_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_polled_at', models.DateTimeField(blank=True, null=True)),
+                ('last_new_items', models.PositiveIntegerField(default=0)),
+                ('consecutive_failures', models.PositiveIntegerField(default=0)),
+                ('lease_token', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('feed', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='poll_schedule', to='aggregator.feedsource')),
+            ],
+            options={
+                'unique_together': {('kind', 'target')},
+            },
+        ),
+        migrations.RunPython(schedule_feeds, migrations.RunPython.noop),
+        migrations.RemoveField(model_name='feedsource', name='poll_interval'),
+        migrations.RemoveField(model_name='feedsource', name='next_poll_at'),
+        migrations.RemoveField(model_name='feedsource', name='last_polled_at'),
+        migrations.RemoveField(model_name='feedsource', name='last_new_entries'),
+        migrations.RemoveField(model_name='feedsource', name='consecutive_failures'),
+    ]
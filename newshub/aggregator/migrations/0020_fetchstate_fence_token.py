@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0019_pollschedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fetchstate',
+            name='fence_token',
+            field=models.BigIntegerField(default=0, help_text='Fencing token of the newest fetch lease that wrote this'),
+        ),
+    ]
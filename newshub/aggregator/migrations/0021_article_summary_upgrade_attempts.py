@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0020_fetchstate_fence_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='summary_upgrade_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0021_article_summary_upgrade_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fetchstate',
+            name='pending_urls',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
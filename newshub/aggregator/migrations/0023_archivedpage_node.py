@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0022_fetchstate_pending_urls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpage',
+            name='node',
+            field=models.CharField(blank=True, default='', help_text='Node whose segment holds the page',
+                                   max_length=255),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+def copy_last_queried(apps, schema_editor):
+    AlertKeyword = apps.get_model('aggregator', 'AlertKeyword')
+    AlertKeyword.objects.update(covered_until=models.F('last_queried_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aggregator', '0023_archivedpage_node'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alertkeyword',
+            name='covered_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_last_queried, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,71 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .canonical import url_hash
+from .seen_filter import remember_urls
 
 class Article(models.Model):
+    SUMMARY_TIER_CHOICES = [
+        ('lead', 'Lead sentences'),
+        ('extractive', 'Extractive'),
+        ('abstractive', 'Abstractive'),
+    ]
+    SUMMARY_STATE_CHOICES = [
+        ('placeholder', 'Placeholder'),
+        ('complete', 'Complete'),
+    ]
+    SENTIMENT_CHOICES = [
+        ('positive', 'Positive'),
+        ('neutral', 'Neutral'),
+        ('negative', 'Negative'),
+    ]
+
     title = models.CharField(max_length=300)
     url = models.URLField()
+    # SHA-256 of the canonical URL; the dedup key for ingest (see canonical.py)
+    url_hash = models.CharField(max_length=64, unique=True, editable=False)
     source = models.CharField(max_length=100)
     published_at = models.DateTimeField()
     content = models.TextField()
     summary = models.TextField(blank=True)
     category = models.CharField(max_length=50)
     image_url = models.URLField(blank=True, null=True)
+    sentiment = models.CharField(max_length=16, choices=SENTIMENT_CHOICES, blank=True)
+    sentiment_score = models.FloatField(blank=True, null=True)
+    urgency_score = models.FloatField(blank=True, null=True)
+
+    # Versions of the NLP outputs stored on the row (see NLPService.get_versions)
+    summary_version = models.CharField(max_length=16, blank=True, db_index=True)
+    category_version = models.CharField(max_length=16, blank=True, db_index=True)
+    enriched_at = models.DateTimeField(blank=True, null=True)
+    summary_tier = models.CharField(max_length=16, choices=SUMMARY_TIER_CHOICES, blank=True, db_index=True)
+    summary_state = models.CharField(max_length=16, choices=SUMMARY_STATE_CHOICES, default='complete', db_index=True)
+    # Upgrade attempts that did not reach a better tier (see upgrade_summaries_task)
+    summary_upgrade_attempts = models.PositiveSmallIntegerField(default=0)
+
+    def save(self, *args, **kwargs):
+        # Recomputed on every save, so an edited URL never keeps its old hash
+        previous_hash, self.url_hash = self.url_hash, url_hash(self.url)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'url' in update_fields and 'url_hash' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'url_hash']
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        # Articles saved outside bulk_upsert_articles (the admin, scripts) are
+        # screened by the seen-URL filter too
+        if adding or self.url_hash != previous_hash:
+            digest = self.url_hash
+            transaction.on_commit(lambda: remember_urls([digest]))
+
+    @classmethod
+    def for_url(cls, url):
+        """Articles stored under any tracking or AMP variant of a URL (an index probe)."""
+        return cls.objects.filter(url_hash=url_hash(url))
 
     def __str__(self):
         return self.title
@@ -56,6 +112,7 @@ class UserPreference(models.Model):
 class KeywordAlert(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     keyword = models.CharField(max_length=50)
+    is_active = models.BooleanField(default=True)
 
     class Meta:
         unique_together = ('user', 'keyword')
@@ -64,6 +121,34 @@ class KeywordAlert(models.Model):
         return f"{self.user.username} alerts on '{self.keyword}'"
 
 
+class AlertKeyword(models.Model):
+    """
+    Query-planning state for one distinct keyword across all KeywordAlerts.
+
+    `recent_hits` counts articles that matched the keyword, decaying with a
+    half-life of ALERT_HIT_HALF_LIFE_DAYS, and `last_queried_at` is when it was
+    last part of an /everything query (see aggregator.query_planner).
+    `covered_until` is when the last query that read all of its results was
+    sent; later queries ask for articles from there on.
+    """
+    keyword = models.CharField(max_length=50, unique=True)
+    recent_hits = models.FloatField(default=0)
+    hits_updated_at = models.DateTimeField(blank=True, null=True)
+    last_queried_at = models.DateTimeField(blank=True, null=True)
+    covered_until = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return self.keyword
+
+    def decayed_hits(self, now=None):
+        """Recent hits decayed to `now`."""
+        if not self.hits_updated_at:
+            return self.recent_hits
+        half_life = getattr(settings, 'ALERT_HIT_HALF_LIFE_DAYS', 7)
+        days = max(((now or timezone.now()) - self.hits_updated_at).total_seconds(), 0) / 86400
+        return self.recent_hits * 0.5 ** (days / half_life)
+
+
 class AlertClick(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     article = models.ForeignKey(Article, on_delete=models.CASCADE)
@@ -72,3 +157,332 @@ class AlertClick(models.Model):
 
     def __str__(self):
         return f"{self.user.username} clicked '{self.keyword}' at {self.clicked_at}"
+
+
+class FetchState(models.Model):
+    """
+    High-water mark for one NewsAPI request shape (endpoint, category, query).
+
+    Stores the newest publishedAt seen and digests of the most recent URLs, so
+    the next fetch can ask only for newer articles and stop paginating as soon
+    as a page holds nothing new.
+    """
+    endpoint = models.CharField(max_length=50)
+    category = models.CharField(max_length=50, blank=True)
+    query = models.CharField(max_length=500, blank=True)
+    newest_published_at = models.DateTimeField(blank=True, null=True)
+    seen_url_digests = models.JSONField(default=list, blank=True)
+    # url digest -> [publishedAt, queued at, attempts] for fetched articles not stored yet
+    pending_urls = models.JSONField(default=dict, blank=True)
+    fence_token = models.BigIntegerField(default=0, help_text='Fencing token of the newest fetch lease that wrote this')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('endpoint', 'category', 'query')
+
+    def __str__(self):
+        return f"{self.endpoint} {self.category or self.query or 'all'} @ {self.newest_published_at}"
+
+    @classmethod
+    def for_request(cls, endpoint, category=None, query=None):
+        state, _ = cls.objects.get_or_create(endpoint=endpoint, category=category or '', query=query or '')
+        return state
+
+    @staticmethod
+    def url_digest(url):
+        return url_hash(url)[:16]
+
+    @property
+    def cutoff(self):
+        """Articles published before this are treated as already fetched."""
+        if not self.newest_published_at:
+            return None
+        overlap = getattr(settings, 'FETCH_STATE_OVERLAP_MINUTES', 30)
+        cutoff = self.newest_published_at - timedelta(minutes=overlap)
+        # Never move past an article that has not been stored yet
+        pending = [parse_datetime(published or '') for published, _, _ in self.pending_urls.values()]
+        floor = min((p for p in pending if p), default=None)
+        return min(cutoff, floor) if floor else cutoff
+
+    def _in_flight(self, digest, now):
+        """Whether a queued article is still within its time to reach the database."""
+        entry = self.pending_urls.get(digest)
+        if not entry:
+            return False
+        ttl = getattr(settings, 'FETCH_STATE_PENDING_SECONDS', 3600)
+        queued_at = parse_datetime(entry[1])
+        return bool(queued_at and queued_at > now - timedelta(seconds=ttl))
+
+    def is_known(self, article_data):
+        """Check whether a NewsAPI article was already seen by an earlier fetch."""
+        digest = self.url_digest(article_data.get('url') or '')
+        if digest in set(self.seen_url_digests) or self._in_flight(digest, timezone.now()):
+            return True
+        published_at = parse_datetime(article_data.get('publishedAt') or '')
+        return bool(self.cutoff and published_at and published_at < self.cutoff)
+
+    def _mark_stored(self, articles):
+        published = [parse_datetime(a.get('publishedAt') or '') for a in articles]
+        newest = max((p for p in published if p), default=None)
+        if newest and (not self.newest_published_at or newest > self.newest_published_at):
+            self.newest_published_at = newest
+
+        limit = getattr(settings, 'FETCH_STATE_SEEN_URLS', 1000)
+        digests = [self.url_digest(a['url']) for a in articles if a.get('url')]
+        self.seen_url_digests = list(dict.fromkeys(digests + self.seen_url_digests))[:limit]
+        for digest in digests:
+            self.pending_urls.pop(digest, None)
+
+    def _mark_queued(self, articles, now):
+        ttl = timedelta(seconds=getattr(settings, 'FETCH_STATE_PENDING_SECONDS', 3600))
+        max_attempts = getattr(settings, 'FETCH_STATE_PENDING_ATTEMPTS', 3)
+        for article in articles:
+            if not article.get('url'):
+                continue
+            digest = self.url_digest(article['url'])
+            entry = self.pending_urls.get(digest)
+            if entry and self._in_flight(digest, now):
+                continue
+            attempts = entry[2] + 1 if entry else 1
+            self.pending_urls[digest] = [article.get('publishedAt') or '', now.isoformat(), attempts]
+
+        # Give up on articles that never made it to the database after their
+        # last attempt, so one broken article cannot hold the cutoff forever
+        for digest, (_, queued_at, attempts) in list(self.pending_urls.items()):
+            queued = parse_datetime(queued_at)
+            if attempts >= max_attempts and (not queued or queued <= now - ttl):
+                del self.pending_urls[digest]
+
+    def advance(self, articles, queued=(), fence=None):
+        """
+        Record a fetch in the high-water mark.
+
+        The mark only moves past articles that are already stored. Articles
+        handed to the ingest pipeline are held as pending: they count as known
+        while in flight, and keep the cutoff below them until confirm() records
+        them as stored. One that has not arrived within
+        FETCH_STATE_PENDING_SECONDS is fetched again, up to
+        FETCH_STATE_PENDING_ATTEMPTS times.
+
+        Args:
+            articles: Fetched NewsAPI articles that are already stored
+            queued: Fetched NewsAPI articles queued for ingest
+            fence: Fencing token of the fetch lease the batch was fetched
+                under; the write is rejected if a newer lease already wrote
+
+        Returns:
+            False if the write was fenced off
+        """
+        if not articles and not queued:
+            return True
+        with transaction.atomic():
+            # Locked so a concurrent confirm() from the pipeline is not overwritten
+            state = FetchState.objects.select_for_update().get(pk=self.pk)
+            if fence is not None and state.fence_token > fence:
+                return False
+            state._mark_stored(articles)
+            state._mark_queued(queued, timezone.now())
+            if fence is not None:
+                state.fence_token = fence
+            state.save(update_fields=['newest_published_at', 'seen_url_digests', 'pending_urls',
+                                      'fence_token', 'updated_at'])
+        self.newest_published_at = state.newest_published_at
+        self.seen_url_digests = state.seen_url_digests
+        self.pending_urls = state.pending_urls
+        self.fence_token = state.fence_token
+        return True
+
+    @classmethod
+    def confirm(cls, state_id, articles):
+        """
+        Record queued articles as stored, moving the high-water mark past them.
+
+        Args:
+            state_id: Primary key of the FetchState the articles were fetched for
+            articles: NewsAPI articles now in the database
+        """
+        if not articles:
+            return
+        with transaction.atomic():
+            state = cls.objects.select_for_update().filter(pk=state_id).first()
+            if state is None:
+                return
+            state._mark_stored(articles)
+            state.save(update_fields=['newest_published_at', 'seen_url_digests', 'pending_urls', 'updated_at'])
+
+
+class FeedSource(models.Model):
+    """
+    A publisher RSS/Atom feed polled alongside NewsAPI.
+
+    Keeps the validators for conditional GETs; when the feed is polled is
+    decided by its PollSchedule entry.
+    """
+    name = models.CharField(max_length=100)
+    url = models.URLField(unique=True)
+    category = models.CharField(max_length=50, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    newest_entry_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PollSchedule(models.Model):
+    """
+    An entry in the ingestion poll queue: a NewsAPI category or query, a
+    feed, or the keyword-alert query planner.
+
+    Entries are taken in next_poll_at order by workers that hold a lease on
+    them while polling (see aggregator.scheduler). Each poll updates an EWMA
+    of the new items it found, and the interval moves so that a poll finds
+    about POLL_TARGET_NEW_ITEMS, within the bounds for the entry's kind.
+    """
+    KIND_CATEGORY = 'category'
+    KIND_QUERY = 'query'
+    KIND_FEED = 'feed'
+    KIND_ALERTS = 'alerts'
+    KIND_CHOICES = [
+        (KIND_CATEGORY, 'NewsAPI category'),
+        (KIND_QUERY, 'NewsAPI query'),
+        (KIND_FEED, 'RSS/Atom feed'),
+        (KIND_ALERTS, 'Keyword alert queries'),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    target = models.CharField(max_length=500, blank=True, help_text='Category, query or feed id')
+    feed = models.OneToOneField(FeedSource, on_delete=models.CASCADE, blank=True, null=True,
+                                related_name='poll_schedule')
+    is_active = models.BooleanField(default=True)
+
+    interval = models.PositiveIntegerField(default=900, help_text='Seconds between polls')
+    new_items_ewma = models.FloatField(default=0, help_text='Smoothed new items per poll')
+    next_poll_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_polled_at = models.DateTimeField(blank=True, null=True)
+    last_new_items = models.PositiveIntegerField(default=0)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+
+    lease_token = models.CharField(max_length=32, blank=True, db_index=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('kind', 'target')
+
+    def __str__(self):
+        return f"{self.kind} {self.feed or self.target or 'all'} @ {self.next_poll_at}"
+
+    def bounds(self):
+        """(min, max) seconds between polls for this entry's kind."""
+        defaults = {
+            self.KIND_CATEGORY: (120, 60 * 60 * 3),
+            self.KIND_QUERY: (300, 60 * 60 * 6),
+            self.KIND_FEED: (getattr(settings, 'FEED_MIN_INTERVAL', 60),
+                             getattr(settings, 'FEED_MAX_INTERVAL', 60 * 60 * 6)),
+        }
+        # The alert planner spreads its budget over runs, so it keeps a fixed interval
+        alert_interval = getattr(settings, 'ALERT_QUERY_INTERVAL', 15) * 60
+        defaults[self.KIND_ALERTS] = (alert_interval, alert_interval)
+        return getattr(settings, 'POLL_INTERVAL_BOUNDS', {}).get(self.kind, defaults[self.kind])
+
+    def record_poll(self, new_items=0, failed=False, backstop=False, now=None):
+        """
+        Set the next poll time from the outcome of this poll.
+
+        The EWMA of new items per poll is compared with POLL_TARGET_NEW_ITEMS:
+        the interval shrinks when polls find more than the target and grows
+        when they find less, by at most a factor of two per poll. Failures
+        back off exponentially without touching the learned interval.
+
+        Args:
+            new_items: Items this poll found that earlier polls had not
+            failed: The poll failed
+            backstop: Only a safety-net poll is needed (e.g. the feed pushes
+                via WebSub), so wait the maximum interval
+            now: Time of the poll
+        """
+        min_interval, max_interval = self.bounds()
+        now = now or timezone.now()
+
+        if failed:
+            self.consecutive_failures += 1
+            delay = self.interval * (2 ** min(self.consecutive_failures, 6))
+        else:
+            alpha = getattr(settings, 'POLL_EWMA_ALPHA', 0.3)
+            target = getattr(settings, 'POLL_TARGET_NEW_ITEMS', 5)
+            if self.last_polled_at is None:
+                self.new_items_ewma = float(new_items)
+            else:
+                self.new_items_ewma = alpha * new_items + (1 - alpha) * self.new_items_ewma
+            factor = target / self.new_items_ewma if self.new_items_ewma > 0 else 2.0
+            self.interval = int(self.interval * min(max(factor, 0.5), 2.0))
+            self.consecutive_failures = 0
+            self.last_new_items = new_items
+            delay = self.interval
+
+        self.interval = min(max(self.interval, min_interval), max_interval)
+        if backstop:
+            delay = max_interval
+        self.last_polled_at = now
+        self.next_poll_at = now + timedelta(seconds=min(max(delay, min_interval), max_interval))
+
+
+class WebSubSubscription(models.Model):
+    """
+    A WebSub (PubSubHubbub) subscription to a feed's hub.
+
+    The hub pushes new entries to the callback identified by `token`; the
+    lease is renewed by `renew_websub_leases_task` before it expires.
+    """
+    STATE_CHOICES = [
+        ('pending', 'Pending verification'),
+        ('verified', 'Verified'),
+        ('denied', 'Denied by hub'),
+        ('unsubscribed', 'Unsubscribed'),
+    ]
+
+    feed = models.ForeignKey(FeedSource, on_delete=models.CASCADE, related_name='websub_subscriptions')
+    hub_url = models.URLField()
+    topic_url = models.URLField()
+    token = models.CharField(max_length=64, unique=True)
+    secret = models.CharField(max_length=64)
+    state = models.CharField(max_length=16, choices=STATE_CHOICES, default='pending', db_index=True)
+    lease_seconds = models.PositiveIntegerField(blank=True, null=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    requested_at = models.DateTimeField(blank=True, null=True)
+    verified_at = models.DateTimeField(blank=True, null=True)
+    last_delivery_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ('hub_url', 'topic_url')
+
+    def __str__(self):
+        return f"{self.topic_url} via {self.hub_url} ({self.state})"
+
+    @property
+    def is_active(self):
+        return self.state == 'verified' and bool(self.lease_expires_at and self.lease_expires_at > timezone.now())
+
+
+class ArchivedPage(models.Model):
+    """
+    Index entry for a downloaded article page in the raw-HTML archive.
+
+    The page itself is a zstd frame at `offset` in an append-only segment file
+    written by `node` (see aggregator.html_archive); rows are removed with
+    their segment when that node trims its archive to the size limit.
+    """
+    url_hash = models.CharField(max_length=64, unique=True)
+    url = models.URLField(max_length=2000)
+    node = models.CharField(max_length=255, blank=True, default='',
+                            help_text='Node whose segment holds the page')
+    segment = models.PositiveIntegerField(db_index=True)
+    offset = models.BigIntegerField()
+    length = models.PositiveIntegerField(help_text='Compressed bytes')
+    size = models.PositiveIntegerField(help_text='Uncompressed bytes')
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.url} (segment {self.node}/{self.segment})"
@@ -0,0 +1,207 @@
+"""
+Staged ingestion pipeline.
+
+Ingestion runs as fetch -> extract -> enrich -> persist -> alerts, each stage a
+Celery task routed to its own queue (settings.CELERY_TASK_ROUTES), so NLP
+workers scale separately from the I/O-bound fetch and extract workers and a
+failure only retries its own stage.
+
+Stages hand work on as batch ids: a batch of article dicts is parked in Redis
+by StagingStore and only its id travels through the broker. Persist hands the
+alerts stage the ids of the articles it created. Before doing any work a
+stage checks the depth of the queue it feeds; if that queue is over its limit
+the task re-queues itself with a delay instead, so a slow stage holds back
+the ones upstream of it rather than piling up messages.
+"""
+
+import json
+import logging
+import uuid
+import zlib
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from celery import current_app
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('fetch', 'extract', 'enrich', 'persist', 'alerts')
+
+# Messages a stage's queue may hold before the stage feeding it backs off
+DEFAULT_MAX_DEPTHS = {
+    'extract': 50,
+    'enrich': 20,
+    'persist': 50,
+    'alerts': 200,
+}
+
+
+def stage_queue(stage: str) -> str:
+    """Name of the Celery queue a stage's tasks are routed to."""
+    return f"ingest.{stage}"
+
+
+def queue_depth(queue_name: str = 'celery') -> int:
+    """
+    Get the number of messages waiting in a Celery queue.
+    """
+    with current_app.connection_or_acquire() as conn:
+        return conn.default_channel.queue_declare(queue=queue_name, passive=True).message_count
+
+
+def is_backlogged(stage: str) -> bool:
+    """
+    Check whether a stage's queue is over its depth limit.
+
+    The depth is recorded as a gauge on every check. If the broker cannot be
+    asked, the stage is treated as having room.
+
+    Args:
+        stage: Stage name, e.g. 'enrich'
+
+    Returns:
+        True if upstream stages should hold off feeding it
+    """
+    limit = {**DEFAULT_MAX_DEPTHS, **getattr(settings, 'INGEST_STAGE_MAX_DEPTH', {})}.get(stage)
+    if limit is None:
+        return False
+    try:
+        depth = queue_depth(stage_queue(stage))
+    except Exception as e:
+        logger.debug(f"Could not read depth of {stage_queue(stage)}: {str(e)}")
+        return False
+    metrics.set_gauge(f"pipeline.{stage}.depth", depth)
+    return depth > limit
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Split items into lists of at most `size`."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class StagingStore:
+    """
+    Redis store for batches in flight between pipeline stages.
+
+    Batches are stored zlib-compressed under a random id and expire after
+    settings.INGEST_STAGING_TTL, so a batch whose stage keeps failing does not
+    linger once its retries are exhausted.
+    """
+
+    KEY_PREFIX = 'newshub:stage'
+
+    def __init__(self, redis=None, ttl: int = None):
+        """
+        Initialize the store.
+
+        Args:
+            redis: Redis client (defaults to the django_redis 'default' connection)
+            ttl: Seconds a batch is kept (defaults to settings.INGEST_STAGING_TTL)
+        """
+        if redis is None:
+            from django_redis import get_redis_connection
+            redis = get_redis_connection('default')
+        self.redis = redis
+        self.ttl = ttl or getattr(settings, 'INGEST_STAGING_TTL', 60 * 60 * 6)
+
+    def _key(self, batch_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{batch_id}"
+
+    def put(self, items: List[Dict]) -> str:
+        """Store a batch and return its id."""
+        batch_id = uuid.uuid4().hex
+        payload = zlib.compress(json.dumps(items, default=str).encode('utf-8'))
+        self.redis.set(self._key(batch_id), payload, ex=self.ttl)
+        return batch_id
+
+    def get(self, batch_id: str) -> Optional[List[Dict]]:
+        """Load a batch, or None if it expired or was already consumed."""
+        payload = self.redis.get(self._key(batch_id))
+        if payload is None:
+            return None
+        return json.loads(zlib.decompress(payload))
+
+    def delete(self, batch_id: str):
+        self.redis.delete(self._key(batch_id))
+
+
+def extract_full_text(articles: List[Dict]) -> List[Dict]:
+    """
+    Download each article's page and replace its content with the extracted text.
+
+    Pages already in the HTML archive are read from it instead of downloaded,
+    and downloaded pages are added to it. Articles whose download or
+    extraction fails keep the content they came with; the top image fills in
+    a missing urlToImage.
+
+    Extraction runs in this process, one page at a time while the downloader
+    threads fetch the next ones. Stage tasks run in Celery's prefork children,
+    which may not start processes of their own, and the ingest.extract
+    worker's concurrency already bounds how many pages are parsed at once.
+    Each page has the soft timeout of extract_html.
+
+    Args:
+        articles: NewsAPI-shaped article dicts
+
+    Returns:
+        The same dicts, updated in place
+    """
+    from .downloader import ArticleDownloader
+    from .extraction import extract_html
+    from .html_archive import archive_pages, archived_pages
+
+    by_url = {article['url']: article for article in articles}
+    archived = archived_pages(by_url)
+    downloader = ArticleDownloader()
+    timeout = getattr(settings, 'EXTRACTION_TIMEOUT', 20)
+    downloaded = []
+    extraction_failed = 0
+
+    def pages():
+        yield from archived.items()
+        for url, html, error in downloader.iter_downloads(url for url in by_url if url not in archived):
+            if not error:
+                downloaded.append((url, html))
+                yield url, html
+
+    for url, html in pages():
+        try:
+            extracted = extract_html(url, html, timeout)
+        except Exception as e:
+            logger.warning(f"Could not extract {url}: {str(e) or type(e).__name__}")
+            extraction_failed += 1
+            continue
+        article = by_url[url]
+        if extracted.get('text'):
+            article['content'] = extracted['text'][:5000]
+        article['urlToImage'] = article.get('urlToImage') or extracted.get('top_image') or None
+
+    archive_pages(downloaded)
+    metrics.incr('pipeline.extract.archived', len(archived))
+    metrics.incr('pipeline.extract.downloaded', downloader.stats['downloaded'])
+    metrics.incr('pipeline.extract.failed', downloader.stats['failed'] + extraction_failed)
+    return articles
+
+
+def stage_depths() -> Dict[str, Optional[int]]:
+    """
+    Get the current depth of every stage queue.
+
+    Returns:
+        dict: Stage name to queue depth (None if the broker could not be asked)
+    """
+    depths = {}
+    for stage in STAGES:
+        try:
+            depths[stage] = queue_depth(stage_queue(stage))
+        except Exception:
+            depths[stage] = None
+    return depths
@@ -0,0 +1,300 @@
+"""
+NewsAPI query planning for keyword alerts.
+
+Keyword alerts only fire on articles we ingest, and top headlines rarely
+mention niche keywords. The planner collects the distinct keywords of active
+alerts and packs them into /everything OR-queries of at most
+ALERT_QUERY_MAX_LENGTH characters, so the number of API calls grows with the
+total length of the keywords rather than their count.
+
+Keywords are ranked by subscriber count and recent hit rate, weighted up the
+longer they go unqueried, and packed in that order, so the first queries
+cover the keywords that matter most. Each run only sends as many queries as
+its share of the remaining daily NewsAPI budget allows (see
+AlertQueryPlanner.budget); the rest wait for a later run.
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import AlertKeyword, KeywordAlert
+from .rate_limiter import PRIORITY_DEFAULT
+
+logger = logging.getLogger(__name__)
+
+# NewsAPI rejects q values longer than this
+MAX_QUERY_LENGTH = 500
+OR_SEPARATOR = ' OR '
+
+# Cap on how much staleness can boost a keyword, in hours
+MAX_STALENESS_HOURS = 24
+
+ALLOWANCE_CACHE_KEY = 'alert_query_planner:allowance'
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Lowercase a keyword and collapse its whitespace."""
+    return ' '.join(keyword.lower().split())
+
+
+def query_term(keyword: str) -> str:
+    """Quote a keyword as an exact-match NewsAPI search term."""
+    return '"' + keyword.replace('"', '') + '"'
+
+
+def build_query(keywords: Iterable[str]) -> str:
+    """Join keywords into one NewsAPI OR-query."""
+    return OR_SEPARATOR.join(query_term(keyword) for keyword in keywords)
+
+
+def pack_queries(keywords: Iterable[str], max_length: int = MAX_QUERY_LENGTH) -> List[List[str]]:
+    """
+    Pack keywords into as few OR-queries as the length limit allows.
+
+    Keywords are placed first-fit in the order given, so earlier (higher
+    ranked) keywords end up in earlier queries.
+
+    Args:
+        keywords: Normalized keywords, most important first
+        max_length: Longest query string allowed
+
+    Returns:
+        Lists of keywords, one per query
+    """
+    packs = []
+    lengths = []
+    for keyword in keywords:
+        term_length = len(query_term(keyword))
+        if term_length > max_length:
+            logger.warning(f"Alert keyword too long for a NewsAPI query: {keyword}")
+            continue
+        for index, length in enumerate(lengths):
+            if length + len(OR_SEPARATOR) + term_length <= max_length:
+                packs[index].append(keyword)
+                lengths[index] = length + len(OR_SEPARATOR) + term_length
+                break
+        else:
+            packs.append([keyword])
+            lengths.append(term_length)
+    return packs
+
+
+@dataclass
+class PlannedQuery:
+    """An /everything OR-query and the keywords it covers."""
+    keywords: List[str]
+    priority: float = 0.0
+    subscribers: int = 0
+
+    @property
+    def query(self) -> str:
+        return build_query(self.keywords)
+
+
+@dataclass
+class KeywordRank:
+    """A distinct alert keyword with its ranking inputs."""
+    keyword: str
+    subscribers: int
+    recent_hits: float = 0.0
+    last_queried_at: Optional[datetime] = None
+    priority: float = 0.0
+
+
+class AlertQueryPlanner:
+    """Plans and budgets the /everything queries that cover keyword alerts."""
+
+    def __init__(self, max_length: int = None, max_queries: int = None, budget_share: float = None,
+                 interval: int = None, rate_limiter=None):
+        """
+        Initialize the planner.
+
+        Args:
+            max_length: Longest query string (defaults to settings.ALERT_QUERY_MAX_LENGTH)
+            max_queries: Queries per run at most (defaults to settings.ALERT_QUERY_MAX_PER_RUN)
+            budget_share: Share of the remaining daily NewsAPI budget alert queries may use
+                (defaults to settings.ALERT_QUERY_BUDGET_SHARE)
+            interval: Minutes between planning runs (defaults to settings.ALERT_QUERY_INTERVAL)
+            rate_limiter: NewsAPIRateLimiter to read the remaining budget from
+        """
+        self.max_length = min(max_length or getattr(settings, 'ALERT_QUERY_MAX_LENGTH', MAX_QUERY_LENGTH),
+                              MAX_QUERY_LENGTH)
+        self.max_queries = max_queries or getattr(settings, 'ALERT_QUERY_MAX_PER_RUN', 10)
+        self.budget_share = budget_share if budget_share is not None else getattr(
+            settings, 'ALERT_QUERY_BUDGET_SHARE', 0.3)
+        self.interval = interval or getattr(settings, 'ALERT_QUERY_INTERVAL', 15)
+        self._rate_limiter = rate_limiter
+
+    @property
+    def rate_limiter(self):
+        if self._rate_limiter is None:
+            from .rate_limiter import NewsAPIRateLimiter
+            self._rate_limiter = NewsAPIRateLimiter()
+        return self._rate_limiter
+
+    def rank_keywords(self, now=None) -> List[KeywordRank]:
+        """
+        Collect the distinct keywords of active alerts, highest priority first.
+
+        A keyword's score is its subscriber count, boosted logarithmically by
+        its decayed hit count; its priority multiplies the score by how many
+        hours (up to MAX_STALENESS_HOURS) it has gone without being queried.
+        Keywords that were never queried count as maximally stale.
+
+        Returns:
+            KeywordRank entries sorted by descending priority
+        """
+        now = now or timezone.now()
+        subscribers = {}
+        rows = (KeywordAlert.objects.filter(is_active=True, user__is_active=True)
+                .annotate(term=Lower('keyword')).values('term')
+                .annotate(subscribers=Count('user', distinct=True)))
+        for row in rows:
+            keyword = normalize_keyword(row['term'])
+            if keyword:
+                subscribers[keyword] = subscribers.get(keyword, 0) + row['subscribers']
+
+        stats = {stat.keyword: stat for stat in AlertKeyword.objects.filter(keyword__in=list(subscribers))}
+        ranked = []
+        for keyword, count in subscribers.items():
+            stat = stats.get(keyword)
+            rank = KeywordRank(keyword, count)
+            if stat:
+                rank.recent_hits = stat.decayed_hits(now)
+                rank.last_queried_at = stat.last_queried_at
+            if rank.last_queried_at:
+                stale_hours = (now - rank.last_queried_at).total_seconds() / 3600
+            else:
+                stale_hours = MAX_STALENESS_HOURS
+            score = count * (1 + math.log1p(rank.recent_hits))
+            rank.priority = score * (1 + min(max(stale_hours, 0), MAX_STALENESS_HOURS))
+            ranked.append(rank)
+
+        # Ties go to the keyword queried longest ago, then alphabetically for stable packing
+        ranked.sort(key=lambda rank: (-rank.priority, rank.last_queried_at or now - timedelta(days=365),
+                                      rank.keyword))
+        return ranked
+
+    def plan(self, now=None) -> List[PlannedQuery]:
+        """
+        Pack every active keyword into OR-queries.
+
+        Returns:
+            PlannedQuery list covering all keywords, most urgent first
+        """
+        ranked = self.rank_keywords(now)
+        by_keyword = {rank.keyword: rank for rank in ranked}
+        queries = []
+        for keywords in pack_queries((rank.keyword for rank in ranked), self.max_length):
+            queries.append(PlannedQuery(
+                keywords=keywords,
+                priority=sum(by_keyword[keyword].priority for keyword in keywords),
+                subscribers=sum(by_keyword[keyword].subscribers for keyword in keywords),
+            ))
+        queries.sort(key=lambda query: -query.priority)
+        return queries
+
+    def budget(self, now=None) -> int:
+        """
+        Number of queries this run may send.
+
+        The run's allowance is its share of the remaining default-priority
+        daily budget spread over the runs left today. Fractions carry over to
+        the next run, so even a small daily budget is used up evenly instead
+        of rounding down to nothing. If the limiter cannot be read, the run
+        falls back to ALERT_QUERY_MAX_PER_RUN and the limiter still throttles
+        the requests themselves.
+
+        Returns:
+            Query count, at most max_queries
+        """
+        now = now or timezone.now()
+        try:
+            remaining = self.rate_limiter.get_metrics()['remaining'][PRIORITY_DEFAULT]
+        except Exception as e:
+            logger.warning(f"Could not read the NewsAPI budget, planning {self.max_queries} queries: {str(e)}")
+            return self.max_queries
+
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        runs_left = max(math.ceil((midnight - now).total_seconds() / (self.interval * 60)), 1)
+        allowance = cache.get(ALLOWANCE_CACHE_KEY, 0.0) + remaining * self.budget_share / runs_left
+        queries = min(int(allowance), self.max_queries, remaining)
+        # Carry at most one run's worth over, so an idle day does not bank a burst
+        cache.set(ALLOWANCE_CACHE_KEY, min(allowance - queries, max(self.max_queries, 1)),
+                  timeout=60 * 60 * 24)
+        return max(queries, 0)
+
+    def schedule(self, now=None) -> List[PlannedQuery]:
+        """
+        The queries to send this run: the most urgent ones that fit the budget.
+        """
+        queries = self.plan(now)
+        if not queries:
+            return []
+        return queries[:self.budget(now)]
+
+
+def record_queried(keywords: Iterable[str], when=None, complete: bool = True):
+    """
+    Mark keywords as queried at `when`.
+
+    Args:
+        keywords: Keywords covered by the query
+        when: When the query was sent
+        complete: Whether every result was read; only then does the keywords'
+            cutoff move up to `when`, while ranking counts the query either way
+    """
+    when = when or timezone.now()
+    keywords = list(dict.fromkeys(normalize_keyword(keyword) for keyword in keywords))
+    fields = ['last_queried_at', 'covered_until'] if complete else ['last_queried_at']
+    AlertKeyword.objects.bulk_create(
+        [AlertKeyword(keyword=keyword, last_queried_at=when, covered_until=when if complete else None)
+         for keyword in keywords],
+        update_conflicts=True, unique_fields=['keyword'], update_fields=fields
+    )
+
+
+def query_cutoff(keywords: Iterable[str], now=None):
+    """
+    Earliest publish time a query for these keywords needs to ask for.
+
+    Keywords are covered up to their last complete query (less the fetch
+    overlap); new ones look back ALERT_QUERY_LOOKBACK_HOURS.
+    """
+    now = now or timezone.now()
+    lookback = now - timedelta(hours=getattr(settings, 'ALERT_QUERY_LOOKBACK_HOURS', 24))
+    keywords = [normalize_keyword(keyword) for keyword in keywords]
+    covered = dict(AlertKeyword.objects.filter(keyword__in=keywords).values_list('keyword', 'covered_until'))
+    overlap = timedelta(minutes=getattr(settings, 'FETCH_STATE_OVERLAP_MINUTES', 30))
+    cutoffs = [covered[keyword] - overlap if covered.get(keyword) else lookback for keyword in keywords]
+    return max(min(cutoffs, default=lookback), lookback)
+
+
+def record_hits(counts: Dict[str, int], now=None):
+    """
+    Add alert matches to the keywords' decayed hit counts.
+
+    Args:
+        counts: Keyword to number of newly matched articles
+    """
+    now = now or timezone.now()
+    counts = {normalize_keyword(keyword): hits for keyword, hits in counts.items() if hits}
+    if not counts:
+        return
+    existing = {stat.keyword: stat for stat in AlertKeyword.objects.filter(keyword__in=list(counts))}
+    rows = []
+    for keyword, hits in counts.items():
+        decayed = existing[keyword].decayed_hits(now) if keyword in existing else 0.0
+        rows.append(AlertKeyword(keyword=keyword, recent_hits=decayed + hits, hits_updated_at=now))
+    AlertKeyword.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['keyword'], update_fields=['recent_hits', 'hits_updated_at']
+    )
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_BREAKING = 'breaking'
+PRIORITY_DEFAULT = 'default'
+PRIORITY_BACKFILL = 'backfill'
+
+# Share of the daily budget each priority class may consume. Lower classes stop
+# earlier, which keeps the rest of the budget for breaking-news fetches.
+DEFAULT_PRIORITY_SHARES = {
+    PRIORITY_BREAKING: 1.0,
+    PRIORITY_DEFAULT: 0.85,
+    PRIORITY_BACKFILL: 0.5,
+}
+
+# Returns {allowed, wait_seconds}; wait_seconds is -1 when the daily budget is spent.
+# The bucket is refilled by the Redis clock, so callers' clocks may disagree.
+ACQUIRE_SCRIPT = """
+local bucket, daily, blocked = KEYS[1], KEYS[2], KEYS[3]
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local daily_limit = tonumber(ARGV[3])
+local day_ttl = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local blocked_ms = redis.call('PTTL', blocked)
+if blocked_ms > 0 then
+    return {0, tostring(blocked_ms / 1000)}
+end
+
+local used = tonumber(redis.call('GET', daily) or '0')
+if used >= daily_limit then
+    return {0, '-1'}
+end
+
+local state = redis.call('HMGET', bucket, 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+if tokens < 1 then
+    redis.call('HSET', bucket, 'tokens', tostring(tokens), 'ts', tostring(now))
+    return {0, tostring((1 - tokens) / rate)}
+end
+
+redis.call('HSET', bucket, 'tokens', tostring(tokens - 1), 'ts', tostring(now))
+redis.call('EXPIRE', bucket, 3600)
+redis.call('INCR', daily)
+redis.call('EXPIRE', daily, day_ttl)
+return {1, '0'}
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot be made within the rate limit or daily quota."""
+
+
+class NewsAPIRateLimiter:
+    """
+    Token-bucket rate limiter for NewsAPI shared by every process via Redis.
+
+    A token bucket smooths bursts, a per-day counter enforces the key's daily
+    quota, and each priority class may only use its share of that quota. A 429
+    response blocks all callers until its Retry-After has passed.
+    """
+
+    KEY_PREFIX = 'newsapi:ratelimit'
+
+    def __init__(self, name: str = 'newsapi', redis=None):
+        """
+        Initialize the limiter.
+
+        Args:
+            name: Limiter name, so several API keys can have separate budgets
+            redis: Redis client (defaults to the django_redis 'default' connection)
+        """
+        self.name = name
+        self.daily_budget = getattr(settings, 'NEWS_API_DAILY_BUDGET', 100)
+        self.rate = getattr(settings, 'NEWS_API_REQUESTS_PER_SECOND', 1.0)
+        self.capacity = getattr(settings, 'NEWS_API_BURST', 5)
+        self.shares = {**DEFAULT_PRIORITY_SHARES, **getattr(settings, 'NEWS_API_PRIORITY_SHARES', {})}
+        self.redis = redis if redis is not None else get_redis_connection('default')
+        self._script = self.redis.register_script(ACQUIRE_SCRIPT)
+
+    def _keys(self):
+        day = timezone.now().strftime('%Y%m%d')
+        prefix = f"{self.KEY_PREFIX}:{self.name}"
+        return f"{prefix}:bucket", f"{prefix}:daily:{day}", f"{prefix}:blocked"
+
+    def try_acquire(self, priority: str = PRIORITY_DEFAULT) -> Tuple[bool, float]:
+        """
+        Try to take one request from the budget without waiting.
+
+        Args:
+            priority: Priority class of the request
+
+        Returns:
+            Tuple of (acquired, seconds to wait before retrying); the wait is -1
+            when the priority class has spent its daily budget
+        """
+        daily_limit = int(self.daily_budget * self.shares.get(priority, self.shares[PRIORITY_DEFAULT]))
+        allowed, wait = self._script(
+            keys=list(self._keys()),
+            args=[self.rate, self.capacity, daily_limit, 60 * 60 * 48],
+        )
+        return bool(int(allowed)), float(wait)
+
+    def acquire(self, priority: str = PRIORITY_DEFAULT, timeout: float = None):
+        """
+        Block until a request may be made.
+
+        Args:
+            priority: Priority class of the request
+            timeout: Maximum seconds to wait (defaults to settings.NEWS_API_RATE_LIMIT_TIMEOUT)
+
+        Raises:
+            RateLimitExceeded: If the daily budget is spent or the wait exceeds the timeout
+        """
+        timeout = timeout if timeout is not None else getattr(settings, 'NEWS_API_RATE_LIMIT_TIMEOUT', 30)
+        deadline = time.monotonic() + timeout
+        while True:
+            allowed, wait = self._check(priority, deadline)
+            if allowed:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, priority: str = PRIORITY_DEFAULT, timeout: float = None):
+        """
+        Wait asynchronously until a request may be made.
+
+        Args:
+            priority: Priority class of the request
+            timeout: Maximum seconds to wait (defaults to settings.NEWS_API_RATE_LIMIT_TIMEOUT)
+
+        Raises:
+            RateLimitExceeded: If the daily budget is spent or the wait exceeds the timeout
+        """
+        timeout = timeout if timeout is not None else getattr(settings, 'NEWS_API_RATE_LIMIT_TIMEOUT', 30)
+        deadline = time.monotonic() + timeout
+        while True:
+            allowed, wait = await asyncio.to_thread(self._check, priority, deadline)
+            if allowed:
+                return
+            await asyncio.sleep(wait)
+
+    def _check(self, priority: str, deadline: float) -> Tuple[bool, float]:
+        allowed, wait = self.try_acquire(priority)
+        if allowed:
+            metrics.incr(f"newsapi.requests.{priority}")
+            return True, 0.0
+        if wait < 0:
+            metrics.incr(f"newsapi.quota_exhausted.{priority}")
+            raise RateLimitExceeded(f"NewsAPI daily budget for '{priority}' requests is spent")
+        if time.monotonic() + wait > deadline:
+            metrics.incr(f"newsapi.rate_limited.{priority}")
+            raise RateLimitExceeded(f"NewsAPI rate limit wait of {wait:.1f}s exceeds the timeout")
+        return False, wait
+
+    def record_retry_after(self, retry_after: str = None):
+        """
+        Block every caller after a 429 response.
+
+        Args:
+            retry_after: Value of the Retry-After header, in seconds (defaults to settings.NEWS_API_DEFAULT_RETRY_AFTER)
+        """
+        try:
+            seconds = float(retry_after)
+        except (TypeError, ValueError):
+            seconds = getattr(settings, 'NEWS_API_DEFAULT_RETRY_AFTER', 60)
+        _, _, blocked = self._keys()
+        self.redis.set(blocked, 1, px=max(int(seconds * 1000), 1))
+        metrics.incr('newsapi.throttled')
+        logger.warning(f"NewsAPI returned 429, pausing requests for {seconds:.0f}s")
+
+    def get_metrics(self) -> Dict:
+        """
+        Get the remaining budget and publish it as gauges.
+
+        Returns:
+            dict: Daily usage, remaining budget per priority class and block time
+        """
+        bucket, daily, blocked = self._keys()
+        used = int(self.redis.get(daily) or 0)
+        blocked_ms = self.redis.pttl(blocked)
+        remaining = {
+            priority: max(int(self.daily_budget * share) - used, 0)
+            for priority, share in self.shares.items()
+        }
+        for priority, value in remaining.items():
+            metrics.set_gauge(f"newsapi.remaining.{priority}", value)
+        return {
+            'daily_budget': self.daily_budget,
+            'used_today': used,
+            'remaining': remaining,
+            'blocked_for': max(blocked_ms, 0) / 1000,
+        }
@@ -0,0 +1,253 @@
+"""
+Offline replay of NewsAPI-shaped article payloads through the ingest stages.
+
+Used by the `replay_ingest` command to benchmark ingestion and reproduce ingest
+problems without NewsAPI. Batches run through the same stage functions the
+Celery stage tasks use (dedup, extract, enrich, persist), in-process, so every
+stage can be timed and its database queries counted. A replay runs in one
+transaction that is rolled back at the end unless it is asked to commit, so
+replayed (often synthetic) articles stay out of the live table by default.
+"""
+
+import json
+import logging
+import random
+import sys
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .ingest import bulk_upsert_articles, existing_urls
+from .pipeline import chunked
+from .summarization import SummarizationScheduler
+
+logger = logging.getLogger(__name__)
+
+REPLAY_STAGES = ('dedup', 'extract', 'enrich', 'persist')
+
+SYNTHETIC_TOPICS = {
+    'technology': ['AI model', 'chip maker', 'software update', 'startup', 'data center'],
+    'business': ['stock market', 'central bank', 'merger', 'quarterly earnings', 'oil prices'],
+    'sports': ['football final', 'tennis open', 'olympics team', 'basketball trade', 'cricket series'],
+    'health': ['hospital network', 'vaccine trial', 'fitness study', 'medical board', 'patient data'],
+    'science': ['space probe', 'physics experiment', 'research team', 'climate study', 'biology lab'],
+    'politics': ['election result', 'senate vote', 'government budget', 'president visit', 'congress hearing'],
+}
+SYNTHETIC_VERBS = ['announces', 'reports', 'delays', 'expands', 'faces scrutiny over', 'celebrates', 'cuts']
+
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    """
+    Read article payloads from a JSONL file, one object per line.
+
+    A line may be a single article or a NewsAPI response with an 'articles'
+    list, so saved API responses replay as they are.
+
+    Args:
+        path: File path, or '-' for standard input
+
+    Yields:
+        Article dicts
+    """
+    handle = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        for line in handle:
+            if not line.strip():
+                continue
+            payload = json.loads(line)
+            if isinstance(payload, dict) and isinstance(payload.get('articles'), list):
+                yield from payload['articles']
+            else:
+                yield payload
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def synthetic_articles(count: int, seed: int = 0, duplicate_rate: float = 0.05) -> Iterator[Dict]:
+    """
+    Generate deterministic NewsAPI-shaped articles.
+
+    Args:
+        count: Number of articles
+        seed: Random seed; the same seed yields the same articles and URLs
+        duplicate_rate: Share of articles that repeat an earlier URL
+
+    Yields:
+        Article dicts
+    """
+    rng = random.Random(seed)
+    now = timezone.now().replace(microsecond=0)
+    topics = list(SYNTHETIC_TOPICS.items())
+    for n in range(count):
+        index = rng.randrange(n) if n and rng.random() < duplicate_rate else n
+        category, subjects = topics[index % len(topics)]
+        subject = subjects[(index // len(topics)) % len(subjects)]
+        title = f"{subject.capitalize()} {rng.choice(SYNTHETIC_VERBS)} plans ({seed}-{index})"
+        sentences = [
+            f"The {subject} story developed over the course of the day.",
+            f"Analysts following {category} said the move was expected.",
+            "Officials declined to give further details.",
+            "More information is expected later this week.",
+        ]
+        yield {
+            'source': {'id': None, 'name': f"Replay Wire {index % 7}"},
+            'author': None,
+            'title': title,
+            'description': sentences[0],
+            'url': f"https://replay.example/{seed}/{category}/{index}",
+            'urlToImage': None,
+            'publishedAt': (now - timedelta(seconds=index)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'content': ' '.join(sentences * rng.randint(2, 8)),
+        }
+
+
+class ReplayRunner:
+    """
+    Replays article payloads batch by batch and measures every stage.
+
+    The extract stage only re-extracts pages already in the HTML archive, so
+    a replay never touches the network.
+    """
+
+    def __init__(self, nlp_service, batch_size: int = 50, rate: float = None, extract: bool = False,
+                 max_tier: str = 'extractive', commit: bool = False):
+        """
+        Initialize the runner.
+
+        Args:
+            nlp_service: NLP backend used by the enrich stage
+            batch_size: Articles per batch, as handed between pipeline stages
+            rate: Target articles per second (None replays as fast as possible)
+            extract: Re-extract archived HTML before enriching
+            max_tier: Best summarization tier the enrich stage may use
+            commit: Keep the replayed articles instead of rolling the replay back
+        """
+        self.nlp_service = nlp_service
+        self.batch_size = batch_size
+        self.rate = rate
+        self.extract = extract
+        self.commit = commit
+        self.scheduler = SummarizationScheduler(nlp_service=nlp_service, time_budget=float('inf'),
+                                                max_tier=max_tier)
+        self.timings = {stage: [] for stage in REPLAY_STAGES}
+        self.queries = {stage: 0 for stage in REPLAY_STAGES}
+        self.counts = {'read': 0, 'new': 0, 'created': 0}
+
+    @contextmanager
+    def _stage(self, name: str):
+        started = time.monotonic()
+        with CaptureQueriesContext(connection) as captured:
+            yield
+        self.timings[name].append(time.monotonic() - started)
+        self.queries[name] += len(captured.captured_queries)
+
+    def _extract_archived(self, articles: List[Dict]):
+        # In-process: starting an ExtractionStage pool closes the DB connection,
+        # and with it the replay's transaction
+        from .extraction import extract_html
+        from .html_archive import archived_pages
+
+        by_url = {article['url']: article for article in articles}
+        for url, html in archived_pages(by_url).items():
+            try:
+                extracted = extract_html(url, html, getattr(settings, 'EXTRACTION_TIMEOUT', 20))
+            except Exception as e:
+                logger.warning(f"Could not extract {url}: {str(e) or type(e).__name__}")
+                continue
+            if extracted.get('text'):
+                by_url[url]['content'] = extracted['text'][:5000]
+
+    def run_batch(self, articles: List[Dict]) -> int:
+        """
+        Run one batch through every stage.
+
+        The articles are written in the caller's transaction; run() is what
+        rolls them back.
+
+        Returns:
+            Number of articles created
+        """
+        from .tasks import _build_article, _enrich_articles
+
+        with self._stage('dedup'):
+            known_urls = existing_urls(article['url'] for article in articles)
+            fresh = [article for article in articles if article['url'] not in known_urls]
+        if self.extract:
+            with self._stage('extract'):
+                self._extract_archived(fresh)
+        with self._stage('enrich'):
+            enriched = _enrich_articles(fresh, self.nlp_service, self.scheduler)
+        with self._stage('persist'):
+            created = bulk_upsert_articles([_build_article(article) for article in enriched])
+
+        self.counts['read'] += len(articles)
+        self.counts['new'] += len(fresh)
+        self.counts['created'] += len(created)
+        return len(created)
+
+    def run(self, articles: Iterable[Dict], progress=None) -> Dict:
+        """
+        Replay articles, paced to the target rate if one is set.
+
+        Everything the replay writes is rolled back when it ends, unless the
+        runner was created with commit=True.
+
+        Args:
+            articles: Article dicts
+            progress: Called with the running report after every batch
+
+        Returns:
+            dict: The final report (see report())
+        """
+        self.started = time.monotonic()
+        with transaction.atomic():
+            for batch in chunked(articles, self.batch_size):
+                if self.rate:
+                    # Hold the batch back until the target rate allows it
+                    due = self.started + self.counts['read'] / self.rate
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.run_batch(batch)
+                if progress:
+                    progress(self.report())
+            report = self.report()
+            if not self.commit:
+                transaction.set_rollback(True)
+        return report
+
+    def report(self) -> Dict:
+        """
+        Summarize the replay so far.
+
+        Returns:
+            dict: Counts, throughput, and per-stage latency and query counts
+        """
+        elapsed = time.monotonic() - self.started
+        stages = {}
+        for stage, samples in self.timings.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            stages[stage] = {
+                'batches': len(samples),
+                'total_s': round(sum(samples), 3),
+                'mean_ms': round(1000 * sum(samples) / len(samples), 2),
+                'p95_ms': round(1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                'queries': self.queries[stage],
+                'queries_per_article': round(self.queries[stage] / max(self.counts['read'], 1), 3),
+            }
+        return {
+            **self.counts,
+            'elapsed_s': round(elapsed, 3),
+            'articles_per_s': round(self.counts['read'] / elapsed, 1) if elapsed else 0.0,
+            'created_per_s': round(self.counts['created'] / elapsed, 1) if elapsed else 0.0,
+            'stages': stages,
+        }
@@ -0,0 +1,253 @@
+"""
+Adaptive ingestion poll scheduler.
+
+Every NewsAPI category and query, every feed and the keyword-alert planner
+has a PollSchedule row; together they form a due-time queue ordered by
+next_poll_at. `dispatch_polls_task` runs every few seconds, claims the due
+entries and hands them to the tasks that poll them. Each entry then comes
+back through `complete`, which re-schedules it from the number of new items
+the poll found.
+
+Claims are leases: a claim stamps the entries with a random token and an
+expiry, and only the holder of the token can complete them. If a worker dies
+mid-poll, its entries become claimable again once the lease expires, and a
+late completion from it is ignored.
+
+With several ingest nodes, each node claims only the entries it owns (see
+leases.shard_owner), so nodes split the sources instead of contending for
+them; the claim lease still guards the moments when nodes disagree about
+ownership because one has just joined or left.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+from itertools import islice
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import metrics
+from .leases import shard_owner
+from .models import FeedSource, PollSchedule
+
+logger = logging.getLogger(__name__)
+
+INITIAL_INTERVAL = 900
+
+
+def _initial_interval(entry: PollSchedule) -> int:
+    min_interval, max_interval = entry.bounds()
+    return min(max(INITIAL_INTERVAL, min_interval), max_interval)
+
+
+def sync_schedules() -> int:
+    """
+    Make the queue match the configured ingestion sources.
+
+    Adds entries for settings.DEFAULT_CATEGORIES, settings.NEWS_FETCH_QUERIES,
+    the alert planner and any feed without one, and deactivates category and
+    query entries that are no longer configured. Inactive feeds keep their
+    entry but are never claimed.
+
+    Returns:
+        Number of entries added
+    """
+    wanted = {(PollSchedule.KIND_ALERTS, '')}
+    wanted |= {(PollSchedule.KIND_CATEGORY, c) for c in getattr(settings, 'DEFAULT_CATEGORIES', ['general'])}
+    wanted |= {(PollSchedule.KIND_QUERY, q) for q in getattr(settings, 'NEWS_FETCH_QUERIES', [])}
+
+    configured = PollSchedule.objects.exclude(kind=PollSchedule.KIND_FEED)
+    existing = {(kind, target): (pk, is_active)
+                for pk, kind, target, is_active in configured.values_list('pk', 'kind', 'target', 'is_active')}
+    new_entries = [PollSchedule(kind=kind, target=target) for kind, target in wanted - set(existing)]
+    new_entries += [
+        PollSchedule(kind=PollSchedule.KIND_FEED, target=str(feed.pk), feed=feed)
+        for feed in FeedSource.objects.filter(poll_schedule__isnull=True)
+    ]
+    for entry in new_entries:
+        entry.interval = _initial_interval(entry)
+    created = PollSchedule.objects.bulk_create(new_entries, ignore_conflicts=True)
+
+    changed = {}
+    for key, (pk, is_active) in existing.items():
+        if (key in wanted) != is_active:
+            changed.setdefault(key in wanted, []).append(pk)
+    for is_active, pks in changed.items():
+        configured.filter(pk__in=pks).update(is_active=is_active)
+    return len(created)
+
+
+def _unleased(now) -> Q:
+    return Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now)
+
+
+def shard_key(kind: str, target: str) -> str:
+    """Key an entry is assigned to a node by."""
+    return f"{kind}:{target}"
+
+
+def claim_due(kinds: Iterable[str] = None, limit: int = None, lease_seconds: int = None,
+              now=None, node: str = None, nodes: List[str] = None) -> List[PollSchedule]:
+    """
+    Lease the entries that are due, earliest first.
+
+    The lease condition is checked again by the UPDATE that takes it, so two
+    workers claiming at once never get the same entry.
+
+    Args:
+        kinds: Only claim entries of these kinds
+        limit: Maximum entries claimed (defaults to settings.POLL_DISPATCH_BATCH)
+        lease_seconds: Lease length (defaults to settings.POLL_LEASE_SECONDS)
+        now: Current time
+        node: Only claim the entries this ingest node owns among `nodes`
+        nodes: Live ingest nodes
+
+    Returns:
+        The claimed entries, all carrying the same lease_token
+    """
+    now = now or timezone.now()
+    limit = limit or getattr(settings, 'POLL_DISPATCH_BATCH', 1000)
+    lease_seconds = lease_seconds or getattr(settings, 'POLL_LEASE_SECONDS', 900)
+
+    due = (PollSchedule.objects.filter(is_active=True, next_poll_at__lte=now)
+           .filter(Q(feed__isnull=True) | Q(feed__is_active=True))
+           .filter(_unleased(now)))
+    if kinds:
+        due = due.filter(kind__in=list(kinds))
+    due = due.order_by('next_poll_at')
+    if node:
+        nodes = nodes or [node]
+        owned = (pk for pk, kind, target in due.values_list('pk', 'kind', 'target').iterator()
+                 if shard_owner(shard_key(kind, target), nodes) == node)
+        ids = list(islice(owned, limit))
+    else:
+        ids = list(due.values_list('pk', flat=True)[:limit])
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    claimed = PollSchedule.objects.filter(pk__in=ids).filter(_unleased(now)).update(
+        lease_token=token, lease_expires_at=now + timedelta(seconds=lease_seconds)
+    )
+    if claimed < len(ids):
+        metrics.incr('poll.claim_conflicts', len(ids) - claimed)
+    metrics.incr('poll.claimed', claimed)
+    return list(PollSchedule.objects.filter(lease_token=token).select_related('feed').order_by('next_poll_at'))
+
+
+def renew(lease_token: str, schedule_ids: Iterable[int], seconds: int = None, now=None) -> int:
+    """
+    Extend the lease on entries still held under a claim.
+
+    A poll that retries or defers itself renews its entries for the wait, so
+    they are not claimed and polled again while it is pending.
+
+    Args:
+        lease_token: Token of the claim the entries came from
+        schedule_ids: Entries to renew
+        seconds: New lease length from now (defaults to settings.POLL_LEASE_SECONDS)
+        now: Current time
+
+    Returns:
+        Number of entries renewed; entries claimed by someone else are left alone
+    """
+    now = now or timezone.now()
+    seconds = seconds or getattr(settings, 'POLL_LEASE_SECONDS', 900)
+    return PollSchedule.objects.filter(pk__in=list(schedule_ids), lease_token=lease_token).update(
+        lease_expires_at=now + timedelta(seconds=seconds)
+    )
+
+
+def release(schedule_id: int, lease_token: str, now=None) -> bool:
+    """
+    Give an entry's lease back without recording a poll.
+
+    For a poll that found its source already being fetched by someone else:
+    the entry comes due again after its kind's minimum interval, and what it
+    has learned about the source is left as it was.
+
+    Returns:
+        False if the lease had been lost
+    """
+    now = now or timezone.now()
+    entry = PollSchedule.objects.filter(pk=schedule_id, lease_token=lease_token).first()
+    if entry is None:
+        return False
+    min_interval, _ = entry.bounds()
+    return PollSchedule.objects.filter(pk=schedule_id, lease_token=lease_token).update(
+        lease_token='', lease_expires_at=None, next_poll_at=now + timedelta(seconds=min_interval)
+    ) == 1
+
+
+def complete_many(lease_token: str, outcomes: Dict[int, Dict], now=None) -> int:
+    """
+    Re-schedule polled entries and release their lease.
+
+    Entries whose lease was lost (it expired and another worker claimed them)
+    are left alone.
+
+    Args:
+        lease_token: Token of the claim the entries came from
+        outcomes: Entry id to keyword arguments for PollSchedule.record_poll
+        now: Time of the polls
+
+    Returns:
+        Number of entries completed
+    """
+    if not outcomes:
+        return 0
+    now = now or timezone.now()
+    with transaction.atomic():
+        entries = list(PollSchedule.objects.select_for_update()
+                       .filter(pk__in=list(outcomes), lease_token=lease_token))
+        for entry in entries:
+            entry.record_poll(now=now, **outcomes[entry.pk])
+            entry.lease_token = ''
+            entry.lease_expires_at = None
+        PollSchedule.objects.bulk_update(entries, [
+            'interval', 'new_items_ewma', 'next_poll_at', 'last_polled_at', 'last_new_items',
+            'consecutive_failures', 'lease_token', 'lease_expires_at',
+        ])
+
+    stale = len(outcomes) - len(entries)
+    if stale:
+        logger.warning(f"Ignored {stale} poll results whose lease had been lost")
+        metrics.incr('poll.stale_completions', stale)
+    return len(entries)
+
+
+def complete(schedule_id: int, lease_token: str, new_items: int = 0, failed: bool = False,
+             backstop: bool = False) -> bool:
+    """
+    Re-schedule one polled entry and release its lease.
+
+    Returns:
+        False if the lease had been lost
+    """
+    return complete_many(lease_token, {schedule_id: {
+        'new_items': new_items, 'failed': failed, 'backstop': backstop,
+    }}) == 1
+
+
+def queue_stats(now=None) -> Dict:
+    """
+    Summarize the poll queue for the metrics endpoint.
+
+    Returns:
+        dict: Due and leased entry counts, overdue seconds of the oldest due
+        entry, and active entries per kind
+    """
+    now = now or timezone.now()
+    active = PollSchedule.objects.filter(is_active=True)
+    due = active.filter(next_poll_at__lte=now)
+    oldest = due.order_by('next_poll_at').values_list('next_poll_at', flat=True).first()
+    return {
+        'due': due.filter(_unleased(now)).count(),
+        'leased': active.filter(lease_expires_at__gt=now).count(),
+        'overdue_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+        'by_kind': dict(active.values_list('kind').annotate(count=Count('pk'))),
+    }
@@ -0,0 +1,165 @@
+import logging
+import math
+from datetime import date, timedelta
+from typing import Iterable, List
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SeenURLFilter:
+    """
+    Bloom filter of canonical URL hashes, shared by every worker through Redis.
+
+    The filter rotates through generations of `days` days each: URLs are
+    added to the current generation, and lookups check it and the previous
+    one, so every URL stays visible for at least `days` days and older
+    generations simply expire. A URL that is in neither generation has
+    definitely not been stored; one that is may have been, and the caller
+    confirms it against the database.
+
+    Bits are read and written with BITFIELD, so checking a whole batch of
+    URLs costs one command per generation rather than one GETBIT per bit.
+    """
+
+    KEY_PREFIX = 'newshub:seen'
+
+    # BITFIELD operations per command, to keep single commands small
+    OPS_PER_COMMAND = 10000
+
+    def __init__(self, capacity: int = None, error_rate: float = None, days: int = None, redis=None):
+        """
+        Initialize the filter.
+
+        Args:
+            capacity: Expected URLs per day (defaults to settings.SEEN_FILTER_CAPACITY)
+            error_rate: Target false-positive rate (defaults to settings.SEEN_FILTER_ERROR_RATE)
+            days: Days each generation spans, and the least time a URL is
+                remembered (defaults to settings.SEEN_FILTER_DAYS)
+            redis: Redis client (defaults to the django_redis 'default' connection)
+        """
+        self.capacity = capacity or getattr(settings, 'SEEN_FILTER_CAPACITY', 50000)
+        self.error_rate = error_rate or getattr(settings, 'SEEN_FILTER_ERROR_RATE', 0.001)
+        self.days = days or getattr(settings, 'SEEN_FILTER_DAYS', 30)
+        if redis is None:
+            from django_redis import get_redis_connection
+            redis = get_redis_connection('default')
+        self.redis = redis
+
+        # Standard Bloom filter sizing for one generation's URLs at `error_rate`
+        items = self.capacity * self.days
+        self.num_bits = int(math.ceil(-items * math.log(self.error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, int(round(self.num_bits / items * math.log(2))))
+
+    def _key(self, day: date) -> str:
+        return f"{self.KEY_PREFIX}:{day.toordinal() // self.days}"
+
+    def _live_keys(self) -> List[str]:
+        today = timezone.now().date()
+        return [self._key(today), self._key(today - timedelta(days=self.days))]
+
+    def _positions(self, digest: str) -> List[int]:
+        # Double hashing on two independent 64-bit slices of the SHA-256 digest
+        first, second = int(digest[:16], 16), int(digest[16:32], 16) | 1
+        return [(first + i * second) % self.num_bits for i in range(self.num_hashes)]
+
+    def _bitfield(self, pipe, key: str, op: str, positions: List[int]):
+        """Queue BITFIELD commands applying `op` (GET, or SET to 1) to single bits."""
+        for start in range(0, len(positions), self.OPS_PER_COMMAND):
+            args = []
+            for position in positions[start:start + self.OPS_PER_COMMAND]:
+                args += [op, 'u1', position] + ([1] if op == 'SET' else [])
+            pipe.execute_command('BITFIELD', key, *args)
+
+    def add(self, digests: Iterable[str], day: date = None):
+        """
+        Record URL hashes as seen.
+
+        Args:
+            digests: Article.url_hash values
+            day: Day the URLs were seen, which picks the generation (defaults to today)
+        """
+        positions = [position for digest in digests for position in self._positions(digest)]
+        if not positions:
+            return
+        key = self._key(day or timezone.now().date())
+        pipe = self.redis.pipeline(transaction=False)
+        self._bitfield(pipe, key, 'SET', positions)
+        # A generation is read until the end of the next one
+        pipe.expire(key, (2 * self.days + 1) * 60 * 60 * 24)
+        pipe.execute()
+
+    def might_contain(self, digests: List[str]) -> List[bool]:
+        """
+        Check URL hashes against the live generations in one round trip.
+
+        Args:
+            digests: Article.url_hash values
+
+        Returns:
+            List of flags; False means definitely not seen
+        """
+        if not digests:
+            return []
+        keys = self._live_keys()
+        positions = [position for digest in digests for position in self._positions(digest)]
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            self._bitfield(pipe, key, 'GET', positions)
+        replies = pipe.execute()
+
+        # Each key's replies come back in order, possibly over several commands
+        per_key = len(replies) // len(keys)
+        bits = [
+            [bit for reply in replies[index * per_key:(index + 1) * per_key] for bit in reply]
+            for index in range(len(keys))
+        ]
+        flags = []
+        for index in range(len(digests)):
+            window = slice(index * self.num_hashes, (index + 1) * self.num_hashes)
+            flags.append(any(all(generation[window]) for generation in bits))
+        return flags
+
+    def clear(self):
+        """Delete every generation."""
+        keys = list(self.redis.scan_iter(f"{self.KEY_PREFIX}:*"))
+        if keys:
+            self.redis.delete(*keys)
+
+
+def record_screening(maybe_seen: int, confirmed: int, screened: int):
+    """Publish how many URLs the filter let through and how often it was wrong."""
+    metrics.incr('seen_filter.screened', screened)
+    metrics.incr('seen_filter.definitely_new', screened - maybe_seen)
+    metrics.incr('seen_filter.maybe_seen', maybe_seen)
+    metrics.incr('seen_filter.false_positives', maybe_seen - confirmed)
+
+
+_seen_filter = None
+
+
+def get_seen_filter() -> SeenURLFilter:
+    """Process-wide SeenURLFilter built from settings."""
+    global _seen_filter
+    if _seen_filter is None:
+        _seen_filter = SeenURLFilter()
+    return _seen_filter
+
+
+def remember_urls(digests: Iterable[str]):
+    """
+    Add URL hashes to the process-wide filter, if it is enabled.
+
+    Failures are logged rather than raised: a URL missing from the filter is
+    only looked up in the database.
+    """
+    if not getattr(settings, 'SEEN_FILTER_ENABLED', True):
+        return
+    try:
+        get_seen_filter().add(digests)
+    except Exception as e:
+        logger.warning(f"Could not add URLs to the seen-URL filter: {str(e)}")
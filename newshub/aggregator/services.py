@@ -1,8 +1,11 @@
 import logging
 import json
+import re
+import hashlib
 import requests
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.core.cache import cache
@@ -14,6 +17,12 @@ from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
 import torch
 
+from .http_cache import ResponseCache
+from .http_client import get_session
+from .rate_limiter import (
+    NewsAPIRateLimiter, RateLimitExceeded, PRIORITY_BREAKING, PRIORITY_DEFAULT
+)
+
 # Download required NLTK data
 nltk.download('punkt', quiet=True)
 nltk.download('stopwords', quiet=True)
@@ -21,12 +30,102 @@ nltk.download('wordnet', quiet=True)
 
 logger = logging.getLogger(__name__)
 
+# Urgency margin scale matching the uncalibrated softmax (temperature 0.05)
+DEFAULT_URGENCY_SCALE = 20.0
+
+
+def load_urgency_calibration(path: str = None) -> Optional[Dict]:
+    """
+    Load the urgency calibration written by the calibrate_urgency command.
+    
+    Args:
+        path: Calibration JSON (defaults to settings.NLP_URGENCY_CALIBRATION_PATH)
+        
+    Returns:
+        Dictionary with 'scale', 'offset' and 'threshold', or None if there is none
+    """
+    path = path if path is not None else getattr(settings, 'NLP_URGENCY_CALIBRATION_PATH', '')
+    if not path:
+        return None
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load urgency calibration {path}: {str(e)}")
+        return None
+
+
+def calibrate_urgency(margins, labels, min_precision: float = 0.9) -> Dict:
+    """
+    Fit the urgency head to labelled articles and pick the breaking-news threshold.
+    
+    The raw urgency margin (breaking minus routine prototype similarity) is
+    mapped to a probability by Platt scaling, a one-feature logistic
+    regression. The threshold is the lowest calibrated score at which the
+    labelled set reaches `min_precision`, which keeps the most recall at that
+    precision; if no threshold gets there, it is above every score, so
+    nothing is pushed.
+    
+    Args:
+        margins: Urgency margins of the labelled articles
+        labels: True for articles that are breaking news
+        min_precision: Share of pushed articles that must be breaking
+        
+    Returns:
+        Dictionary with 'scale', 'offset', 'threshold', 'precision', 'recall' and 'examples'
+    """
+    from sklearn.linear_model import LogisticRegression
+    
+    margins = np.asarray(margins, dtype=np.float64).reshape(-1, 1)
+    labels = np.asarray(labels, dtype=bool)
+    if labels.all() or not labels.any():
+        raise ValueError("Calibration needs both breaking and routine examples")
+    
+    regression = LogisticRegression(C=1e4).fit(margins, labels)
+    scale, offset = float(regression.coef_[0][0]), float(regression.intercept_[0])
+    scores = 1.0 / (1.0 + np.exp(-(scale * margins[:, 0] + offset)))
+    
+    calibration = {'scale': scale, 'offset': offset, 'threshold': 1.01,
+                   'precision': None, 'recall': 0.0, 'examples': int(len(labels))}
+    for threshold in np.unique(scores):
+        pushed = scores >= threshold
+        precision = float((pushed & labels).sum() / pushed.sum())
+        if precision >= min_precision:
+            calibration.update(threshold=float(threshold), precision=round(precision, 4),
+                               recall=round(float((pushed & labels).sum() / labels.sum()), 4))
+            break
+    return calibration
+
+
 class NLPService:
     """
     Service for handling NLP-related tasks such as text summarization and category classification.
     Uses a pre-trained sentence transformer model for generating embeddings.
     """
     
+    # Define category labels and their associated keywords
+    CATEGORY_KEYWORDS = {
+        'technology': ['technology', 'tech', 'computer', 'software', 'hardware', 'ai', 'artificial intelligence', 'machine learning', 'data'],
+        'business': ['business', 'economy', 'market', 'finance', 'stock', 'investment', 'company', 'industry'],
+        'sports': ['sports', 'football', 'basketball', 'soccer', 'tennis', 'golf', 'olympics', 'game', 'match', 'tournament'],
+        'entertainment': ['entertainment', 'movie', 'film', 'tv', 'television', 'celebrity', 'actor', 'actress', 'music', 'song', 'album'],
+        'health': ['health', 'medical', 'medicine', 'disease', 'hospital', 'doctor', 'patient', 'fitness', 'wellness'],
+        'science': ['science', 'research', 'study', 'scientist', 'discovery', 'physics', 'biology', 'chemistry', 'space'],
+        'politics': ['politics', 'government', 'election', 'president', 'congress', 'senate', 'democrat', 'republican'],
+        'general': ['news', 'update', 'world', 'today', 'latest', 'breaking']
+    }
+    
+    # Label prototypes for the lightweight heads evaluated on the shared embedding
+    SENTIMENT_LABELS = {
+        'positive': 'good news about success, growth, recovery, celebration, a win or a breakthrough',
+        'neutral': 'a factual report, statement, announcement, schedule or update',
+        'negative': 'bad news about a crisis, death, loss, disaster, decline, conflict or scandal',
+    }
+    URGENCY_LABELS = {
+        'breaking': 'breaking news alert, emergency, just in, developing story happening right now',
+        'routine': 'feature story, analysis, opinion, review or background piece',
+    }
+    
     def __init__(self, model_name: str = None):
         """
         Initialize the NLP service with a pre-trained model.
@@ -39,19 +138,47 @@ class NLPService:
         self.lemmatizer = WordNetLemmatizer()
         self.stop_words = set(stopwords.words('english'))
         self.similarity_threshold = getattr(settings, 'SIMILARITY_THRESHOLD', 0.75)
+        self.categories = dict(self.CATEGORY_KEYWORDS)
+        self.urgency_calibration = load_urgency_calibration()
+    
+    @classmethod
+    def get_versions(cls, model_name: str = None) -> Dict[str, str]:
+        """
+        Get the version identifiers of the current summary and category outputs.
         
-        # Define category labels and their associated keywords
-        self.categories = {
-            'technology': ['technology', 'tech', 'computer', 'software', 'hardware', 'ai', 'artificial intelligence', 'machine learning', 'data'],
-            'business': ['business', 'economy', 'market', 'finance', 'stock', 'investment', 'company', 'industry'],
-            'sports': ['sports', 'football', 'basketball', 'soccer', 'tennis', 'golf', 'olympics', 'game', 'match', 'tournament'],
-            'entertainment': ['entertainment', 'movie', 'film', 'tv', 'television', 'celebrity', 'actor', 'actress', 'music', 'song', 'album'],
-            'health': ['health', 'medical', 'medicine', 'disease', 'hospital', 'doctor', 'patient', 'fitness', 'wellness'],
-            'science': ['science', 'research', 'study', 'scientist', 'discovery', 'physics', 'biology', 'chemistry', 'space'],
-            'politics': ['politics', 'government', 'election', 'president', 'congress', 'senate', 'democrat', 'republican'],
-            'general': ['news', 'update', 'world', 'today', 'latest', 'breaking']
+        Versions are short digests of everything that influences the output, so
+        changing NLP_MODEL_NAME, the category lexicon or the summarizer revision
+        marks previously enriched articles as stale. Computing them does not
+        load the model.
+        
+        Args:
+            model_name: Model name to version against (defaults to settings.NLP_MODEL_NAME)
+            
+        Returns:
+            Dictionary with 'summary_version' and 'category_version' keys
+        """
+        model_name = model_name or getattr(settings, 'NLP_MODEL_NAME', 'sentence-transformers/all-mpnet-base-v2')
+        summarizer_version = str(getattr(settings, 'NLP_SUMMARIZER_VERSION', '1'))
+        similarity_threshold = str(getattr(settings, 'SIMILARITY_THRESHOLD', 0.75))
+        lexicon = json.dumps(
+            [cls.CATEGORY_KEYWORDS, cls.SENTIMENT_LABELS, cls.URGENCY_LABELS,
+             getattr(settings, 'NLP_HEAD_WEIGHTS_PATH', '')],
+            sort_keys=True
+        )
+        
+        def digest(*parts):
+            return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:12]
+        
+        return {
+            'summary_version': digest(model_name, summarizer_version),
+            'category_version': digest(model_name, lexicon, similarity_threshold),
         }
     
+    @property
+    def versions(self) -> Dict[str, str]:
+        """Version identifiers for outputs produced by this instance."""
+        return self.get_versions(self.model_name)
+    
     def _load_model(self):
         """
         Load the pre-trained sentence transformer model.
@@ -159,18 +286,10 @@ class NLPService:
             text = f"{title} {description}".lower()
             
             # Simple keyword-based classification
-            category_scores = {category: 0 for category in self.categories}
-            
-            for category, keywords in self.categories.items():
-                for keyword in keywords:
-                    if keyword in text:
-                        category_scores[category] += 1
-            
-            # Get category with highest score
-            predicted_category = max(category_scores.items(), key=lambda x: x[1])[0]
+            predicted_category = self._classify_with_keywords(text)
             
             # If no keywords matched, use ML-based classification
-            if category_scores[predicted_category] == 0:
+            if predicted_category is None:
                 predicted_category = self._classify_with_ml(text)
                 
             return predicted_category
@@ -215,11 +334,164 @@ class NLPService:
             logger.error(f"Error in ML-based classification: {str(e)}")
             return 'general'
     
+    def enrich_batch(self, items: List[Dict]) -> List[Dict]:
+        """
+        Classify category, sentiment and urgency for a batch of articles.
+        
+        All texts are embedded in one encoder call, and every head is evaluated
+        with a single matrix multiply against the stacked head weights. The
+        keyword lexicon still takes precedence for the category, as in
+        classify_category.
+        
+        Args:
+            items: Dictionaries with 'title' and optional 'description' keys
+            
+        Returns:
+            List of dictionaries with 'category', 'sentiment', 'sentiment_score'
+            and 'urgency_score' keys, in input order
+        """
+        if not items:
+            return []
+        
+        texts = [f"{item.get('title') or ''} {item.get('description') or ''}".strip() for item in items]
+        
+        try:
+            heads = self._get_head_weights()
+            embeddings = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+            scores = embeddings @ heads['weights'].T
+        except Exception as e:
+            logger.error(f"Error in batch enrichment: {str(e)}")
+            return [
+                {'category': self.classify_category(item.get('title'), item.get('description', '')),
+                 'sentiment': 'neutral', 'sentiment_score': 0.0, 'urgency_score': 0.0}
+                for item in items
+            ]
+        
+        categories = list(self.categories.keys())
+        sentiments = list(self.SENTIMENT_LABELS.keys())
+        results = []
+        for text, row in zip(texts, scores):
+            category_scores = row[heads['category']]
+            sentiment_probs = self._softmax(row[heads['sentiment']])
+            urgency = row[heads['urgency']]
+            
+            category = self._classify_with_keywords(text.lower())
+            if category is None:
+                best = int(np.argmax(category_scores))
+                category = categories[best] if category_scores[best] >= self.similarity_threshold else 'general'
+            
+            best_sentiment = int(np.argmax(sentiment_probs))
+            results.append({
+                'category': category,
+                'sentiment': sentiments[best_sentiment],
+                'sentiment_score': float(sentiment_probs[best_sentiment]),
+                'urgency_score': self.urgency_probability(float(urgency[0] - urgency[1])),
+            })
+        
+        return results
+    
+    def urgency_margins(self, items: List[Dict]) -> np.ndarray:
+        """
+        Raw urgency margins (breaking minus routine similarity) for a batch of articles.
+        
+        Args:
+            items: Dictionaries with 'title' and optional 'description' keys
+        """
+        texts = [f"{item.get('title') or ''} {item.get('description') or ''}".strip() for item in items]
+        heads = self._get_head_weights()
+        embeddings = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        urgency = embeddings @ heads['weights'][heads['urgency']].T
+        return urgency[:, 0] - urgency[:, 1]
+    
+    def urgency_probability(self, margin: float) -> float:
+        """
+        Map an urgency margin to the probability that the article is breaking news.
+        
+        Uses the calibration from settings.NLP_URGENCY_CALIBRATION_PATH if there
+        is one; otherwise the plain two-prototype softmax, which is not a
+        probability and should not gate pushes on its own.
+        """
+        calibration = self.urgency_calibration or {}
+        scale = calibration.get('scale', DEFAULT_URGENCY_SCALE)
+        offset = calibration.get('offset', 0.0)
+        return float(1.0 / (1.0 + np.exp(-(scale * margin + offset))))
+    
+    @property
+    def breaking_threshold(self) -> float:
+        """Urgency score from which a new article is pushed as breaking news."""
+        if self.urgency_calibration:
+            return self.urgency_calibration['threshold']
+        return getattr(settings, 'BREAKING_NEWS_URGENCY_THRESHOLD', 0.6)
+    
+    def _classify_with_keywords(self, text: str) -> Optional[str]:
+        """
+        Classify lowercased text with the keyword lexicon, or None if nothing matched.
+        """
+        category_scores = {
+            category: sum(1 for keyword in keywords if keyword in text)
+            for category, keywords in self.categories.items()
+        }
+        category, score = max(category_scores.items(), key=lambda x: x[1])
+        return category if score else None
+    
+    @staticmethod
+    def _softmax(scores, temperature: float = 0.05):
+        scaled = np.asarray(scores, dtype=np.float32) / temperature
+        scaled -= scaled.max()
+        exp = np.exp(scaled)
+        return exp / exp.sum()
+    
+    def _get_head_weights(self) -> Dict:
+        """
+        Get the stacked weight matrix of the category, sentiment and urgency heads.
+        
+        Weights are loaded from settings.NLP_HEAD_WEIGHTS_PATH (an .npz file with
+        'category', 'sentiment' and 'urgency' matrices) when configured, and
+        otherwise derived from the label prototypes. Each head is a small
+        (labels x embedding size) matrix; they are stacked so a batch is scored
+        in one multiply and sliced per head afterwards.
+        
+        Returns:
+            Dictionary with the stacked 'weights' matrix and a slice per head
+        """
+        cache_key = f"nlp_head_weights_{self.versions['category_version']}"
+        heads = cache.get(cache_key)
+        
+        if heads is None:
+            weights_path = getattr(settings, 'NLP_HEAD_WEIGHTS_PATH', '')
+            if weights_path:
+                stored = np.load(weights_path)
+                matrices = [stored['category'], stored['sentiment'], stored['urgency']]
+            else:
+                category_texts = [
+                    f"This is a {category} article about {', '.join(keywords)}."
+                    for category, keywords in self.categories.items()
+                ]
+                matrices = [
+                    self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+                    for texts in (category_texts,
+                                  list(self.SENTIMENT_LABELS.values()),
+                                  list(self.URGENCY_LABELS.values()))
+                ]
+            
+            bounds = [int(b) for b in np.cumsum([0] + [len(m) for m in matrices])]
+            heads = {
+                'weights': np.vstack(matrices).astype(np.float32),
+                'category': slice(bounds[0], bounds[1]),
+                'sentiment': slice(bounds[1], bounds[2]),
+                'urgency': slice(bounds[2], bounds[3]),
+            }
+            
+            # Cache for 24 hours
+            cache.set(cache_key, heads, timeout=60*60*24)
+        
+        return heads
+    
     def _get_category_embeddings(self):
         """
         Get or compute embeddings for each category based on their keywords.
         """
-        cache_key = "category_embeddings"
+        cache_key = f"category_embeddings_{self.versions['category_version']}"
         embeddings = cache.get(cache_key)
         
         if embeddings is None:
@@ -238,6 +510,56 @@ class NLPService:
         return embeddings
 
 
+class LexiconNLPService(NLPService):
+    """
+    NLPService that never loads a model.
+    
+    Categories come from the keyword lexicon, sentiment and urgency from short
+    word lists and summaries are lead sentences. Output is deterministic and
+    costs microseconds per article, so offline replays and benchmarks can
+    measure the rest of the pipeline without the encoder.
+    """
+    
+    MODEL_NAME = 'lexicon'
+    POSITIVE_WORDS = ('win', 'wins', 'growth', 'record', 'breakthrough', 'recovery', 'success', 'celebrat')
+    NEGATIVE_WORDS = ('crisis', 'death', 'dead', 'killed', 'loss', 'disaster', 'decline', 'scandal', 'war')
+    URGENT_WORDS = ('breaking', 'just in', 'urgent', 'developing', 'live updates')
+    
+    def __init__(self, model_name: str = None):
+        self.model_name = self.MODEL_NAME
+        self.model = None
+        self.similarity_threshold = getattr(settings, 'SIMILARITY_THRESHOLD', 0.75)
+        self.categories = dict(self.CATEGORY_KEYWORDS)
+        self.urgency_calibration = None
+    
+    def generate_summary(self, text: str, num_sentences: int = 3) -> str:
+        if not text:
+            return ""
+        return ' '.join(re.split(r'(?<=[.!?])\s+', text.strip())[:num_sentences])
+    
+    def classify_category(self, title: str, description: str = "") -> str:
+        return self._classify_with_keywords(f"{title or ''} {description or ''}".lower()) or 'general'
+    
+    def enrich_batch(self, items: List[Dict]) -> List[Dict]:
+        results = []
+        for item in items:
+            text = f"{item.get('title') or ''} {item.get('description') or ''}".lower()
+            positive = sum(word in text for word in self.POSITIVE_WORDS)
+            negative = sum(word in text for word in self.NEGATIVE_WORDS)
+            sentiment = 'positive' if positive > negative else 'negative' if negative > positive else 'neutral'
+            results.append({
+                'category': self._classify_with_keywords(text) or 'general',
+                'sentiment': sentiment,
+                'sentiment_score': 1.0 if sentiment == 'neutral' else abs(positive - negative) / (positive + negative),
+                'urgency_score': 1.0 if any(word in text for word in self.URGENT_WORDS) else 0.0,
+            })
+        return results
+
+
+class NewsAPIError(Exception):
+    """Raised when NewsAPI cannot be queried or reports an error."""
+
+
 class NewsAPIService:
     """
     Service for interacting with the NewsAPI.
@@ -246,22 +568,99 @@ class NewsAPIService:
     
     BASE_URL = "https://newsapi.org/v2"
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, priority: str = None,
+                 rate_limiter: NewsAPIRateLimiter = None,
+                 response_cache: ResponseCache = None, use_cache: bool = None,
+                 base_url: str = None, session: requests.Session = None,
+                 rate_limit_timeout: float = None):
         """
         Initialize the NewsAPI service.
         
         Args:
             api_key: NewsAPI key (defaults to settings.NEWS_API_KEY)
+            priority: Rate limiter priority class for every request (defaults to
+                breaking for top headlines and default for searches)
+            rate_limiter: Shared limiter to use instead of the default one
+            response_cache: Response cache to use instead of the default one
+            use_cache: Serve repeated requests from the response cache (defaults to settings.NEWS_API_CACHE_ENABLED)
+            base_url: API root (defaults to settings.NEWS_API_BASE_URL, e.g. a local fake NewsAPI)
+            session: Session to use instead of the shared NewsAPI session
+            rate_limit_timeout: Longest wait for the rate limiter before a request is
+                skipped (defaults to settings.NEWS_API_RATE_LIMIT_TIMEOUT)
         """
+        self.rate_limit_timeout = rate_limit_timeout
         self.api_key = api_key or getattr(settings, 'NEWS_API_KEY', '')
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'NewsHub/1.0',
-            'Accept': 'application/json'
-        })
+        self.priority = priority
+        self._rate_limiter = rate_limiter
+        self._response_cache = response_cache
+        self.use_cache = use_cache if use_cache is not None else getattr(settings, 'NEWS_API_CACHE_ENABLED', True)
+        self.base_url = (base_url or getattr(settings, 'NEWS_API_BASE_URL', None) or self.BASE_URL).rstrip('/')
+        self.session = session or get_session('newsapi')
+    
+    @staticmethod
+    def endpoint_name(query: str = None) -> str:
+        """Name of the endpoint a request with these arguments goes to."""
+        return 'everything' if query else 'top-headlines'
+    
+    @property
+    def rate_limiter(self) -> NewsAPIRateLimiter:
+        if self._rate_limiter is None:
+            self._rate_limiter = NewsAPIRateLimiter()
+        return self._rate_limiter
+    
+    def _throttle(self, priority: str):
+        """
+        Wait for the cluster-wide rate limiter before a request.
+        
+        Raises:
+            RateLimitExceeded: If the request cannot be made within the budget
+        """
+        try:
+            self.rate_limiter.acquire(self.priority or priority, timeout=self.rate_limit_timeout)
+        except RateLimitExceeded:
+            raise
+        except Exception as e:
+            # Fail open: an unavailable Redis should not stop fetching
+            logger.warning(f"NewsAPI rate limiter unavailable, not throttling: {str(e)}")
+    
+    @property
+    def response_cache(self) -> ResponseCache:
+        if self._response_cache is None:
+            self._response_cache = ResponseCache()
+        return self._response_cache
+    
+    def _get(self, endpoint: str, params: Dict, priority: str):
+        """
+        GET an endpoint through the response cache and the rate limiter.
+        
+        Only requests that reach the network use rate-limit budget; a 429
+        records its Retry-After for every process.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        
+        def send(headers):
+            self._throttle(priority)
+            response = self.session.get(url, params=params, headers=headers)
+            if response.status_code == 429:
+                self.rate_limiter.record_retry_after(response.headers.get('Retry-After'))
+            return response
+        
+        response = None
+        if self.use_cache:
+            try:
+                response = self.response_cache.get(endpoint, url, params, send)
+            except (RateLimitExceeded, requests.exceptions.RequestException):
+                raise
+            except Exception as e:
+                logger.warning(f"NewsAPI response cache unavailable, fetching directly: {str(e)}")
+        if response is None:
+            response = send({})
+        response.raise_for_status()
+        return response
     
     def fetch_articles(self, query: str = None, category: str = None, 
-                      page_size: int = 20, page: int = 1) -> List[Dict]:
+                      page_size: int = 20, page: int = 1,
+                      from_date: datetime = None) -> List[Dict]:
         """
         Fetch articles from NewsAPI.
         
@@ -270,49 +669,16 @@ class NewsAPIService:
             category: News category (e.g., 'technology', 'business')
             page_size: Number of results per page (1-100)
             page: Page number
+            from_date: Only return articles published after this (/everything only)
             
         Returns:
-            List of article dictionaries
+            List of article dictionaries, empty if the request failed
         """
-        if not self.api_key:
-            logger.error("NewsAPI key not configured")
-            return []
-            
         try:
-            # Build request URL
-            if query:
-                endpoint = f"{self.BASE_URL}/everything"
-                params = {
-                    'q': query,
-                    'pageSize': min(page_size, 100),
-                    'page': page,
-                    'sortBy': 'publishedAt',
-                    'language': 'en',
-                    'apiKey': self.api_key
-                }
-            else:
-                endpoint = f"{self.BASE_URL}/top-headlines"
-                params = {
-                    'category': category or 'general',
-                    'country': 'us',
-                    'pageSize': min(page_size, 100),
-                    'page': page,
-                    'apiKey': self.api_key
-                }
-            
-            # Make the request
-            response = self.session.get(endpoint, params=params, timeout=10)
-            response.raise_for_status()
-            
-            # Parse response
-            data = response.json()
-            
-            if data.get('status') != 'ok':
-                logger.error(f"NewsAPI error: {data.get('message', 'Unknown error')}")
-                return []
-                
-            return data.get('articles', [])
-            
+            return self._fetch_page(query, category, page_size, page, from_date)[0]
+        except RateLimitExceeded as e:
+            logger.warning(f"Skipping NewsAPI request: {str(e)}")
+            return []
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching articles from NewsAPI: {str(e)}")
             return []
@@ -320,6 +686,173 @@ class NewsAPIService:
             logger.error(f"Unexpected error in fetch_articles: {str(e)}")
             return []
     
+    def _fetch_page(self, query: str = None, category: str = None, page_size: int = 20,
+                    page: int = 1, from_date: datetime = None) -> Tuple[List[Dict], int]:
+        """
+        Fetch one page of articles along with the total number of results.
+        
+        Failures raise rather than coming back as an empty page, so pollers
+        can tell a failed request from a quiet source.
+        
+        Returns:
+            Tuple of (list of article dictionaries, totalResults)
+        
+        Raises:
+            NewsAPIError: If the key is missing or NewsAPI reports an error
+            RateLimitExceeded: If the request cannot be made within the budget
+            requests.exceptions.RequestException: If the request fails
+        """
+        if not self.api_key:
+            raise NewsAPIError("NewsAPI key not configured")
+        
+        # Build request URL
+        if query:
+            endpoint = 'everything'
+            params = {
+                'q': query,
+                'pageSize': min(page_size, 100),
+                'page': page,
+                'sortBy': 'publishedAt',
+                'language': 'en',
+                'apiKey': self.api_key
+            }
+            if from_date:
+                params['from'] = from_date.strftime('%Y-%m-%dT%H:%M:%S')
+        else:
+            endpoint = 'top-headlines'
+            params = {
+                'category': category or 'general',
+                'country': 'us',
+                'pageSize': min(page_size, 100),
+                'page': page,
+                'apiKey': self.api_key
+            }
+        
+        # Make the request
+        response = self._get(endpoint, params, PRIORITY_DEFAULT if query else PRIORITY_BREAKING)
+        
+        # Parse response
+        data = response.json()
+        
+        if data.get('status') != 'ok':
+            raise NewsAPIError(f"NewsAPI error: {data.get('message', 'Unknown error')}")
+            
+        return data.get('articles', []), data.get('totalResults', 0)
+    
+    def iter_pages(self, query: str = None, category: str = None, page_size: int = 100,
+                   max_pages: int = None, from_date: datetime = None,
+                   prefetch: bool = True) -> Iterator[List[Dict]]:
+        """
+        Yield pages of articles until the results or the page budget run out.
+        
+        With prefetching, the next page is requested in the background while the
+        caller processes the current one. Stopping early (breaking out of the
+        loop) cancels the prefetch if it has not started yet, so at most one
+        extra page is requested.
+        
+        Args:
+            query: Search query
+            category: News category
+            page_size: Number of results per page (1-100)
+            max_pages: Page (and so request) budget (defaults to settings.NEWS_API_MAX_PAGES)
+            from_date: Only return articles published after this (/everything only)
+            prefetch: Request the next page while the current one is processed
+            
+        Yields:
+            Lists of article dictionaries, one per page
+        
+        Raises:
+            NewsAPIError, RateLimitExceeded, requests.exceptions.RequestException:
+                If a page cannot be fetched (see _fetch_page)
+        """
+        max_pages = max_pages or getattr(settings, 'NEWS_API_MAX_PAGES', 5)
+        page_size = min(page_size, 100)
+        
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='newsapi-prefetch') as prefetcher:
+            future = prefetcher.submit(self._fetch_page, query, category, page_size, 1, from_date)
+            page = 1
+            try:
+                while future is not None:
+                    articles, total_results = future.result()
+                    has_more = (len(articles) == page_size and page * page_size < total_results
+                                and page < max_pages)
+                    future = None
+                    if has_more and prefetch:
+                        future = prefetcher.submit(self._fetch_page, query, category, page_size, page + 1, from_date)
+                    
+                    if articles:
+                        yield articles
+                    
+                    if has_more and not prefetch:
+                        future = prefetcher.submit(self._fetch_page, query, category, page_size, page + 1, from_date)
+                    page += 1
+            finally:
+                if future is not None:
+                    future.cancel()
+    
+    def iter_articles(self, query: str = None, category: str = None, page_size: int = 100,
+                      max_pages: int = None, from_date: datetime = None,
+                      limit: int = None) -> Iterator[Dict]:
+        """
+        Stream articles one at a time across pages, with bounded memory.
+        
+        Args:
+            query: Search query
+            category: News category
+            page_size: Number of results per page (1-100)
+            max_pages: Page (and so request) budget (defaults to settings.NEWS_API_MAX_PAGES)
+            from_date: Only return articles published after this (/everything only)
+            limit: Stop after this many articles
+            
+        Yields:
+            Article dictionaries
+        """
+        count = 0
+        for articles in self.iter_pages(query, category, page_size, max_pages, from_date):
+            for article in articles:
+                yield article
+                count += 1
+                if limit and count >= limit:
+                    return
+    
+    def fetch_new_articles(self, state, query: str = None, category: str = None,
+                           page_size: int = 100, max_pages: int = None) -> List[Dict]:
+        """
+        Fetch only articles newer than a FetchState's high-water mark.
+        
+        Passes `from` where the endpoint supports it and stops paginating at the
+        first page that holds nothing new, so API calls scale with new content.
+        Prefetching is off because the first page is usually the last one.
+        The caller advances the state once the articles have been stored.
+        
+        Args:
+            state: FetchState for this (endpoint, category, query)
+            query: Search query
+            category: News category
+            page_size: Number of results per page (1-100)
+            max_pages: Maximum number of pages to request (defaults to settings.NEWS_API_MAX_PAGES)
+            
+        Returns:
+            List of article dictionaries not seen by earlier fetches
+        
+        Raises:
+            NewsAPIError, RateLimitExceeded, requests.exceptions.RequestException:
+                If a page cannot be fetched, so a failed poll is not taken for a quiet one
+        """
+        new_articles = []
+        pages = self.iter_pages(query=query, category=category, page_size=page_size,
+                                max_pages=max_pages, from_date=state.cutoff, prefetch=False)
+        
+        for articles in pages:
+            fresh = [article for article in articles if not state.is_known(article)]
+            new_articles.extend(fresh)
+            
+            # A page with nothing new means everything after it is known too
+            if not fresh:
+                break
+        
+        return new_articles
+    
     def get_sources(self, category: str = None, language: str = 'en') -> List[Dict]:
         """
         Get available news sources.
@@ -337,7 +870,7 @@ class NewsAPIService:
             
         try:
             # Build request URL
-            endpoint = f"{self.BASE_URL}/sources"
+            endpoint = 'sources'
             params = {
                 'apiKey': self.api_key,
                 'language': language
@@ -347,8 +880,7 @@ class NewsAPIService:
                 params['category'] = category
             
             # Make the request
-            response = self.session.get(endpoint, params=params, timeout=10)
-            response.raise_for_status()
+            response = self._get(endpoint, params, PRIORITY_DEFAULT)
             
             # Parse response
             data = response.json()
@@ -359,6 +891,9 @@ class NewsAPIService:
                 
             return data.get('sources', [])
             
+        except RateLimitExceeded as e:
+            logger.warning(f"Skipping NewsAPI request: {str(e)}")
+            return []
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching sources from NewsAPI: {str(e)}")
             return []
@@ -369,4 +904,5 @@ class NewsAPIService:
 
 # Initialize global instances
 nlp_service = NLPService()
-news_api_service = NewsAPIService()
\ No newline at end of file
+# Shared with request handlers, which must not sit waiting for the rate limiter
+news_api_service = NewsAPIService(rate_limit_timeout=getattr(settings, 'NEWS_API_RATE_LIMIT_REQUEST_TIMEOUT', 0))
\ No newline at end of file
@@ -0,0 +1,414 @@
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from nltk.tokenize import sent_tokenize
+
+logger = logging.getLogger(__name__)
+
+# Summarization quality tiers, cheapest first
+TIER_LEAD = 'lead'
+TIER_EXTRACTIVE = 'extractive'
+TIER_ABSTRACTIVE = 'abstractive'
+
+# Matches Article.SUMMARY_TIER_CHOICES
+TIER_RANK = {TIER_LEAD: 0, TIER_EXTRACTIVE: 1, TIER_ABSTRACTIVE: 2}
+
+# Article.summary_state values
+STATE_PLACEHOLDER = 'placeholder'
+STATE_COMPLETE = 'complete'
+
+# Initial per-article cost estimates in seconds, refined from observed timings
+DEFAULT_TIER_COSTS = {
+    TIER_ABSTRACTIVE: 2.0,
+    TIER_EXTRACTIVE: 0.3,
+    TIER_LEAD: 0.0,
+}
+
+_abstractive_summarizer = None
+
+
+def get_abstractive_summarizer():
+    """
+    Load the abstractive (BART) summarization pipeline on first use.
+
+    Returns:
+        transformers summarization pipeline
+    """
+    global _abstractive_summarizer
+    if _abstractive_summarizer is None:
+        from transformers import pipeline
+        model = getattr(settings, 'SUMMARY_ABSTRACTIVE_MODEL', 'facebook/bart-large-cnn')
+        logger.info(f"Loading abstractive summarizer: {model}")
+        _abstractive_summarizer = pipeline("summarization", model=model)
+    return _abstractive_summarizer
+
+
+def lead_summary(text: str, description: str = "", num_sentences: int = 3) -> str:
+    """
+    Cheapest summary: the NewsAPI description, or the lead sentences of the text.
+
+    Args:
+        text: Article text
+        description: NewsAPI description (optional)
+        num_sentences: Number of lead sentences to keep
+
+    Returns:
+        Summary text
+    """
+    if description:
+        return description.strip()
+    if not text:
+        return ""
+    try:
+        return ' '.join(sent_tokenize(text)[:num_sentences])
+    except Exception:
+        return text[:getattr(settings, 'MAX_SUMMARY_LENGTH', 200)]
+
+
+class EagerAllowlist:
+    """
+    Decides which articles still get a full summary at ingest in lazy mode.
+
+    Articles in a followed or explicitly configured category, or whose title or
+    description hits an active keyword alert, are summarized eagerly.
+    """
+
+    CACHE_KEY = 'summary_eager_allowlist'
+    CACHE_TIMEOUT = 60 * 5
+
+    def __init__(self):
+        data = cache.get(self.CACHE_KEY)
+        if data is None:
+            data = self._load()
+            cache.set(self.CACHE_KEY, data, timeout=self.CACHE_TIMEOUT)
+        self.categories = set(data['categories'])
+        self.keywords = data['keywords']
+
+    @staticmethod
+    def _load() -> Dict:
+        from .models import KeywordAlert, TopicFollow
+
+        categories = {c.lower() for c in getattr(settings, 'SUMMARY_EAGER_CATEGORIES', [])}
+        if getattr(settings, 'SUMMARY_EAGER_FOLLOWED_CATEGORIES', True):
+            categories.update(
+                c.lower() for c in TopicFollow.objects.values_list('category', flat=True).distinct()
+            )
+        keywords = []
+        if getattr(settings, 'SUMMARY_EAGER_ALERT_HITS', True):
+            alerts = KeywordAlert.objects.filter(is_active=True, user__is_active=True)
+            keywords = sorted({k.lower() for k in alerts.values_list('keyword', flat=True)})
+        return {'categories': sorted(categories), 'keywords': keywords}
+
+    def matches(self, title: str = "", description: str = "", category: str = "") -> bool:
+        """
+        Check whether an article should be summarized at ingest.
+
+        Args:
+            title: Article title
+            description: Article description
+            category: Predicted category
+
+        Returns:
+            True if the article is on the allowlist
+        """
+        if category and category.lower() in self.categories:
+            return True
+        text = f"{title} {description}".lower()
+        return any(keyword in text for keyword in self.keywords)
+
+
+class SummarizationScheduler:
+    """
+    Picks a summarization tier per article so a whole fetch fits a time budget.
+
+    Each article gets the best tier whose estimated cost fits its share of the
+    remaining budget, where the share depends on how many articles are still
+    queued and whether the source is a priority source. Articles that end up in
+    a cheaper tier are recorded as such and upgraded later by
+    `upgrade_summaries_task`.
+    """
+
+    def __init__(self, nlp_service=None, time_budget: float = None,
+                 max_tier: str = None, priority_sources=None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            nlp_service: NLPService used for the extractive tier (loaded lazily if omitted)
+            time_budget: Seconds available for the whole fetch (defaults to settings.SUMMARY_TIME_BUDGET_SECONDS)
+            max_tier: Best tier to use (defaults to settings.SUMMARY_MAX_TIER)
+            priority_sources: Source names that get a larger share of the budget
+        """
+        self._nlp_service = nlp_service
+        self.time_budget = time_budget if time_budget is not None else getattr(
+            settings, 'SUMMARY_TIME_BUDGET_SECONDS', 120)
+        self.max_tier = max_tier or getattr(settings, 'SUMMARY_MAX_TIER', TIER_ABSTRACTIVE)
+        self.priority_sources = set(
+            priority_sources if priority_sources is not None
+            else getattr(settings, 'SUMMARY_PRIORITY_SOURCES', [])
+        )
+        self.lazy = getattr(settings, 'SUMMARY_MODE', 'eager') == 'lazy'
+        self._allowlist = None
+        self.costs = dict(DEFAULT_TIER_COSTS)
+        self.counts = {tier: 0 for tier in TIER_RANK}
+        self.deferred = 0
+        self.started = time.monotonic()
+
+    @property
+    def nlp_service(self):
+        if self._nlp_service is None:
+            from .services import NLPService
+            self._nlp_service = NLPService()
+        return self._nlp_service
+
+    @property
+    def allowlist(self) -> EagerAllowlist:
+        if self._allowlist is None:
+            self._allowlist = EagerAllowlist()
+        return self._allowlist
+
+    @property
+    def remaining_budget(self) -> float:
+        return self.time_budget - (time.monotonic() - self.started)
+
+    def choose_tier(self, source: str = "", queue_depth: int = 1) -> str:
+        """
+        Choose a tier for the next article.
+
+        Args:
+            source: Source name of the article
+            queue_depth: Number of articles still waiting, including this one
+
+        Returns:
+            Tier name
+        """
+        remaining = self.remaining_budget
+        if remaining <= 0:
+            return TIER_LEAD
+
+        share = remaining / max(queue_depth, 1)
+        if source in self.priority_sources:
+            share *= 2
+
+        for tier in (TIER_ABSTRACTIVE, TIER_EXTRACTIVE):
+            if TIER_RANK[tier] <= TIER_RANK[self.max_tier] and self.costs[tier] <= share:
+                return tier
+        return TIER_LEAD
+
+    def summarize(self, text: str, description: str = "", source: str = "",
+                  queue_depth: int = 1, tier: str = None) -> Tuple[str, str]:
+        """
+        Summarize an article in the chosen tier, degrading on failure.
+
+        Args:
+            text: Article text
+            description: NewsAPI description, used by the lead tier
+            source: Source name of the article
+            queue_depth: Number of articles still waiting, including this one
+            tier: Force a tier instead of choosing one
+
+        Returns:
+            Tuple of (summary, tier actually used)
+        """
+        tier = tier or self.choose_tier(source, queue_depth)
+
+        for candidate in (TIER_ABSTRACTIVE, TIER_EXTRACTIVE):
+            if TIER_RANK[candidate] > TIER_RANK[tier] or not text:
+                continue
+            started = time.monotonic()
+            try:
+                summary = self._run_tier(candidate, text)
+            except Exception as e:
+                logger.warning(f"{candidate} summarization failed, degrading: {str(e)}")
+                continue
+            self._observe(candidate, time.monotonic() - started)
+            if summary:
+                self.counts[candidate] += 1
+                return summary, candidate
+
+        self.counts[TIER_LEAD] += 1
+        return lead_summary(text, description), TIER_LEAD
+
+    def summarize_at_ingest(self, text: str, description: str = "", source: str = "",
+                            queue_depth: int = 1, title: str = "",
+                            category: str = "") -> Tuple[str, str, str]:
+        """
+        Summarize an article at ingest, or store a placeholder in lazy mode.
+
+        In lazy mode only allowlisted articles are summarized; everything else
+        gets a lead summary and is completed by `ensure_summary` on first read.
+
+        Args:
+            text: Article text
+            description: NewsAPI description
+            source: Source name of the article
+            queue_depth: Number of articles still waiting, including this one
+            title: Article title, checked against the eager allowlist
+            category: Predicted category, checked against the eager allowlist
+
+        Returns:
+            Tuple of (summary, tier, summary state)
+        """
+        if self.lazy and not self.allowlist.matches(title, description, category):
+            self.deferred += 1
+            return lead_summary(text, description), TIER_LEAD, STATE_PLACEHOLDER
+        summary, tier = self.summarize(text, description, source, queue_depth)
+        return summary, tier, STATE_COMPLETE
+
+    def _run_tier(self, tier: str, text: str) -> str:
+        if tier == TIER_ABSTRACTIVE:
+            result = get_abstractive_summarizer()(
+                text[:5000], max_length=100, min_length=30, do_sample=False)
+            return result[0]['summary_text']
+        return self.nlp_service.generate_summary(text)
+
+    def _observe(self, tier: str, duration: float):
+        """Fold an observed duration into the tier's cost estimate (EWMA)."""
+        self.costs[tier] = 0.7 * self.costs[tier] + 0.3 * duration
+
+    def get_stats(self) -> Dict:
+        """
+        Get per-tier counts and cost estimates for this fetch.
+
+        Returns:
+            Dictionary of scheduler statistics
+        """
+        return {
+            'counts': dict(self.counts),
+            'deferred': self.deferred,
+            'costs': {tier: round(cost, 3) for tier, cost in self.costs.items()},
+            'elapsed': round(time.monotonic() - self.started, 2),
+            'time_budget': self.time_budget,
+        }
+
+
+def request_summary(article) -> str:
+    """
+    Return an article's summary for a read, without computing it in the request.
+
+    A placeholder summary is queued for summarize_article_task on the enrich
+    workers, at most once per SUMMARY_LAZY_QUEUE_SECONDS, and the placeholder
+    is returned until the result is in.
+
+    Args:
+        article: Article instance
+
+    Returns:
+        Summary text (the placeholder while the full summary is pending)
+    """
+    if article.summary_state != STATE_PLACEHOLDER:
+        return article.summary
+
+    cached = cache.get(f"article_summary:{article.pk}")
+    if cached is not None:
+        return cached
+
+    queued_timeout = getattr(settings, 'SUMMARY_LAZY_QUEUE_SECONDS', 60)
+    if cache.add(f"article_summary_queued:{article.pk}", 1, timeout=queued_timeout):
+        from .tasks import summarize_article_task
+        summarize_article_task.delay(article.pk)
+    return article.summary
+
+
+class _LockRenewer:
+    """Extends a held Redis lock every third of its TTL until stopped."""
+
+    def __init__(self, redis, key: str, token: str, ttl_ms: int):
+        self.redis, self.key, self.token, self.ttl_ms = redis, key, token, ttl_ms
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lock-{key}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        from .leases import RENEW_LEASE_SCRIPT
+
+        while not self._stopped.wait(self.ttl_ms / 3000):
+            try:
+                if not self.redis.eval(RENEW_LEASE_SCRIPT, 1, self.key, self.token, self.ttl_ms):
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew lock {self.key}: {str(e)}")
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+def ensure_summary(article, wait_timeout: float = None, redis=None) -> str:
+    """
+    Return the full summary of an article, computing it if it is a placeholder.
+
+    Runs on the workers (see request_summary). Concurrent callers are
+    collapsed into a single computation: the first one takes a Redis lock and
+    summarizes, the others wait for its result. The lock holds a random token
+    and is only released by its holder, so a computation that outlives the
+    lock cannot release the lock of the one that took over. The holder renews
+    the lock while it computes, so a slow summary (BART on a CPU) keeps it
+    however long it runs, yet it expires soon after a worker dies. The result
+    is persisted with a conditional update, so each article is written at
+    most once.
+
+    Args:
+        article: Article instance
+        wait_timeout: Seconds to wait for another worker's result (defaults to settings.SUMMARY_LAZY_WAIT_SECONDS)
+        redis: Redis client for the lock (defaults to the django_redis 'default' connection)
+
+    Returns:
+        Summary text (the placeholder if the computation did not finish in time)
+    """
+    from .http_cache import RELEASE_LOCK_SCRIPT
+    from .models import Article
+    from .services import NLPService
+
+    if article.summary_state != STATE_PLACEHOLDER:
+        return article.summary
+
+    result_key = f"article_summary:{article.pk}"
+    lock_key = f"newshub:article_summary_lock:{article.pk}"
+    wait_timeout = wait_timeout if wait_timeout is not None else getattr(
+        settings, 'SUMMARY_LAZY_WAIT_SECONDS', 10)
+    if redis is None:
+        from django_redis import get_redis_connection
+        redis = get_redis_connection('default')
+
+    cached = cache.get(result_key)
+    if cached is not None:
+        return cached
+
+    token = uuid.uuid4().hex
+    lock_ms = max(int(wait_timeout * 3 * 1000), 1000)
+    if not redis.set(lock_key, token, nx=True, px=lock_ms):
+        # Another worker is computing it; wait for the result
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            cached = cache.get(result_key)
+            if cached is not None:
+                return cached
+        return article.summary
+
+    renewer = _LockRenewer(redis, lock_key, token, lock_ms)
+    try:
+        scheduler = SummarizationScheduler()
+        tier = getattr(settings, 'SUMMARY_LAZY_TIER', '') or scheduler.max_tier
+        summary, tier = scheduler.summarize(article.content, tier=tier)
+        cache.set(result_key, summary, timeout=60 * 5)
+        Article.objects.filter(pk=article.pk, summary_state=STATE_PLACEHOLDER).update(
+            summary=summary,
+            summary_tier=tier,
+            summary_state=STATE_COMPLETE,
+            summary_version=NLPService.get_versions()['summary_version'],
+        )
+        article.summary, article.summary_tier, article.summary_state = summary, tier, STATE_COMPLETE
+        return summary
+    except Exception as e:
+        logger.error(f"Error computing summary for article {article.pk}: {str(e)}", exc_info=True)
+        return article.summary
+    finally:
+        renewer.stop()
+        redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
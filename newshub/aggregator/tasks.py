@@ -1,76 +1,990 @@
 import logging
+import time
+from collections import Counter
 from datetime import datetime, timedelta
-from celery import shared_task
+from itertools import islice
+from celery import chord, group, shared_task
+from celery.utils import worker_direct
 from django.conf import settings
 from django.core.mail import send_mail, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.utils.dateparse import parse_datetime
+from django.db.models import Count, F, Q
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
-from .models import Article, User, KeywordAlert, UserPreference, Notification, NotificationPreference
+from .models import (Article, FeedSource, FetchState, PollSchedule, WebSubSubscription, User, KeywordAlert,
+                     UserPreference, Notification, NotificationPreference)
 from .services import NewsAPIService, NLPService
+from .feeds import FeedService
+from .websub import WebSubService
+from .summarization import SummarizationScheduler, TIER_RANK, STATE_COMPLETE, ensure_summary
+from .rate_limiter import PRIORITY_BACKFILL
+from .leases import LeaseManager, LeaseUnavailable, NodeRegistry, fetch_lease_name
+from .query_planner import AlertQueryPlanner, build_query, query_cutoff, record_hits, record_queried
+from . import metrics, pipeline, scheduler
+from .ingest import bulk_upsert_articles, existing_urls
 from .notification_service import NotificationService
 from .email_service import EmailService
 from .webpush_service import WebPushService
 
 logger = logging.getLogger(__name__)
 
+def _enrich_articles(articles, nlp_service, scheduler):
+    """
+    Classify and summarize a batch of NewsAPI articles.
+    
+    Category, sentiment and urgency come from one batched NLP pass; summaries
+    are produced within the scheduler's time budget (or deferred in lazy mode).
+    
+    Returns:
+        The article dicts, each with an 'enrichment' dict of the Article fields
+    """
+    versions = nlp_service.versions
+    enrichments = nlp_service.enrich_batch(articles)
+    
+    enriched = []
+    for index, (article_data, enrichment) in enumerate(zip(articles, enrichments)):
+        try:
+            summary, summary_tier, summary_state = scheduler.summarize_at_ingest(
+                article_data.get('content') or '',
+                description=article_data.get('description') or '',
+                source=article_data['source']['name'],
+                queue_depth=len(articles) - index,
+                title=article_data['title'],
+                category=enrichment['category']
+            )
+            article_data['enrichment'] = {
+                'category': enrichment['category'],
+                'sentiment': enrichment['sentiment'],
+                'sentiment_score': enrichment['sentiment_score'],
+                'urgency_score': enrichment['urgency_score'],
+                'summary': summary,
+                'summary_tier': summary_tier,
+                'summary_state': summary_state,
+                'summary_version': versions['summary_version'],
+                'category_version': versions['category_version'],
+                'enriched_at': timezone.now().isoformat(),
+            }
+            enriched.append(article_data)
+            
+        except Exception as e:
+            logger.error(f"Error processing article {article_data.get('url', 'unknown')}: {str(e)}", 
+                        exc_info=True)
+            continue
+    
+    return enriched
+
+
+def _build_article(article_data):
+    """Build an unsaved Article from an article dict enriched by _enrich_articles."""
+    enrichment = article_data['enrichment']
+    return Article(
+        title=article_data['title'],
+        url=article_data['url'],
+        source=article_data['source']['name'],
+        # Undated feed entries are dated when first stored
+        published_at=article_data['publishedAt'] or timezone.now(),
+        content=article_data['content'] or '',
+        summary=enrichment['summary'],
+        summary_tier=enrichment['summary_tier'],
+        summary_state=enrichment['summary_state'],
+        category=enrichment['category'],
+        sentiment=enrichment['sentiment'],
+        sentiment_score=enrichment['sentiment_score'],
+        urgency_score=enrichment['urgency_score'],
+        image_url=article_data.get('urlToImage', ''),
+        summary_version=enrichment['summary_version'],
+        category_version=enrichment['category_version'],
+        enriched_at=enrichment['enriched_at']
+    )
+
+
+def _ingest_articles(articles, nlp_service, scheduler, match_alerts=True):
+    """
+    Enrich, summarize and store a batch of NewsAPI articles in-process.
+    
+    Scheduled fetches go through the staged pipeline instead; this is for
+    callers that manage their own budget, like backfills. Rows are persisted
+    with one bulk upsert. Keyword alerts are checked per created article
+    unless match_alerts is False, in which case the caller matches the
+    returned ids in bulk.
+    
+    Returns:
+        List of ids of the articles that were created
+    """
+    # Skip articles we already have (one query for the whole batch)
+    known_urls = existing_urls(a['url'] for a in articles)
+    new_articles = [article_data for article_data in articles if article_data['url'] not in known_urls]
+    
+    rows = [_build_article(article_data) for article_data in _enrich_articles(new_articles, nlp_service, scheduler)]
+    created_ids = list(bulk_upsert_articles(rows).values())
+    
+    # Check for keyword matches and send alerts
+    if match_alerts:
+        for article_id in created_ids:
+            check_keyword_matches.delay(article_id)
+    
+    return created_ids
+
+
+def _defer_if_backlogged(task, stage, *args, **kwargs):
+    """
+    Re-queue a stage task with a delay if the stage it feeds is backlogged.
+    
+    Returns:
+        True if the task was deferred and should return without doing work
+    """
+    if not pipeline.is_backlogged(stage):
+        return False
+    metrics.incr(f"pipeline.{stage}.backpressure")
+    countdown = getattr(settings, 'INGEST_BACKPRESSURE_DELAY', 30)
+    _renew_poll_lease([kwargs.get('schedule_id')], kwargs.get('lease'), countdown)
+    task.apply_async(args=args, kwargs=kwargs, countdown=countdown)
+    return True
+
+
+def _split_known(articles):
+    """
+    Split fetched articles into those we do not store yet and those we do.
+    
+    Returns:
+        tuple: (fresh articles, already stored articles)
+    """
+    known_urls = existing_urls(a['url'] for a in articles)
+    fresh = [article_data for article_data in articles if article_data['url'] not in known_urls]
+    known = [article_data for article_data in articles if article_data['url'] in known_urls]
+    return fresh, known
+
+
+def _queue_articles(fresh):
+    """
+    Park articles in batches of settings.INGEST_STAGE_BATCH_SIZE and hand them to the extract stage.
+    
+    Returns:
+        Number of articles queued
+    """
+    store = pipeline.StagingStore()
+    for batch in pipeline.chunked(fresh, getattr(settings, 'INGEST_STAGE_BATCH_SIZE', 50)):
+        extract_stage_task.delay(store.put(batch))
+    metrics.incr('pipeline.fetch.items', len(fresh))
+    return len(fresh)
+
+
+def _submit_articles(articles):
+    """
+    Feed fetched articles into the staged pipeline, dropping the ones we already store.
+    
+    Returns:
+        Number of articles queued
+    """
+    fresh, _ = _split_known(articles)
+    return _queue_articles(fresh)
+
+
+def _hand_on(store, batch_id, articles, next_task):
+    """Park a processed batch for the next stage and drop the one it came from."""
+    next_task.delay(store.put(articles))
+    store.delete(batch_id)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def extract_stage_task(self, batch_id):
+    """
+    Pipeline stage: download each article's page and extract its full text.
+    
+    Args:
+        batch_id: StagingStore id of a batch of article dicts
+    """
+    try:
+        if _defer_if_backlogged(self, 'enrich', batch_id):
+            return "Deferred: enrich stage backlogged"
+        store = pipeline.StagingStore()
+        articles = store.get(batch_id)
+        if articles is None:
+            logger.warning(f"Staged batch {batch_id} expired before extraction")
+            return "Batch expired"
+        
+        if getattr(settings, 'INGEST_EXTRACT_FULL_TEXT', True):
+            with metrics.timer('pipeline.extract'):
+                pipeline.extract_full_text(articles)
+        metrics.incr('pipeline.extract.items', len(articles))
+        _hand_on(store, batch_id, articles, enrich_stage_task)
+        return f"Extracted {len(articles)} articles"
+        
+    except Exception as e:
+        logger.error(f"Error in extract_stage_task: {str(e)}", exc_info=True)
+        self.retry(exc=e)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def enrich_stage_task(self, batch_id):
+    """
+    Pipeline stage: classify and summarize a batch of articles.
+    
+    Args:
+        batch_id: StagingStore id of a batch of article dicts
+    """
+    try:
+        if _defer_if_backlogged(self, 'persist', batch_id):
+            return "Deferred: persist stage backlogged"
+        store = pipeline.StagingStore()
+        articles = store.get(batch_id)
+        if articles is None:
+            logger.warning(f"Staged batch {batch_id} expired before enrichment")
+            return "Batch expired"
+        
+        with metrics.timer('pipeline.enrich'):
+            nlp_service = NLPService()
+            scheduler = SummarizationScheduler(nlp_service=nlp_service)
+            enriched = _enrich_articles(articles, nlp_service, scheduler)
+        metrics.incr('pipeline.enrich.items', len(enriched))
+        _hand_on(store, batch_id, enriched, persist_stage_task)
+        return f"Enriched {len(enriched)} articles"
+        
+    except Exception as e:
+        logger.error(f"Error in enrich_stage_task: {str(e)}", exc_info=True)
+        self.retry(exc=e)
+
+
+def _confirm_fetched(articles):
+    """Move the FetchState each stored article was fetched for past it (see FetchState.advance)."""
+    by_state = {}
+    for article_data in articles:
+        if article_data.get('fetch_state_id'):
+            by_state.setdefault(article_data['fetch_state_id'], []).append(article_data)
+    for state_id, stored in by_state.items():
+        FetchState.confirm(state_id, stored)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def persist_stage_task(self, batch_id):
+    """
+    Pipeline stage: store a batch of enriched articles with one bulk upsert.
+    
+    The ids of the created articles are passed on to keyword alert matching,
+    and only now do the fetch states of the articles move past them; a batch
+    that never gets here leaves its articles to be fetched again.
+    
+    Args:
+        batch_id: StagingStore id of a batch of enriched article dicts
+    """
+    try:
+        if _defer_if_backlogged(self, 'alerts', batch_id):
+            return "Deferred: alerts stage backlogged"
+        store = pipeline.StagingStore()
+        articles = store.get(batch_id)
+        if articles is None:
+            logger.warning(f"Staged batch {batch_id} expired before persisting")
+            return "Batch expired"
+        
+        with metrics.timer('pipeline.persist'):
+            created_ids = list(bulk_upsert_articles([_build_article(a) for a in articles]).values())
+        # Stored now, whether created here or already there
+        _confirm_fetched(articles)
+        metrics.incr('pipeline.persist.items', len(created_ids))
+        metrics.incr('fetch.articles_created', len(created_ids))
+        if created_ids:
+            check_keyword_matches_batch.delay(created_ids)
+        store.delete(batch_id)
+        return f"Stored {len(created_ids)} of {len(articles)} articles"
+        
+    except Exception as e:
+        logger.error(f"Error in persist_stage_task: {str(e)}", exc_info=True)
+        self.retry(exc=e)
+
+
+def _complete_poll(schedule_id, lease, **outcome):
+    """Report a scheduled poll's outcome back to the poll queue, if it came from there."""
+    if schedule_id is None:
+        return
+    try:
+        scheduler.complete(schedule_id, lease, **outcome)
+    except Exception as e:
+        # The lease runs out and the entry is polled again
+        logger.warning(f"Could not reschedule poll {schedule_id}: {str(e)}")
+
+
+def _release_poll(schedule_id, lease):
+    """Hand a scheduled poll's entry back to the poll queue without an outcome, if it came from there."""
+    if schedule_id is None:
+        return
+    try:
+        scheduler.release(schedule_id, lease)
+    except Exception as e:
+        # The lease runs out and the entry is polled again
+        logger.warning(f"Could not release poll {schedule_id}: {str(e)}")
+
+
+def _renew_poll_lease(schedule_ids, lease, countdown):
+    """Keep scheduled polls leased while they wait `countdown` seconds to run again."""
+    schedule_ids = [schedule_id for schedule_id in schedule_ids or () if schedule_id is not None]
+    if not schedule_ids or not lease:
+        return
+    try:
+        scheduler.renew(lease, schedule_ids, countdown + getattr(settings, 'POLL_LEASE_SECONDS', 900))
+    except Exception as e:
+        # The lease may run out during the wait and the entry be polled twice
+        logger.warning(f"Could not renew the lease of polls {schedule_ids}: {str(e)}")
+
+
+def _retries_exhausted(task):
+    return task.request.retries >= task.max_retries
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=300)
-def fetch_articles_task(self, category=None):
+def fetch_articles_task(self, category=None, query=None, schedule_id=None, lease=None):
     """
-    Task to fetch articles from NewsAPI and process them.
+    Pipeline stage: fetch new articles from NewsAPI and queue them for extraction.
+    
+    The fetch holds the source's lease (see leases.LeaseManager), so runs
+    that overlap, because one is slow, retried or started by the
+    fetch_articles command, skip the source instead of fetching it twice.
+    
+    Args:
+        category: News category
+        query: Search query
+        schedule_id: PollSchedule entry this fetch was dispatched for
+        lease: Lease token of that entry
+    
+    Returns:
+        dict: Fetch statistics; once retries are exhausted, an `error` entry
+        instead, so a fetch_all_articles_task chord still completes
     """
     try:
+        if _defer_if_backlogged(self, 'extract', category=category, query=query,
+                                schedule_id=schedule_id, lease=lease):
+            return "Deferred: extract stage backlogged"
+        started = time.monotonic()
         news_service = NewsAPIService()
+        endpoint = news_service.endpoint_name(query)
+        
+        try:
+            with LeaseManager().hold(fetch_lease_name(endpoint, category, query)) as fetch_lease:
+                # Fetch only articles newer than the last run's high-water mark
+                state = FetchState.for_request(endpoint, category=category, query=query)
+                with metrics.timer('pipeline.fetch'):
+                    articles = news_service.fetch_new_articles(state, query=query, category=category)
+                fresh, known = _split_known(articles)
+                for article_data in fresh:
+                    # Lets the persist stage confirm the article back to this state
+                    article_data['fetch_state_id'] = state.pk
+                
+                # The mark moves past stored articles only; queued ones are
+                # held as pending until the pipeline stores them
+                if not state.advance(known, queued=fresh, fence=fetch_lease.token):
+                    logger.warning(f"Fetch of {category or query or 'headlines'} lost its lease; "
+                                   f"a newer fetch already advanced the fetch state")
+                    metrics.incr('pipeline.fetch.fenced')
+                queued = _queue_articles(fresh)
+        except LeaseUnavailable:
+            # Left to the running fetch; the entry comes round again without counting as a poll
+            metrics.incr('pipeline.fetch.overlapping')
+            _release_poll(schedule_id, lease)
+            return f"Skipped: {category or query or 'headlines'} is already being fetched"
+        
+        _complete_poll(schedule_id, lease, new_items=len(articles))
+        return {
+            'category': category,
+            'query': query,
+            'fetched': len(articles),
+            'queued': queued,
+            'elapsed': round(time.monotonic() - started, 2),
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in fetch_articles_task: {str(e)}", exc_info=True)
+        if _retries_exhausted(self):
+            _complete_poll(schedule_id, lease, failed=True)
+            # Raising would fail the whole chord and its callback would never run
+            return {'category': category, 'query': query, 'error': str(e)}
+        _renew_poll_lease([schedule_id], lease, self.default_retry_delay)
+        self.retry(exc=e)
+
+
+@shared_task
+def fetch_all_articles_task():
+    """
+    Fan out one fetch per category and configured query, in parallel.
+    
+    Scheduled fetches are dispatched one by one from the poll queue (see
+    dispatch_polls_task); this fetches everything at once, on demand. The
+    fetches run as a Celery group and a chord callback collects their stats;
+    the articles they queue flow through the rest of the pipeline
+    independently.
+    """
+    categories = list(dict.fromkeys(getattr(settings, 'DEFAULT_CATEGORIES', ['general'])))
+    queries = list(dict.fromkeys(getattr(settings, 'NEWS_FETCH_QUERIES', [])))
+    
+    fetches = [fetch_articles_task.s(category=category) for category in categories]
+    fetches += [fetch_articles_task.s(query=query) for query in queries]
+    
+    chord(group(fetches))(finalize_fetch_run.s(started_at=timezone.now().isoformat()))
+    return f"Dispatched {len(fetches)} fetches"
+
+
+@shared_task
+def finalize_fetch_run(results, started_at=None):
+    """
+    Chord callback for fetch_all_articles_task: log and record the run's stats.
+    
+    Fetches that failed for good report an `error` entry, and ones that were
+    skipped or deferred report a message string; both are counted separately.
+    """
+    skipped = [result for result in results if not isinstance(result, dict)]
+    failed = [result for result in results if isinstance(result, dict) and 'error' in result]
+    results = [result for result in results if isinstance(result, dict) and 'error' not in result]
+    
+    stats = {
+        'fetches': len(results),
+        'skipped': len(skipped),
+        'failed': {result['category'] or result['query']: result['error'] for result in failed},
+        'fetched': sum(result['fetched'] for result in results),
+        'queued': sum(result['queued'] for result in results),
+        'slowest': max((result['elapsed'] for result in results), default=0),
+        'per_fetch': {
+            result['category'] or result['query']: {'fetched': result['fetched'], 'queued': result['queued']}
+            for result in results
+        },
+    }
+    if started_at:
+        stats['elapsed'] = round((timezone.now() - datetime.fromisoformat(started_at)).total_seconds(), 2)
+    logger.info(f"Fetch run finished: {stats}")
+    metrics.incr('fetch.runs')
+    metrics.incr('fetch.articles_fetched', stats['fetched'])
+    metrics.incr('fetch.articles_queued', stats['queued'])
+    if failed:
+        logger.warning(f"{len(failed)} fetches in the run failed: {stats['failed']}")
+        metrics.incr('fetch.failed', len(failed))
+    
+    return stats
+
+
+@shared_task
+def plan_alert_queries_task(schedule_id=None, lease=None):
+    """
+    Send this run's keyword-alert /everything queries.
+    
+    The planner packs the active alert keywords into OR-queries and picks the
+    most urgent ones that fit this run's share of the NewsAPI budget; each
+    becomes a fetch_alert_query_task.
+    
+    Args:
+        schedule_id: PollSchedule entry this run was dispatched for
+        lease: Lease token of that entry
+    """
+    queries = AlertQueryPlanner().schedule()
+    _complete_poll(schedule_id, lease, new_items=len(queries))
+    if not queries:
+        return "No alert queries due"
+    
+    group(fetch_alert_query_task.s(query.keywords) for query in queries)()
+    covered = sum(len(query.keywords) for query in queries)
+    metrics.incr('alert_queries.planned', len(queries))
+    metrics.incr('alert_queries.keywords', covered)
+    return f"Dispatched {len(queries)} alert queries covering {covered} keywords"
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def fetch_alert_query_task(self, keywords):
+    """
+    Pipeline stage: fetch articles matching a packed alert OR-query.
+    
+    Asks only for articles published since the keywords were last covered,
+    and marks them queried once the results are queued. If the page budget
+    (settings.ALERT_QUERY_MAX_PAGES) runs out before the results do, their
+    cutoff is kept, so the next query asks for the same window again rather
+    than skipping the matches it did not reach. A failed request is retried
+    without marking the keywords at all.
+    
+    Args:
+        keywords: Alert keywords covered by the query
+    
+    Returns:
+        dict: Fetch statistics
+    """
+    try:
+        if _defer_if_backlogged(self, 'extract', keywords):
+            return "Deferred: extract stage backlogged"
+        started = time.monotonic()
+        queried_at = timezone.now()
+        query = build_query(keywords)
+        
+        max_pages = getattr(settings, 'ALERT_QUERY_MAX_PAGES', 1)
+        page_size = 100
+        articles = []
+        pages_read = last_page = 0
+        with metrics.timer('pipeline.fetch'):
+            pages = NewsAPIService().iter_pages(
+                query=query, from_date=query_cutoff(keywords, queried_at), prefetch=False,
+                page_size=page_size, max_pages=max_pages
+            )
+            for page in pages:
+                articles.extend(page)
+                pages_read, last_page = pages_read + 1, len(page)
+        queued = _submit_articles(articles)
+        
+        # A full last page at the budget may have had more behind it
+        complete = pages_read < max_pages or last_page < page_size
+        # Counts for ranking either way, so a busy pack does not starve the others
+        record_queried(keywords, queried_at, complete=complete)
+        if not complete:
+            logger.info(f"Alert query for {len(keywords)} keywords hit its {max_pages}-page budget; "
+                        "keeping their cutoff")
+            metrics.incr('alerts.query_truncated')
+        return {
+            'keywords': len(keywords),
+            'fetched': len(articles),
+            'queued': queued,
+            'complete': complete,
+            'elapsed': round(time.monotonic() - started, 2),
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in fetch_alert_query_task: {str(e)}", exc_info=True)
+        self.retry(exc=e)
+
+
+def _fan_out_dispatch(hostname=None):
+    """
+    Send a dispatch_polls_task to every live ingest node's own queue.
+
+    Args:
+        hostname: Worker running the beat tick, heartbeated so it counts as live
+
+    Returns:
+        str: Summary for the task result
+    """
+    registry = NodeRegistry()
+    if hostname:
+        registry.heartbeat(hostname)
+    nodes = registry.live_nodes()
+    # A node that is down would only find stale ticks on its queue when it comes back
+    expires = getattr(settings, 'POLL_DISPATCH_SECONDS', 15)
+    for live_node in nodes:
+        dispatch_polls_task.apply_async(kwargs={'node': live_node}, queue=worker_direct(live_node).name,
+                                        expires=expires)
+    return f"Dispatched to {len(nodes)} ingest nodes"
+
+
+@shared_task(bind=True)
+def dispatch_polls_task(self, node=None):
+    """
+    Claim the due entries of the poll queue and start their polls.
+    
+    Categories and queries each get a fetch_articles_task, feeds are polled
+    in batches of settings.FEED_POLL_BATCH, and the alert planner runs as
+    plan_alert_queries_task. Every poll reports back to the queue with the
+    lease it was dispatched under.
+    
+    With settings.INGEST_SHARDING on, the beat tick only fans out: every live
+    ingest node gets a dispatch_polls_task on its own worker queue, claims
+    the entries it owns and polls them itself. Nodes join by running a tick
+    and stay live by heartbeating on each dispatch; a node that stops drops
+    out after settings.INGEST_NODE_TTL seconds and its entries move to the
+    others.
+    
+    Args:
+        node: Ingest node (Celery worker hostname) to dispatch for
+    """
+    options = {}
+    if node:
+        registry = NodeRegistry()
+        registry.heartbeat(node)
+        entries = scheduler.claim_due(node=node, nodes=registry.live_nodes())
+        options['queue'] = worker_direct(node).name
+    else:
+        scheduler.sync_schedules()
+        if getattr(settings, 'INGEST_SHARDING', False):
+            return _fan_out_dispatch(self.request.hostname)
+        entries = scheduler.claim_due()
+    if not entries:
+        return "No polls due"
+    
+    feeds = []
+    for entry in entries:
+        if entry.kind == PollSchedule.KIND_CATEGORY:
+            fetch_articles_task.apply_async(kwargs={
+                'category': entry.target, 'schedule_id': entry.pk, 'lease': entry.lease_token,
+            }, **options)
+        elif entry.kind == PollSchedule.KIND_QUERY:
+            fetch_articles_task.apply_async(kwargs={
+                'query': entry.target, 'schedule_id': entry.pk, 'lease': entry.lease_token,
+            }, **options)
+        elif entry.kind == PollSchedule.KIND_ALERTS:
+            plan_alert_queries_task.apply_async(kwargs={
+                'schedule_id': entry.pk, 'lease': entry.lease_token,
+            }, **options)
+        else:
+            feeds.append(entry.pk)
+    
+    for batch in pipeline.chunked(feeds, getattr(settings, 'FEED_POLL_BATCH', 500)):
+        poll_feeds_task.apply_async(kwargs={'schedule_ids': batch, 'lease': entries[0].lease_token}, **options)
+    return f"Dispatched {len(entries)} polls ({len(feeds)} feeds)"
+
+
+def _new_feed_entries(polled):
+    """
+    Pick the entries of changed feeds that are not stored yet.
+
+    Entries are matched by URL, not against a publish-date mark: an entry
+    the pipeline dropped is picked up again whenever its feed next changes,
+    and undated entries need no special case. Each feed's outcome gets its
+    count of new entries, and `newest_entry_at` records the newest one
+    handed to ingest.
+
+    Args:
+        polled: (feed, poll outcome, entries) for every feed that changed
+
+    Returns:
+        The new entries of all feeds
+    """
+    fresh, _ = _split_known([entry for _, _, entries in polled for entry in entries])
+    fresh_urls = {entry['url'] for entry in fresh}
+    for feed, outcome, entries in polled:
+        new = [entry for entry in entries if entry['url'] in fresh_urls]
+        outcome['new_items'] = len(new)
+        dates = [parse_datetime(entry['publishedAt']) for entry in new if entry['publishedAt']]
+        if feed.newest_entry_at:
+            dates.append(feed.newest_entry_at)
+        feed.newest_entry_at = max(dates, default=None)
+    return fresh
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def poll_feeds_task(self, schedule_ids=None, lease=None, limit=None):
+    """
+    Poll RSS/Atom feeds concurrently and queue their new entries.
+    
+    Each feed is rescheduled from its own result, so busy feeds are polled
+    more often and quiet ones less.
+    
+    Args:
+        schedule_ids: PollSchedule entries of the feeds to poll, as leased by
+            dispatch_polls_task (if not given, due feeds are claimed here)
+        lease: Lease token of those entries
+        limit: Maximum feeds claimed when schedule_ids is not given (defaults to settings.FEED_POLL_BATCH)
+    """
+    try:
+        started = time.monotonic()
+        if schedule_ids is None:
+            claimed = scheduler.claim_due(kinds=[PollSchedule.KIND_FEED],
+                                          limit=limit or getattr(settings, 'FEED_POLL_BATCH', 500))
+        else:
+            claimed = list(PollSchedule.objects.filter(pk__in=schedule_ids, lease_token=lease)
+                           .select_related('feed'))
+        if not claimed:
+            return "No feeds due"
+        lease = claimed[0].lease_token
+        schedules = {schedule.feed_id: schedule.pk for schedule in claimed}
+        feeds = [schedule.feed for schedule in claimed]
+        
+        # Feeds with a live WebSub subscription only need an occasional safety-net poll
+        pushed = set(
+            WebSubSubscription.objects.filter(
+                feed__in=feeds, state='verified', lease_expires_at__gt=timezone.now()
+            ).values_list('feed_id', flat=True)
+        )
+        
+        polled = []
+        outcomes = {}
+        unchanged = failed = 0
+        for feed, entries, error in FeedService().poll(feeds):
+            outcome = {'backstop': feed.pk in pushed}
+            outcomes[schedules[feed.pk]] = outcome
+            if error:
+                failed += 1
+                outcome['failed'] = True
+            elif entries is None:
+                unchanged += 1
+            else:
+                polled.append((feed, outcome, entries))
+        
+        articles = _new_feed_entries(polled)
+        queued = _queue_articles(articles)
+        # The new validators are only kept once the entries are queued: a poll
+        # that fails before that fetches the whole feed again on its retry
+        FeedSource.objects.bulk_update(feeds, ['etag', 'last_modified', 'newest_entry_at'])
+        scheduler.complete_many(lease, outcomes)
+        
+        stats = {
+            'feeds': len(feeds),
+            'unchanged': unchanged,
+            'failed': failed,
+            'fetched': len(articles),
+            'queued': queued,
+            'elapsed': round(time.monotonic() - started, 2),
+        }
+        logger.info(f"Feed poll finished: {stats}")
+        return stats
+        
+    except Exception as e:
+        logger.error(f"Error in poll_feeds_task: {str(e)}", exc_info=True)
+        _renew_poll_lease(schedule_ids, lease, self.default_retry_delay)
+        self.retry(exc=e)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def ingest_pushed_entries_task(self, articles):
+    """
+    Queue feed entries delivered by a WebSub hub for ingestion.
+    
+    Args:
+        articles: Article dicts parsed from the pushed feed document
+    """
+    try:
+        queued = _submit_articles(articles)
+        metrics.incr('websub.queued', queued)
+        return f"Queued {queued} of {len(articles)} pushed entries"
+        
+    except Exception as e:
+        logger.error(f"Error in ingest_pushed_entries_task: {str(e)}", exc_info=True)
+        self.retry(exc=e)
+
+
+@shared_task
+def renew_websub_leases_task():
+    """
+    Resubscribe WebSub subscriptions whose lease is about to expire.
+    
+    Subscriptions still pending verification after a day, or whose request
+    never reached the hub, are retried too; denied and unsubscribed ones
+    are left alone.
+    """
+    now = timezone.now()
+    renew_before = getattr(settings, 'WEBSUB_RENEW_BEFORE_SECONDS', 60 * 60 * 24)
+    due = WebSubSubscription.objects.filter(feed__is_active=True).filter(
+        Q(state='verified', lease_expires_at__lte=now + timedelta(seconds=renew_before)) |
+        Q(state='pending', requested_at__lte=now - timedelta(days=1)) |
+        Q(state='pending', requested_at__isnull=True)
+    ).select_related('feed')
+    
+    service = WebSubService()
+    renewed = failed = 0
+    for subscription in due:
+        try:
+            service.request(subscription, 'subscribe')
+            renewed += 1
+        except Exception as e:
+            failed += 1
+            logger.warning(f"Failed to renew WebSub lease for {subscription.topic_url}: {str(e)}")
+    
+    return f"Renewed {renewed} WebSub subscriptions ({failed} failed)"
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def backfill_articles_task(self, query, max_pages=None, from_date=None, batch_size=100):
+    """
+    Stream a large /everything query page by page and ingest it in batches.
+    
+    Args:
+        query: Search query
+        max_pages: Page budget (defaults to settings.NEWS_API_BACKFILL_MAX_PAGES)
+        from_date: ISO date to backfill from (optional)
+        batch_size: Articles held in memory and ingested together
+    """
+    try:
+        # Backfills only use the share of the daily quota left for them
+        news_service = NewsAPIService(priority=PRIORITY_BACKFILL)
         nlp_service = NLPService()
+        # Backfills are not latency sensitive, so they get no time budget pressure
+        scheduler = SummarizationScheduler(nlp_service=nlp_service, time_budget=float('inf'))
         
-        # Fetch articles from NewsAPI
-        articles = news_service.fetch_articles(category=category)
+        stream = news_service.iter_articles(
+            query=query,
+            max_pages=max_pages or getattr(settings, 'NEWS_API_BACKFILL_MAX_PAGES', 20),
+            from_date=datetime.fromisoformat(from_date) if from_date else None
+        )
         
-        # Process each article
-        for article_data in articles:
-            try:
-                # Check if article already exists
-                if Article.objects.filter(url=article_data['url']).exists():
-                    continue
-                
-                # Generate summary using NLP
-                summary = nlp_service.generate_summary(article_data['content'])
-                
-                # Classify article category
-                category = nlp_service.classify_category(
-                    article_data['title'], 
-                    article_data.get('description', '')
-                )
-                
-                # Create article
-                article = Article.objects.create(
-                    title=article_data['title'],
-                    url=article_data['url'],
-                    source=article_data['source']['name'],
-                    published_at=article_data['publishedAt'],
-                    content=article_data['content'],
-                    summary=summary,
-                    category=category,
-                    image_url=article_data.get('urlToImage', '')
-                )
-                
-                # Check for keyword matches and send alerts
-                check_keyword_matches.delay(article.id)
-                
-            except Exception as e:
-                logger.error(f"Error processing article {article_data.get('url', 'unknown')}: {str(e)}", 
-                            exc_info=True)
+        fetched = created = 0
+        while True:
+            batch = list(islice(stream, batch_size))
+            if not batch:
+                break
+            fetched += len(batch)
+            created += len(_ingest_articles(batch, nlp_service, scheduler))
+        
+        return f"Backfilled {created} new articles out of {fetched} fetched for '{query}'"
+        
+    except Exception as e:
+        logger.error(f"Error in backfill_articles_task: {str(e)}", exc_info=True)
+        self.retry(exc=e)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def upgrade_summaries_task(self, batch_size=None):
+    """
+    Re-summarize articles stored with a cheaper tier while workers are idle.
+    
+    Articles without content are never picked, and an attempt that does not
+    reach a better tier is counted on the article, so rows that cannot be
+    upgraded drop out after settings.SUMMARY_UPGRADE_MAX_ATTEMPTS instead of
+    taking the head of every batch.
+    """
+    try:
+        idle_depth = getattr(settings, 'SUMMARY_UPGRADE_IDLE_QUEUE_DEPTH', 0)
+        # Upgrades share the NLP workers with the enrich stage
+        if pipeline.queue_depth(pipeline.stage_queue('enrich')) > idle_depth:
+            return "Skipped summary upgrades: workers are busy"
+        
+        scheduler = SummarizationScheduler(
+            time_budget=getattr(settings, 'SUMMARY_UPGRADE_TIME_BUDGET_SECONDS', 240)
+        )
+        target_rank = TIER_RANK[scheduler.max_tier]
+        lower_tiers = [tier for tier, rank in TIER_RANK.items() if rank < target_rank]
+        batch_size = batch_size or getattr(settings, 'SUMMARY_UPGRADE_BATCH_SIZE', 20)
+        
+        # Placeholders are left to lazy summarization on first read
+        articles = Article.objects.filter(
+            summary_tier__in=lower_tiers,
+            summary_state=STATE_COMPLETE,
+            summary_upgrade_attempts__lt=getattr(settings, 'SUMMARY_UPGRADE_MAX_ATTEMPTS', 3)
+        ).exclude(content='').order_by('-published_at')[:batch_size]
+        summary_version = NLPService.get_versions()['summary_version']
+        
+        upgraded = 0
+        for article in articles:
+            if scheduler.remaining_budget <= 0:
+                break
+            summary, tier = scheduler.summarize(article.content, tier=scheduler.max_tier)
+            if TIER_RANK[tier] <= TIER_RANK[article.summary_tier]:
+                Article.objects.filter(pk=article.pk).update(summary_upgrade_attempts=F('summary_upgrade_attempts') + 1)
                 continue
-                
-        return f"Successfully processed {len(articles)} articles"
+            article.summary = summary
+            article.summary_tier = tier
+            article.summary_version = summary_version
+            article.save(update_fields=['summary', 'summary_tier', 'summary_version'])
+            upgraded += 1
+        
+        return f"Upgraded {upgraded} article summaries"
         
     except Exception as e:
-        logger.error(f"Error in fetch_articles_task: {str(e)}", exc_info=True)
+        logger.error(f"Error in upgrade_summaries_task: {str(e)}", exc_info=True)
         self.retry(exc=e)
 
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def summarize_article_task(self, article_id):
+    """
+    Compute the full summary of a placeholder article, as requested by a read.
+    
+    Args:
+        article_id: ID of the article
+    """
+    try:
+        article = Article.objects.filter(id=article_id).first()
+        if article is None:
+            return f"Article {article_id} not found"
+        ensure_summary(article)
+        return f"Summarized article {article_id}"
+        
+    except Exception as e:
+        logger.error(f"Error in summarize_article_task: {str(e)}", exc_info=True)
+        self.retry(exc=e)
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def enrich_articles_task(self, article_ids):
+    """
+    Classify and summarize stored articles that were saved without enrichment.
+    
+    Bulk ingest with ?enrich=1 stores its articles first and queues them
+    here, so the inference runs on the enrich queue instead of in the request.
+    
+    Args:
+        article_ids: IDs of the articles to enrich
+    """
+    try:
+        articles = list(Article.objects.filter(id__in=article_ids, enriched_at__isnull=True).order_by('id'))
+        if not articles:
+            return "Nothing to enrich"
+        
+        nlp_service = NLPService()
+        versions = nlp_service.versions
+        scheduler = SummarizationScheduler(nlp_service=nlp_service)
+        # The stored summary is still the lead built from the record's description
+        enrichments = nlp_service.enrich_batch([{'title': a.title, 'description': a.summary} for a in articles])
+        now = timezone.now()
+        for index, (article, enrichment) in enumerate(zip(articles, enrichments)):
+            article.category = enrichment['category']
+            article.sentiment = enrichment['sentiment']
+            article.sentiment_score = enrichment['sentiment_score']
+            article.urgency_score = enrichment['urgency_score']
+            article.summary, article.summary_tier, article.summary_state = scheduler.summarize_at_ingest(
+                article.content, description=article.summary, source=article.source,
+                queue_depth=len(articles) - index, title=article.title, category=article.category
+            )
+            article.summary_version = versions['summary_version']
+            article.category_version = versions['category_version']
+            article.enriched_at = now
+        
+        Article.objects.bulk_update(articles, [
+            'category', 'sentiment', 'sentiment_score', 'urgency_score', 'summary', 'summary_tier',
+            'summary_state', 'summary_version', 'category_version', 'enriched_at',
+        ])
+        metrics.incr('bulk_ingest.enriched', len(articles))
+        return f"Enriched {len(articles)} articles"
+        
+    except Exception as e:
+        logger.error(f"Error in enrich_articles_task: {str(e)}", exc_info=True)
+        self.retry(exc=e)
+
+
+def _notify_keyword_matches(article, keyword_alerts):
+    """
+    Send keyword alert notifications for one article.
+    
+    Args:
+        article: Article instance
+        keyword_alerts: Keyword alerts to check the article against
+    
+    Returns:
+        Set of the (lowercased) keywords the article matched
+    """
+    # Group alerts by user to batch notifications
+    user_alerts = {}
+    for alert in keyword_alerts:
+        try:
+            # Check if keyword exists in title, content, or summary
+            keyword = alert.keyword.lower()
+            if (keyword in article.title.lower() or 
+                keyword in article.content.lower() or 
+                (article.summary and keyword in article.summary.lower())):
+                
+                if alert.user_id not in user_alerts:
+                    user_alerts[alert.user_id] = []
+                user_alerts[alert.user_id].append(alert.keyword)
+                
+        except Exception as e:
+            logger.error(f"Error processing alert {alert.id}: {str(e)}", exc_info=True)
+            continue
+    
+    # Send notifications for each user with matching keywords
+    for user_id, keywords in user_alerts.items():
+        try:
+            # Get unique keywords
+            unique_keywords = list(set(keywords))
+            keywords_str = ", ".join(unique_keywords[:3])
+            if len(unique_keywords) > 3:
+                keywords_str += f" and {len(unique_keywords) - 3} more"
+            
+            # Send notification
+            NotificationService.send_keyword_alert(
+                user_id=user_id,
+                article=article,
+                keywords=unique_keywords,
+                title=f"New articles about {keywords_str}",
+                message=f"{article.title}\n{article.summary or ''}",
+                url=reverse('article_detail', args=[article.id]),
+            )
+            
+        except Exception as e:
+            logger.error(f"Error sending notification to user {user_id}: {str(e)}", exc_info=True)
+            continue
+    
+    return {keyword.lower() for keywords in user_alerts.values() for keyword in keywords}
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=300)
 def check_keyword_matches(self, article_id):
     """
@@ -82,46 +996,8 @@ def check_keyword_matches(self, article_id):
         # Get all active keyword alerts
         keyword_alerts = KeywordAlert.objects.filter(is_active=True).select_related('user')
         
-        # Group alerts by user to batch notifications
-        user_alerts = {}
-        for alert in keyword_alerts:
-            try:
-                # Check if keyword exists in title, content, or summary
-                keyword = alert.keyword.lower()
-                if (keyword in article.title.lower() or 
-                    keyword in article.content.lower() or 
-                    (article.summary and keyword in article.summary.lower())):
-                    
-                    if alert.user_id not in user_alerts:
-                        user_alerts[alert.user_id] = []
-                    user_alerts[alert.user_id].append(alert.keyword)
-                    
-            except Exception as e:
-                logger.error(f"Error processing alert {alert.id}: {str(e)}", exc_info=True)
-                continue
-        
-        # Send notifications for each user with matching keywords
-        for user_id, keywords in user_alerts.items():
-            try:
-                # Get unique keywords
-                unique_keywords = list(set(keywords))
-                keywords_str = ", ".join(unique_keywords[:3])
-                if len(unique_keywords) > 3:
-                    keywords_str += f" and {len(unique_keywords) - 3} more"
-                
-                # Send notification
-                NotificationService.send_keyword_alert(
-                    user_id=user_id,
-                    article=article,
-                    keywords=unique_keywords,
-                    title=f"New articles about {keywords_str}",
-                    message=f"{article.title}\n{article.summary or ''}",
-                    url=reverse('article_detail', args=[article.id]),
-                )
-                
-            except Exception as e:
-                logger.error(f"Error sending notification to user {user_id}: {str(e)}", exc_info=True)
-                continue
+        matched = _notify_keyword_matches(article, keyword_alerts)
+        record_hits({keyword: 1 for keyword in matched})
                 
         return f"Processed keyword matches for article {article_id}"
         
@@ -132,6 +1008,28 @@ def check_keyword_matches(self, article_id):
         logger.error(f"Error in check_keyword_matches: {str(e)}", exc_info=True)
         self.retry(exc=e)
 
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=300)
+def check_keyword_matches_batch(self, article_ids):
+    """
+    Check a batch of new articles against keyword alerts, loading the alerts once.
+    """
+    try:
+        keyword_alerts = list(KeywordAlert.objects.filter(is_active=True).select_related('user'))
+        articles = Article.objects.filter(id__in=article_ids)
+        
+        hits = Counter()
+        for article in articles:
+            hits.update(_notify_keyword_matches(article, keyword_alerts))
+        # Feeds the alert query planner's ranking
+        record_hits(hits)
+        
+        return f"Processed keyword matches for {len(article_ids)} articles"
+        
+    except Exception as e:
+        logger.error(f"Error in check_keyword_matches_batch: {str(e)}", exc_info=True)
+        self.retry(exc=e)
+
 @shared_task
 @shared_task(bind=True, max_retries=3, default_retry_delay=300)
 def send_notification(self, user_id, title, message, url, notification_type='info', related_object=None):
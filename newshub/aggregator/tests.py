@@ -1,7 +1,50 @@
-from django.test import TestCase, Client
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from unittest import mock
+from urllib.parse import parse_qs
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.contrib.auth.models import User
-from .models import Article, Bookmark
+from .http_cache import ResponseCache
+from .http_client import UpstreamAdapter
+from .canonical import canonicalize_url, url_hash
+from .downloader import ArticleDownloader
+from .extraction import ExtractionStage
+from .fake_upstream import FakeUpstream, FaultProfile, UnthrottledRateLimiter
+from .feeds import XML_ERRORS, FeedService, parse_feed
+from .ingest import bulk_upsert_articles
+from .pipeline import StagingStore
+from .rate_limiter import ACQUIRE_SCRIPT, PRIORITY_DEFAULT, NewsAPIRateLimiter, RateLimitExceeded
+from .query_planner import (AlertQueryPlanner, build_query, pack_queries, query_cutoff, record_hits,
+                            record_queried)
+from .html_archive import HTMLArchive
+from .leases import LeaseManager, LeaseUnavailable, NodeRegistry, fetch_lease_name, shard_owner
+from .replay import ReplayRunner, synthetic_articles
+from .services import LexiconNLPService, NewsAPIService, calibrate_urgency, load_urgency_calibration
+from .summarization import (STATE_PLACEHOLDER, TIER_LEAD, EagerAllowlist, SummarizationScheduler,
+                            ensure_summary)
+from . import ingest, pipeline, scheduler, tasks
+from .seen_filter import SeenURLFilter
+from .models import (AlertKeyword, ArchivedPage, Article, Bookmark, FeedSource, FetchState, KeywordAlert, PollSchedule,
+                     WebSubSubscription)
+from .webpush_service import WebPushService
+from .websub import WebSubService, discover_hub
+from .management.commands import fetch_articles, reprocess_articles
 from django.urls import reverse
+from pywebpush import WebPushException
+from webpush.models import PushInformation, SubscriptionInfo
 
 class ArticleModelTest(TestCase):
     def setUp(self):
@@ -16,6 +59,25 @@ class ArticleModelTest(TestCase):
         self.assertEqual(self.article.url, "https://example.com")
         self.assertEqual(self.article.summary, "Test Summary")
 
+
+class ArticleUrlHashTests(TestCase):
+    def setUp(self):
+        self.article = Article.objects.create(title="Hashed", url="https://example.com", source="Example",
+                                              published_at=timezone.now())
+
+    def test_edited_url_is_rehashed(self):
+        self.article.url = "https://example.com/moved"
+        self.article.save(update_fields=['url'])
+        self.assertEqual(list(Article.for_url("https://example.com/moved/?utm_source=x")), [self.article])
+        self.assertFalse(Article.for_url("https://example.com").exists())
+
+    def test_articles_saved_directly_are_remembered(self):
+        with mock.patch('aggregator.models.remember_urls') as remember, \
+                self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(title="Direct", url="https://example.com/direct", source="Example",
+                                             published_at=timezone.now())
+        remember.assert_called_once_with([article.url_hash])
+
 class BookmarkModelTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='testuser', password='testpass')
@@ -70,3 +132,1272 @@ class ViewTests(TestCase):
     def test_bookmark_view_unauthenticated(self):
         response = self.client.get(reverse('bookmarks'))
         self.assertEqual(response.status_code, 302)  # Redirect to login
+
+
+class InMemoryRedis:
+    """The few Redis commands the Redis-backed stores use, kept in a dict."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def eval(self, script, numkeys, key, token, *args):
+        # Compare-and-delete, or compare-and-expire for lease renewals
+        if self.data.get(key) != token.encode():
+            return 0
+        if 'PEXPIRE' not in script:
+            self.delete(key)
+        return 1
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, b'0')) + 1).encode()
+        return int(self.data[key])
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        self.data.get(key, {}).pop(member, None)
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.data.get(key, {})
+        for member, score in list(members.items()):
+            if float(low) <= score <= float(high):
+                del members[member]
+
+    def zrangebyscore(self, key, low, high):
+        return [member for member, score in self.data.get(key, {}).items() if float(low) <= score <= float(high)]
+
+    def execute_command(self, command, key, *args):
+        # BITFIELD on single bits: GET u1 <offset> or SET u1 <offset> 1
+        assert command == 'BITFIELD'
+        bits, replies, args = self.data.setdefault(key, set()), [], list(args)
+        while args:
+            op, _, offset = args[:3]
+            if op == 'SET':
+                replies.append(int(offset in bits))
+                bits.add(offset)
+                args = args[4:]
+            else:
+                replies.append(int(offset in bits))
+                args = args[3:]
+        return replies
+
+    def expire(self, key, seconds):
+        pass
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+
+class InMemoryPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class StubNewsAPIHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = b'{"status": "ok", "sources": [{"id": "bbc-news"}]}'
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.limiter = NewsAPIRateLimiter(redis=mock.Mock())
+
+    def test_acquire_waits_for_a_token(self):
+        with mock.patch.object(self.limiter, 'try_acquire', side_effect=[(False, 0.5), (True, 0.0)]), \
+                mock.patch('aggregator.rate_limiter.time.sleep') as sleep:
+            self.limiter.acquire(PRIORITY_DEFAULT, timeout=5)
+        sleep.assert_called_once_with(0.5)
+
+    def test_acquire_fails_fast_past_the_timeout(self):
+        with mock.patch.object(self.limiter, 'try_acquire', return_value=(False, 2.0)), \
+                mock.patch('aggregator.rate_limiter.time.sleep') as sleep:
+            with self.assertRaises(RateLimitExceeded):
+                self.limiter.acquire(PRIORITY_DEFAULT, timeout=0)
+        sleep.assert_not_called()
+
+    def test_spent_daily_budget_raises(self):
+        with mock.patch.object(self.limiter, 'try_acquire', return_value=(False, -1.0)):
+            with self.assertRaises(RateLimitExceeded):
+                self.limiter.acquire(PRIORITY_DEFAULT, timeout=60)
+
+    def test_bucket_runs_on_the_redis_clock(self):
+        self.limiter._script = mock.Mock(return_value=[1, '0'])
+        self.assertEqual(self.limiter.try_acquire(PRIORITY_DEFAULT), (True, 0.0))
+        # rate, capacity, daily limit and key ttl; no client timestamp
+        self.assertEqual(len(self.limiter._script.call_args[1]['args']), 4)
+        self.assertIn("redis.call('TIME')", ACQUIRE_SCRIPT)
+
+    def test_service_passes_its_timeout(self):
+        limiter = mock.Mock()
+        service = NewsAPIService(api_key='key', rate_limiter=limiter, rate_limit_timeout=0)
+        service._throttle(PRIORITY_DEFAULT)
+        limiter.acquire.assert_called_once_with(PRIORITY_DEFAULT, timeout=0)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.adapter = UpstreamAdapter('test', timeout=1, failure_threshold=1, reset_timeout=0)
+        self.request = requests.Request('GET', 'http://upstream.test/').prepare()
+
+    def test_failed_trial_of_any_kind_is_settled(self):
+        with mock.patch('requests.adapters.HTTPAdapter.send', side_effect=ValueError('bad chunk')):
+            with self.assertRaises(ValueError):
+                self.adapter.send(self.request)
+            # Half-open: the trial fails with a non-requests error
+            with self.assertRaises(ValueError):
+                self.adapter.send(self.request)
+            # ...and the next trial is still let through
+            with self.assertRaises(ValueError):
+                self.adapter.send(self.request)
+
+
+class WebPushTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='pw')
+        for n in range(2):
+            subscription = SubscriptionInfo.objects.create(browser='firefox', endpoint=f"https://push.test/{n}",
+                                                           auth='auth', p256dh='key')
+            PushInformation.objects.create(user=self.user, subscription=subscription)
+
+    def failure(self, status):
+        return WebPushException('push failed', response=mock.Mock(status_code=status))
+
+    @override_settings(WEBPUSH_SETTINGS={'VAPID_PRIVATE_KEY': 'key', 'VAPID_ADMIN_EMAIL': 'admin@example.com'})
+    def test_one_failing_subscription_does_not_stop_the_rest(self):
+        with mock.patch('aggregator.webpush_service.webpush', side_effect=[self.failure(500), None]) as push:
+            self.assertEqual(WebPushService.push_to_user(self.user, {'head': 'Hi'}), 1)
+        self.assertEqual(push.call_count, 2)
+        self.assertEqual(SubscriptionInfo.objects.count(), 2)
+
+    @override_settings(WEBPUSH_SETTINGS={'VAPID_PRIVATE_KEY': 'key', 'VAPID_ADMIN_EMAIL': 'admin@example.com'})
+    def test_gone_subscription_is_removed_and_total_failure_raises(self):
+        errors = [self.failure(410), requests.exceptions.ConnectionError('refused')]
+        with mock.patch('aggregator.webpush_service.webpush', side_effect=errors):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                WebPushService.push_to_user(self.user, {'head': 'Hi'})
+        self.assertEqual(SubscriptionInfo.objects.count(), 1)
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        StubNewsAPIHandler.requests_seen = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubNewsAPIHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v2/sources"
+        self.redis = InMemoryRedis()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def send(self, headers):
+        return requests.get(self.url, params={'apiKey': 'secret'}, headers=headers, timeout=5)
+
+    def test_fresh_response_served_from_cache(self):
+        cache = ResponseCache(redis=self.redis, ttls={'sources': 60})
+        first = cache.get('sources', self.url, {'apiKey': 'secret'}, self.send)
+        second = cache.get('sources', self.url, {'apiKey': 'other'}, self.send)
+        self.assertEqual(first.json(), second.json())
+        self.assertTrue(second.from_cache)
+        self.assertEqual(len(StubNewsAPIHandler.requests_seen), 1)
+
+    def test_stale_response_revalidated_with_etag(self):
+        cache = ResponseCache(redis=self.redis, ttls={'sources': 60})
+        cache.get('sources', self.url, {}, self.send)
+        with mock.patch('aggregator.http_cache.time.time', return_value=time.time() + 120):
+            response = cache.get('sources', self.url, {}, self.send)
+        self.assertEqual(StubNewsAPIHandler.requests_seen[-1].get('If-None-Match'), '"v1"')
+        self.assertEqual(response.json()['sources'][0]['id'], 'bbc-news')
+
+    def test_cache_key_excludes_api_key(self):
+        self.assertNotIn('secret', ResponseCache.cache_key(self.url, {'apiKey': 'secret'}))
+        self.assertEqual(ResponseCache.cache_key(self.url, {'apiKey': 'a', 'language': 'en'}),
+                         ResponseCache.cache_key(self.url, {'language': 'en', 'apiKey': 'b'}))
+
+
+class BulkUpsertTests(TestCase):
+    def setUp(self):
+        self.existing = Article.objects.create(
+            title="Existing", url="https://example.com/existing", source="Example",
+            published_at=timezone.now(), content="", summary=""
+        )
+
+    def build(self, url):
+        return Article(title=url, url=url, source="Example", published_at=timezone.now(),
+                       content="", summary="", category="General")
+
+    def test_creates_only_new_urls(self):
+        rows = [self.build(f"https://example.com/{i}") for i in range(100)]
+        rows += [self.build("https://example.com/existing"), self.build("https://example.com/0")]
+        with CaptureQueriesContext(connection) as queries:
+            created = bulk_upsert_articles(rows)
+        self.assertEqual(len(created), 100)
+        self.assertNotIn("https://example.com/existing", created)
+        self.assertEqual(Article.objects.count(), 101)
+        self.assertLessEqual(len(queries), 6)
+
+    def test_rerun_creates_nothing(self):
+        bulk_upsert_articles([self.build("https://example.com/new")])
+        self.assertEqual(bulk_upsert_articles([self.build("https://example.com/new")]), {})
+
+    def test_tracking_variants_are_one_article(self):
+        created = bulk_upsert_articles([
+            self.build("https://example.com/story?utm_source=twitter"),
+            self.build("https://example.com/story/"),
+        ])
+        self.assertEqual(len(created), 1)
+        self.assertEqual(Article.for_url("https://example.com/story/amp/").count(), 1)
+
+    def test_row_inserted_by_another_worker_is_not_reported(self):
+        stored_hashes = ingest._stored_hashes
+
+        def lookup_then_lose_race(hashes):
+            known = stored_hashes(hashes)
+            # Another worker inserts the same URL after our lookup
+            Article.objects.create(title="Theirs", url="https://example.com/raced", source="Example",
+                                   published_at=timezone.now(), content="", summary="")
+            return known
+
+        with mock.patch('aggregator.ingest._stored_hashes', side_effect=lookup_then_lose_race):
+            created = bulk_upsert_articles([self.build("https://example.com/raced"),
+                                            self.build("https://example.com/ours")])
+        self.assertEqual(list(created), ["https://example.com/ours"])
+        self.assertEqual(Article.objects.get(url="https://example.com/raced").title, "Theirs")
+        self.assertEqual(created["https://example.com/ours"], Article.objects.get(url="https://example.com/ours").pk)
+
+
+
+class ReprocessArticlesTests(TestCase):
+    def setUp(self):
+        self.nlp = LexiconNLPService()
+        self.versions = self.nlp.versions
+        self.stale = Article.objects.create(
+            title="Stock market crisis", url="https://example.com/stale", source="Example",
+            published_at=timezone.now(), content="Stocks fell. Markets slid. Traders fled. Then calm.",
+            summary="old", summary_version='old', category_version='old'
+        )
+
+    def test_stale_rows_are_brought_to_the_current_versions(self):
+        row = Article.objects.filter(pk=self.stale.pk).values(
+            'id', 'url', 'title', 'content', 'summary', 'summary_version', 'category_version').get()
+        with mock.patch.object(reprocess_articles, '_worker_nlp', self.nlp):
+            results = reprocess_articles._reprocess_batch([row], self.versions)
+        reprocess_articles.Command()._apply(results, 'reprocess-test')
+
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.summary, "Stocks fell. Markets slid. Traders fled.")
+        self.assertEqual(self.stale.summary_version, self.versions['summary_version'])
+        self.assertEqual(self.stale.category_version, self.versions['category_version'])
+        self.assertEqual(self.stale.category, 'business')
+        self.assertIsNotNone(self.stale.enriched_at)
+
+    def test_category_follows_the_regenerated_summary(self):
+        row = {'id': self.stale.pk, 'url': self.stale.url, 'title': "Weekly roundup",
+               'content': "Researchers publish a study on space. More follows.",
+               'summary': "A football match report.", 'summary_version': 'old', 'category_version': 'old'}
+        with mock.patch.object(reprocess_articles, '_worker_nlp', self.nlp):
+            fields, = reprocess_articles._reprocess_batch([row], self.versions)
+        self.assertEqual(fields['category'], 'science')
+
+    def test_fetch_command_rows_are_versioned(self):
+        item = {'title': 'Election results are in', 'url': 'https://example.com/vote', 'description': '',
+                'source': {'name': 'Example'}, 'publishedAt': '2024-01-01T00:00:00Z', 'content': 'Votes.'}
+        enrichment = self.nlp.enrich_batch([item])[0]
+        article = fetch_articles.Command()._build(
+            item_data=(item, enrichment), extracted=None, queue_depth=1, versions=self.versions,
+            scheduler=SummarizationScheduler(nlp_service=self.nlp, max_tier=TIER_LEAD))
+        self.assertEqual(article.category, 'politics')
+        self.assertEqual(article.summary_version, self.versions['summary_version'])
+        self.assertEqual(article.category_version, self.versions['category_version'])
+
+    def test_fetch_command_can_skip_notifications(self):
+        User.objects.create_user(username='reader', password='testpass')
+        item = {'title': 'Earthquake strikes the coast', 'url': 'https://example.com/quake', 'description': '',
+                'source': {'name': 'Example'}, 'publishedAt': '2024-01-01T00:00:00Z', 'content': 'Breaking.'}
+        news_service = mock.Mock(fetch_articles=mock.Mock(return_value=[item]))
+        downloader = mock.Mock(stats={}, iter_downloads=lambda urls: ((url, None, 'refused') for url in urls))
+        with mock.patch.object(fetch_articles, 'NLPService', LexiconNLPService), \
+                mock.patch.object(LexiconNLPService, 'breaking_threshold', new_callable=mock.PropertyMock,
+                                  return_value=0.0), \
+                mock.patch.object(fetch_articles, 'ArticleDownloader', return_value=downloader), \
+                mock.patch.object(fetch_articles, 'ExtractionStage') as stage, \
+                mock.patch.object(fetch_articles, 'archive_pages'), \
+                mock.patch.object(fetch_articles.WebPushService, 'push_to_user') as push:
+            # Drains the downloads like the real stage, so failed ones are built from the headline
+            stage.return_value.iter_extract.side_effect = lambda docs: ((url, None, None) for url, _ in docs)
+            fetch_articles.Command(stdout=mock.Mock())._fetch(news_service, notify=False)
+        self.assertTrue(Article.objects.filter(url='https://example.com/quake').exists())
+        push.assert_not_called()
+
+
+class ExtractionStageTests(SimpleTestCase):
+    PAGE = ('<html><head><title>Harbour reopens</title></head><body><article>'
+            + '<p>The harbour reopened to shipping on Monday after repairs to the sea wall were finished.</p>' * 5
+            + '</article></body></html>')
+
+    def test_pages_are_extracted_on_spawned_workers(self):
+        with mock.patch('aggregator.extraction.connections') as connections:
+            with ExtractionStage(max_workers=2, chunk_size=1, timeout=10) as stage:
+                results = list(stage.iter_extract([(f"https://example.com/{i}", self.PAGE) for i in range(3)]))
+        connections.close_all.assert_called_once()
+        self.assertEqual(sorted(url for url, _, _ in results), [f"https://example.com/{i}" for i in range(3)])
+        self.assertTrue(all(error is None and 'harbour reopened' in fields['text'] for _, fields, error in results))
+        self.assertEqual(stage.stats['extracted'], 3)
+
+    def test_overdue_chunks_fail_and_the_rest_are_resubmitted(self):
+        stage = ExtractionStage(max_workers=2, chunk_size=1, timeout=1)
+        overdue, running = object(), object()
+        in_flight = {overdue: ([("https://example.com/slow", "")], 0), running: ([("https://example.com/ok", "")], 1e12)}
+        with mock.patch.object(stage, '_restart_pool'), mock.patch.object(stage, '_submit') as submit:
+            results = list(stage._kill_overdue(in_flight))
+        self.assertEqual(results, [("https://example.com/slow", None, "extraction killed after hard deadline")])
+        submit.assert_called_once_with(in_flight, [("https://example.com/ok", "")])
+        self.assertEqual(stage.stats['killed'], 1)
+
+
+class UrgencyCalibrationTests(SimpleTestCase):
+    def test_threshold_reaches_the_precision_target(self):
+        margins = [-0.2, -0.15, -0.1, -0.05, 0.0, 0.02, 0.05, 0.1, 0.15, 0.2]
+        labels = [False, False, False, False, True, False, True, True, True, True]
+        calibration = calibrate_urgency(margins, labels, min_precision=0.8)
+        self.assertGreaterEqual(calibration['precision'], 0.8)
+        self.assertEqual(calibration['recall'], 1.0)
+        self.assertGreater(calibration['scale'], 0)
+
+        # Unreachable precision turns pushes off rather than guessing
+        unreachable = calibrate_urgency([0.0, 0.1, 0.2, 0.3], [False, True, True, False], min_precision=0.99)
+        self.assertIsNone(unreachable['precision'])
+        self.assertGreater(unreachable['threshold'], 1.0)
+
+    def test_service_uses_the_calibration(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as handle:
+            json.dump({'scale': 10.0, 'offset': -1.0, 'threshold': 0.7}, handle)
+        self.addCleanup(os.remove, handle.name)
+        nlp = LexiconNLPService()
+        nlp.urgency_calibration = load_urgency_calibration(handle.name)
+        self.assertEqual(nlp.breaking_threshold, 0.7)
+        self.assertAlmostEqual(nlp.urgency_probability(0.1), 0.5)
+        with override_settings(BREAKING_NEWS_URGENCY_THRESHOLD=0.6):
+            self.assertEqual(LexiconNLPService().breaking_threshold, 0.6)
+
+
+@override_settings(SUMMARY_MAX_TIER='extractive', SUMMARY_UPGRADE_MAX_ATTEMPTS=2)
+class UpgradeSummariesTests(TestCase):
+    def create(self, url, content, hours_ago):
+        return Article.objects.create(
+            title=url, url=url, source="Example", content=content, summary="lead",
+            published_at=timezone.now() - timedelta(hours=hours_ago), summary_tier=TIER_LEAD
+        )
+
+    def test_unupgradable_rows_do_not_starve_older_ones(self):
+        self.create("https://example.com/empty", "", hours_ago=0)
+        stuck = self.create("https://example.com/stuck", "Short.", hours_ago=1)
+        older = self.create("https://example.com/older", "A longer story.", hours_ago=2)
+
+        def summarize(scheduler, text, *args, **kwargs):
+            return ("upgraded", 'extractive') if text == older.content else ("lead", TIER_LEAD)
+
+        with mock.patch.object(tasks.pipeline, 'queue_depth', return_value=0), \
+                mock.patch.object(SummarizationScheduler, 'summarize', summarize):
+            for _ in range(3):
+                tasks.upgrade_summaries_task(batch_size=1)
+
+        stuck.refresh_from_db()
+        older.refresh_from_db()
+        self.assertEqual(stuck.summary_upgrade_attempts, 2)
+        self.assertEqual(older.summary_tier, 'extractive')
+        self.assertEqual(older.summary, "upgraded")
+
+
+class LazySummaryTests(TestCase):
+    def setUp(self):
+        self.article = Article.objects.create(
+            title="Lazy", url="https://example.com/lazy", source="Example", published_at=timezone.now(),
+            content="First. Second. Third. Fourth.", summary="First.", summary_tier=TIER_LEAD,
+            summary_state=STATE_PLACEHOLDER
+        )
+        self.redis = InMemoryRedis()
+        self.lock_key = f"newshub:article_summary_lock:{self.article.pk}"
+
+    def test_read_queues_the_summary_once(self):
+        with mock.patch.object(tasks.summarize_article_task, 'delay') as delay:
+            for _ in range(2):
+                response = self.client.get(reverse('article_summary', args=[self.article.id]))
+                self.assertEqual(response.json(), {'id': self.article.id, 'summary': "First.", 'state': 'placeholder'})
+        delay.assert_called_once_with(self.article.pk)
+
+    def test_lock_of_another_worker_is_left_alone(self):
+        self.redis.set(self.lock_key, 'other-worker')
+        self.assertEqual(ensure_summary(self.article, wait_timeout=0.2, redis=self.redis), "First.")
+        self.assertEqual(self.redis.get(self.lock_key), b'other-worker')
+
+    def test_summary_is_computed_and_lock_released(self):
+        with mock.patch.object(SummarizationScheduler, 'summarize', return_value=("Full.", 'extractive')):
+            self.assertEqual(ensure_summary(self.article, redis=self.redis), "Full.")
+        self.assertIsNone(self.redis.get(self.lock_key))
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.summary_state, 'complete')
+
+    def test_allowlist_skips_inactive_alerts(self):
+        active = User.objects.create_user(username='active', password='testpass')
+        gone = User.objects.create_user(username='gone', password='testpass', is_active=False)
+        KeywordAlert.objects.create(user=active, keyword='Harbour')
+        KeywordAlert.objects.create(user=active, keyword='paused', is_active=False)
+        KeywordAlert.objects.create(user=gone, keyword='departed')
+        self.assertEqual(EagerAllowlist._load()['keywords'], ['harbour'])
+
+    def test_lock_is_renewed_while_computing(self):
+        def slow_summary(*args, **kwargs):
+            time.sleep(0.5)
+            return "Full.", 'abstractive'
+
+        with mock.patch.object(SummarizationScheduler, 'summarize', side_effect=slow_summary), \
+                mock.patch.object(self.redis, 'eval', wraps=self.redis.eval) as redis_eval:
+            self.assertEqual(ensure_summary(self.article, wait_timeout=0.1, redis=self.redis), "Full.")
+        self.assertTrue(any('PEXPIRE' in call.args[0] for call in redis_eval.call_args_list))
+        self.assertIsNone(self.redis.get(self.lock_key))
+
+
+@override_settings(INGEST_API_TOKENS=['partner-token'], INGEST_API_BATCH_SIZE=2)
+class BulkIngestTests(TestCase):
+    def post(self, lines, token='partner-token'):
+        body = '\n'.join(line if isinstance(line, str) else json.dumps(line) for line in lines)
+        with mock.patch('aggregator.tasks.check_keyword_matches_batch.delay'):
+            response = Client().post(reverse('bulk_ingest'), body, content_type='application/x-ndjson',
+                                     HTTP_AUTHORIZATION=f"Bearer {token}")
+            if response.status_code != 200:
+                return response, []
+            return response, [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def record(self, url, **extra):
+        return {'url': url, 'title': url, 'source': {'name': 'Wire'},
+                'publishedAt': '2026-10-01T12:00:00Z', **extra}
+
+    def test_rejects_unknown_token(self):
+        response, _ = self.post([self.record('https://example.com/a')], token='wrong')
+        self.assertEqual(response.status_code, 401)
+
+    def test_per_line_results(self):
+        _, results = self.post([
+            self.record('https://example.com/a'),
+            '{not json',
+            self.record('https://example.com/a?utm_source=feed'),
+            '',
+            self.record('ftp://example.com/b'),
+            self.record('https://example.com/c', category='technology'),
+        ])
+        self.assertEqual([(r['line'], r['status']) for r in results[:-1]], [
+            (1, 'created'), (2, 'invalid'), (3, 'duplicate'), (5, 'invalid'), (6, 'created'),
+        ])
+        self.assertEqual(results[-1]['summary']['created'], 2)
+        self.assertEqual(Article.objects.get(url='https://example.com/c').category, 'technology')
+        self.assertEqual(Article.objects.get(url='https://example.com/a').category_version, '')
+
+    def test_rerun_reports_duplicates(self):
+        self.post([self.record('https://example.com/a')])
+        _, results = self.post([self.record('https://example.com/a'), self.record('https://example.com/b')])
+        self.assertEqual([r['status'] for r in results[:-1]], ['duplicate', 'created'])
+
+    def test_staff_session_is_not_enough(self):
+        staff = User.objects.create_user(username='editor', password='pw', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        response = client.post(reverse('bulk_ingest'), json.dumps(self.record('https://example.com/a')),
+                               content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 401)
+
+    def test_enrichment_is_queued(self):
+        body = json.dumps(self.record('https://example.com/a', description='Markets fell sharply.'))
+        with mock.patch('aggregator.tasks.check_keyword_matches_batch.delay'), \
+                mock.patch('aggregator.tasks.enrich_articles_task.delay') as delay:
+            response = Client().post(reverse('bulk_ingest') + '?enrich=1', body,
+                                     content_type='application/x-ndjson', HTTP_AUTHORIZATION='Bearer partner-token')
+            b''.join(response.streaming_content)
+        article = Article.objects.get(url='https://example.com/a')
+        delay.assert_called_once_with([article.pk])
+        self.assertIsNone(article.enriched_at)
+
+        with mock.patch.object(tasks, 'NLPService', LexiconNLPService):
+            tasks.enrich_articles_task([article.pk])
+        article.refresh_from_db()
+        self.assertIsNotNone(article.enriched_at)
+        self.assertEqual(article.category_version, LexiconNLPService().versions['category_version'])
+
+
+class CanonicalUrlTests(SimpleTestCase):
+    def test_strips_tracking_and_normalizes(self):
+        self.assertEqual(
+            canonicalize_url("HTTPS://Example.com:443/news/story/?utm_source=x&b=2&a=1&fbclid=9#top"),
+            "https://example.com/news/story?a=1&b=2"
+        )
+
+    def test_amp_variants(self):
+        self.assertEqual(canonicalize_url("https://amp.example.com/news/story/amp/"),
+                         "https://example.com/news/story")
+
+
+class SeenURLFilterTests(SimpleTestCase):
+    def test_added_urls_are_maybe_seen(self):
+        seen_filter = SeenURLFilter(capacity=1000, error_rate=0.01, days=3, redis=InMemoryRedis())
+        added = [url_hash(f"https://example.com/{i}") for i in range(200)]
+        seen_filter.add(added)
+        self.assertTrue(all(seen_filter.might_contain(added)))
+        unseen = [url_hash(f"https://example.org/{i}") for i in range(200)]
+        self.assertLess(sum(seen_filter.might_contain(unseen)), 10)
+
+    def test_lookup_is_one_command_per_generation(self):
+        redis = InMemoryRedis()
+        seen_filter = SeenURLFilter(capacity=1000, error_rate=0.01, days=3, redis=redis)
+        digests = [url_hash(f"https://example.com/{i}") for i in range(50)]
+        with mock.patch.object(redis, 'execute_command', wraps=redis.execute_command) as command:
+            seen_filter.might_contain(digests)
+        self.assertEqual(command.call_count, 2)
+
+    def test_urls_outlive_a_rotation(self):
+        seen_filter = SeenURLFilter(capacity=1000, error_rate=0.01, days=3, redis=InMemoryRedis())
+        digest = url_hash("https://example.com/kept")
+        seen_filter.add([digest])
+        later = timezone.now() + timedelta(days=3)
+        with mock.patch('aggregator.seen_filter.timezone.now', return_value=later):
+            self.assertEqual(seen_filter.might_contain([digest]), [True])
+        much_later = timezone.now() + timedelta(days=7)
+        with mock.patch('aggregator.seen_filter.timezone.now', return_value=much_later):
+            self.assertEqual(seen_filter.might_contain([digest]), [False])
+
+
+FEED_FIXTURES = os.path.join(os.path.dirname(__file__), 'testdata', 'feeds')
+
+
+def read_in_chunks(name, size=64):
+    with open(os.path.join(FEED_FIXTURES, name), 'rb') as f:
+        while chunk := f.read(size):
+            yield chunk
+
+
+def read_in_chunks_of(body, size=16):
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+class FeedParserTests(SimpleTestCase):
+    def test_rss_entries_are_normalized(self):
+        articles = list(parse_feed(read_in_chunks('rss.xml'), 'Example Wire'))
+        self.assertEqual(len(articles), 2)
+        first = articles[0]
+        self.assertEqual(first['source']['name'], 'Example Wire')
+        self.assertEqual(first['title'], 'Central bank holds rates steady')
+        self.assertEqual(first['description'], 'Policymakers left rates unchanged for a third meeting.')
+        self.assertEqual(first['publishedAt'], '2026-10-06T12:30:00Z')
+        self.assertEqual(first['urlToImage'], 'https://wire.example.com/img/rates.jpg')
+        self.assertEqual(articles[1]['urlToImage'], 'https://wire.example.com/img/storm.jpg')
+
+    def test_atom_entries_are_normalized(self):
+        articles = list(parse_feed(read_in_chunks('atom.xml'), 'Example Tech'))
+        self.assertEqual([a['url'] for a in articles], [
+            'https://tech.example.com/posts/new-chip',
+            'https://tech.example.com/posts/db-1-0',
+        ])
+        self.assertEqual(articles[0]['author'], 'Sam Writer')
+        self.assertEqual(articles[1]['publishedAt'], '2026-10-05T07:15:00Z')
+        self.assertEqual(articles[1]['content'], 'The project released its first stable version.')
+
+    def test_max_entries(self):
+        self.assertEqual(len(list(parse_feed(read_in_chunks('atom.xml'), 'Example Tech', max_entries=1))), 1)
+
+    def test_undated_entries_are_not_dated_now(self):
+        body = (b'<rss><channel><item><title>Undated</title>'
+                b'<link>https://wire.example.com/undated</link></item></channel></rss>')
+        self.assertIsNone(list(parse_feed([body], 'Example Wire'))[0]['publishedAt'])
+
+    def test_entity_declarations_are_refused(self):
+        body = (b'<?xml version="1.0"?><!DOCTYPE rss [<!ENTITY boom "boom">]>'
+                b'<rss><channel><item><title>&boom;</title><link>https://x.test/</link></item></channel></rss>')
+        with self.assertRaises(XML_ERRORS):
+            list(parse_feed(read_in_chunks_of(body), 'Example Wire'))
+
+
+class StubFeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == '"feed-v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        with open(os.path.join(FEED_FIXTURES, 'rss.xml'), 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('ETag', '"feed-v1"')
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FeedServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubFeedHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.feed = FeedSource(name='Example Wire', url=f"http://127.0.0.1:{self.server.server_port}/rss")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_conditional_get(self):
+        service = FeedService(max_workers=2, session=requests.Session())
+        self.assertEqual(len(service.fetch(self.feed)), 2)
+        self.assertEqual(self.feed.etag, '"feed-v1"')
+        self.assertIsNone(service.fetch(self.feed))
+
+
+class StubHubHandler(BaseHTTPRequestHandler):
+    """Serves a feed advertising itself as the hub and records subscribe requests."""
+    requests_received = []
+
+    def do_GET(self):
+        base = f"http://127.0.0.1:{self.server.server_port}"
+        body = (
+            f'<feed xmlns="http://www.w3.org/2005/Atom"><title>Hubbed</title>'
+            f'<link rel="hub" href="{base}/hub"/><link rel="self" href="{base}/feed"/>'
+            f'<entry><title>One</title><link href="https://example.com/one"/></entry></feed>'
+        ).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        self.requests_received.append({key: values[0] for key, values in form.items()})
+        self.send_response(202)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class WebSubTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.feed = FeedSource.objects.create(name='Hubbed', url=f"{self.base}/feed")
+        StubHubHandler.requests_received = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_discover_hub_stops_at_first_entry(self):
+        with open(os.path.join(FEED_FIXTURES, 'atom.xml'), 'rb') as f:
+            self.assertEqual(discover_hub([f.read()]), (None, None))
+
+    def test_subscribe_and_verify(self):
+        subscription = WebSubService(session=requests.Session()).subscribe(self.feed)
+        sent = StubHubHandler.requests_received[0]
+        self.assertEqual(sent['hub.mode'], 'subscribe')
+        self.assertEqual(sent['hub.topic'], f"{self.base}/feed")
+        self.assertTrue(sent['hub.callback'].endswith(f"/websub/callback/{subscription.token}/"))
+
+        callback = reverse('websub_callback', args=[subscription.token])
+        response = Client().get(callback, {
+            'hub.mode': 'subscribe', 'hub.topic': 'https://elsewhere.example/feed', 'hub.challenge': 'abc'
+        })
+        self.assertEqual(response.status_code, 404)
+        response = Client().get(callback, {
+            'hub.mode': 'subscribe', 'hub.topic': subscription.topic_url,
+            'hub.challenge': 'abc', 'hub.lease_seconds': '3600',
+        })
+        self.assertEqual(response.content, b'abc')
+        subscription.refresh_from_db()
+        self.assertTrue(subscription.is_active)
+        self.assertEqual(subscription.lease_seconds, 3600)
+
+        response = Client().get(callback, {
+            'hub.mode': 'subscribe', 'hub.topic': subscription.topic_url,
+            'hub.challenge': 'abc', 'hub.lease_seconds': 'forever',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_signed_delivery_is_queued(self):
+        subscription = WebSubSubscription.objects.create(
+            feed=self.feed, hub_url=f"{self.base}/hub", topic_url=f"{self.base}/feed",
+            token='token', secret='secret', state='verified'
+        )
+        with open(os.path.join(FEED_FIXTURES, 'atom.xml'), 'rb') as f:
+            body = f.read()
+        callback = reverse('websub_callback', args=[subscription.token])
+        signature = 'sha256=' + hmac.new(b'secret', body, hashlib.sha256).hexdigest()
+
+        with mock.patch('aggregator.views.ingest_pushed_entries_task.delay') as delay:
+            response = Client().post(callback, body, content_type='application/atom+xml',
+                                     HTTP_X_HUB_SIGNATURE='sha256=' + '0' * 64)
+            self.assertEqual(response.status_code, 202)
+            delay.assert_not_called()
+
+            response = Client().post(callback, body, content_type='application/atom+xml',
+                                     HTTP_X_HUB_SIGNATURE=signature)
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(len(delay.call_args[0][0]), 2)
+
+            subscription.state = 'unsubscribed'
+            subscription.save()
+            delay.reset_mock()
+            response = Client().post(callback, body, content_type='application/atom+xml',
+                                     HTTP_X_HUB_SIGNATURE=signature)
+            self.assertEqual(response.status_code, 410)
+            delay.assert_not_called()
+
+
+class PipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = InMemoryRedis()
+        patcher = mock.patch('aggregator.pipeline.StagingStore', lambda: StagingStore(redis=self.redis))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_staging_round_trip(self):
+        store = StagingStore(redis=self.redis)
+        batch_id = store.put([{'url': 'https://example.com/a', 'title': 'A'}])
+        self.assertEqual(store.get(batch_id), [{'url': 'https://example.com/a', 'title': 'A'}])
+        store.delete(batch_id)
+        self.assertIsNone(store.get(batch_id))
+
+    @override_settings(INGEST_EXTRACT_FULL_TEXT=False)
+    def test_stage_hands_batch_on(self):
+        batch_id = StagingStore(redis=self.redis).put([{'url': 'https://example.com/a'}])
+        with mock.patch('aggregator.pipeline.is_backlogged', return_value=False), \
+                mock.patch.object(tasks.enrich_stage_task, 'delay') as delay:
+            tasks.extract_stage_task(batch_id)
+        next_id = delay.call_args[0][0]
+        self.assertIsNone(StagingStore(redis=self.redis).get(batch_id))
+        self.assertEqual(StagingStore(redis=self.redis).get(next_id), [{'url': 'https://example.com/a'}])
+
+    def test_stage_extracts_in_process(self):
+        articles = [{'url': 'https://example.com/a', 'content': 'Lead only'}]
+        with mock.patch('aggregator.html_archive.archived_pages', return_value={'https://example.com/a': '<html/>'}), \
+                mock.patch('aggregator.html_archive.archive_pages'), \
+                mock.patch('aggregator.extraction.ExtractionStage', side_effect=AssertionError('no process pool')), \
+                mock.patch('aggregator.extraction.extract_html', return_value={'text': 'Full text', 'top_image': None}):
+            pipeline.extract_full_text(articles)
+        self.assertEqual(articles[0]['content'], 'Full text')
+
+    def test_backlogged_stage_defers(self):
+        batch_id = StagingStore(redis=self.redis).put([{'url': 'https://example.com/a'}])
+        with mock.patch('aggregator.pipeline.is_backlogged', return_value=True), \
+                mock.patch.object(tasks.extract_stage_task, 'apply_async') as apply_async, \
+                mock.patch.object(tasks.enrich_stage_task, 'delay') as delay:
+            tasks.extract_stage_task(batch_id)
+        delay.assert_not_called()
+        self.assertEqual(apply_async.call_args[1]['args'], (batch_id,))
+        self.assertIsNotNone(StagingStore(redis=self.redis).get(batch_id))
+
+
+class FetchRunTests(SimpleTestCase):
+    def test_exhausted_fetch_returns_error_for_the_chord(self):
+        with mock.patch('aggregator.pipeline.is_backlogged', return_value=False), \
+                mock.patch.object(tasks, 'NewsAPIService', side_effect=RuntimeError('upstream down')):
+            result = tasks.fetch_articles_task.apply(kwargs={'category': 'science'},
+                                                     retries=tasks.fetch_articles_task.max_retries)
+        self.assertEqual(result.get(), {'category': 'science', 'query': None, 'error': 'upstream down'})
+
+    def test_finalize_counts_failed_and_skipped_fetches(self):
+        stats = tasks.finalize_fetch_run([
+            {'category': 'general', 'query': None, 'fetched': 4, 'queued': 3, 'elapsed': 1.5},
+            {'category': 'science', 'query': None, 'error': 'upstream down'},
+            'Skipped: sports is already being fetched',
+        ])
+        self.assertEqual(stats['fetches'], 1)
+        self.assertEqual(stats['queued'], 3)
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(stats['failed'], {'science': 'upstream down'})
+
+
+class HTMLArchiveTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def page(self, n):
+        return f"<html><body><p>Story {n}</p>{'<p>filler</p>' * 200}</body></html>"
+
+    def test_round_trip_random_access(self):
+        archive = HTMLArchive(root=self.tmp.name)
+        archive.put_many((f"https://example.com/{n}", self.page(n)) for n in range(20))
+        self.assertEqual(archive.get("https://example.com/13"), self.page(13))
+        self.assertEqual(archive.get("https://example.com/13?utm_source=feed"), self.page(13))
+        self.assertIsNone(archive.get("https://example.com/missing"))
+        entry = ArchivedPage.objects.get(url="https://example.com/13")
+        self.assertLess(entry.length, entry.size)
+
+    def test_rearchive_replaces_entry(self):
+        archive = HTMLArchive(root=self.tmp.name)
+        archive.put("https://example.com/a", "<p>old</p>")
+        archive.put("https://example.com/a", "<p>new</p>")
+        self.assertEqual(ArchivedPage.objects.count(), 1)
+        self.assertEqual(archive.get("https://example.com/a"), "<p>new</p>")
+
+    def test_retention_drops_oldest_segments(self):
+        archive = HTMLArchive(root=self.tmp.name, segment_bytes=200, max_bytes=600)
+        for n in range(30):
+            archive.put(f"https://example.com/{n}", self.page(n))
+        self.assertLessEqual(sum(list(archive.segments().values())[:-1]), 600)
+        self.assertIsNone(archive.get("https://example.com/0"))
+        self.assertEqual(archive.get("https://example.com/29"), self.page(29))
+
+    def test_nodes_keep_separate_segments(self):
+        first = HTMLArchive(root=self.tmp.name, node='worker-1')
+        second = HTMLArchive(root=self.tmp.name, node='worker-2')
+        first.put("https://example.com/a", "<p>a</p>")
+        second.put("https://example.com/b", "<p>b</p>")
+        self.assertEqual(list(first.segments()), [1])
+        self.assertEqual(list(second.segments()), [1])
+        self.assertEqual(ArchivedPage.objects.get(url="https://example.com/b").node, 'worker-2')
+        # A shared directory serves every node's pages
+        self.assertEqual(first.get_many(["https://example.com/a", "https://example.com/b"]),
+                         {"https://example.com/a": "<p>a</p>", "https://example.com/b": "<p>b</p>"})
+
+    def test_unreadable_page_does_not_abort_the_batch(self):
+        archive = HTMLArchive(root=self.tmp.name, node='worker-1')
+        archive.put("https://example.com/a", "<p>a</p>")
+        HTMLArchive(root=self.tmp.name, node='worker-2').put("https://example.com/b", "<p>b</p>")
+        os.remove(os.path.join(self.tmp.name, 'worker-1', 'segment-000001.zst'))
+        self.assertEqual(archive.get_many(["https://example.com/a", "https://example.com/b"]),
+                         {"https://example.com/b": "<p>b</p>"})
+
+
+class ReplayTests(TestCase):
+    def test_synthetic_replay_is_repeatable(self):
+        articles = list(synthetic_articles(40, seed=3, duplicate_rate=0.2))
+        self.assertEqual(articles, list(synthetic_articles(40, seed=3, duplicate_rate=0.2)))
+        unique = len({article['url'] for article in articles})
+
+        report = ReplayRunner(LexiconNLPService(), batch_size=10, commit=True).run(articles)
+        self.assertEqual(report['read'], 40)
+        self.assertEqual(report['created'], unique)
+        self.assertEqual(Article.objects.count(), unique)
+        self.assertEqual(set(report['stages']), {'dedup', 'enrich', 'persist'})
+        self.assertLessEqual(report['stages']['persist']['queries'], 4 * 4)
+
+        again = ReplayRunner(LexiconNLPService(), batch_size=10, commit=True).run(articles)
+        self.assertEqual(again['created'], 0)
+
+    def test_replay_is_rolled_back_unless_committed(self):
+        articles = list(synthetic_articles(20, seed=5, duplicate_rate=0))
+        with mock.patch('aggregator.ingest.remember_urls') as remember, \
+                self.captureOnCommitCallbacks(execute=True):
+            report = ReplayRunner(LexiconNLPService(), batch_size=10).run(articles)
+        self.assertEqual(report['created'], 20)
+        self.assertFalse(Article.objects.filter(url__startswith='https://replay.example/').exists())
+        remember.assert_not_called()
+
+
+class FakeUpstreamTests(SimpleTestCase):
+    def _service(self, upstream):
+        return NewsAPIService(api_key='test', base_url=upstream.newsapi_url, session=requests.Session(),
+                              rate_limiter=UnthrottledRateLimiter(), use_cache=False)
+
+    def test_serves_recorded_headlines_and_their_pages(self):
+        with FakeUpstream() as upstream:
+            articles = self._service(upstream).fetch_articles(page_size=100)
+            self.assertEqual(len(articles), len(upstream.articles))
+            self.assertTrue(all(article['url'].startswith(upstream.base_url) for article in articles))
+
+            downloader = ArticleDownloader(session=requests.Session())
+            pages = {url: html for url, html, _ in downloader.iter_downloads(article['url'] for article in articles)}
+            self.assertEqual(downloader.stats['downloaded'], len(articles))
+            self.assertIn(articles[0]['description'], pages[articles[0]['url']])
+
+    def test_pages_through_synthetic_articles(self):
+        with FakeUpstream(articles=250) as upstream:
+            fetched = list(self._service(upstream).iter_articles(page_size=100, max_pages=5))
+            self.assertEqual(len(fetched), 250)
+            self.assertEqual(upstream.stats['newsapi.200'], 3)
+
+    def test_injected_faults_are_repeatable(self):
+        faults = FaultProfile(error_rate=0.3, rate_limit_rate=0.2)
+        outcomes = []
+        for _ in range(2):
+            with FakeUpstream(articles=50, publishers=faults, seed=7) as upstream:
+                urls = [article['url'] for article in upstream.articles]
+                downloader = ArticleDownloader(session=requests.Session(), retries=0, backoff=0)
+                outcomes.append(sorted(url.rsplit('/', 1)[-1] for url, _, error in downloader.iter_downloads(urls)
+                                       if error))
+        self.assertTrue(outcomes[0])
+        self.assertEqual(outcomes[0], outcomes[1])
+
+    def test_rate_limited_newsapi_yields_no_articles(self):
+        with FakeUpstream(newsapi=FaultProfile(rate_limit_rate=1.0)) as upstream:
+            self.assertEqual(self._service(upstream).fetch_articles(), [])
+            self.assertEqual(upstream.stats['newsapi.429'], 1)
+
+    def test_rate_limited_newsapi_pages_raise(self):
+        with FakeUpstream(newsapi=FaultProfile(rate_limit_rate=1.0)) as upstream:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                list(self._service(upstream).iter_pages(page_size=100))
+
+
+class StubBudgetLimiter:
+    def __init__(self, remaining):
+        self.remaining = remaining
+
+    def get_metrics(self):
+        return {'remaining': {'default': self.remaining}}
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AlertQueryPlannerTests(TestCase):
+    def _alert(self, username, keyword):
+        user, _ = User.objects.get_or_create(username=username)
+        return KeywordAlert.objects.create(user=user, keyword=keyword)
+
+    def test_packs_keywords_into_few_queries(self):
+        keywords = [f"keyword number {n}" for n in range(100)]
+        packs = pack_queries(keywords, max_length=500)
+        self.assertEqual(sorted(k for pack in packs for k in pack), sorted(keywords))
+        self.assertTrue(all(len(build_query(pack)) <= 500 for pack in packs))
+        self.assertLessEqual(len(packs), len(build_query(keywords)) // 500 + 1)
+
+    def test_ranks_by_subscribers_hits_and_staleness(self):
+        for username in ('ann', 'bob', 'cat'):
+            self._alert(username, 'bitcoin')
+        self._alert('ann', 'Quantum')
+        self._alert('bob', 'gardening')
+        self._alert('cat', 'paused')
+        KeywordAlert.objects.filter(keyword='paused').update(is_active=False)
+        record_hits({'quantum': 1})
+        record_queried(['gardening'])
+
+        ranked = AlertQueryPlanner().rank_keywords()
+        self.assertEqual([rank.keyword for rank in ranked], ['bitcoin', 'quantum', 'gardening'])
+        self.assertEqual(ranked[0].subscribers, 3)
+
+        plan = AlertQueryPlanner(max_length=500).plan()
+        self.assertEqual(len(plan), 1)
+        self.assertEqual(plan[0].query, '"bitcoin" OR "quantum" OR "gardening"')
+
+    def test_truncated_query_keeps_the_cutoff(self):
+        def fetch(count):
+            page = [{'url': f"https://example.com/{n}"} for n in range(count)]
+            service = mock.Mock(iter_pages=mock.Mock(return_value=iter([page])))
+            with override_settings(ALERT_QUERY_MAX_PAGES=1), \
+                    mock.patch.object(tasks, 'NewsAPIService', return_value=service), \
+                    mock.patch.object(tasks, '_defer_if_backlogged', return_value=False), \
+                    mock.patch.object(tasks, '_submit_articles', return_value=count):
+                return tasks.fetch_alert_query_task(['bitcoin'])
+
+        self.assertFalse(fetch(100)['complete'])
+        stat = AlertKeyword.objects.get(keyword='bitcoin')
+        # Ranked as queried, but the next query asks for the same window
+        self.assertIsNotNone(stat.last_queried_at)
+        self.assertIsNone(stat.covered_until)
+        self.assertTrue(fetch(40)['complete'])
+        self.assertIsNotNone(AlertKeyword.objects.get(keyword='bitcoin').covered_until)
+
+    def test_failed_query_is_retried_unmarked(self):
+        service = mock.Mock(iter_pages=mock.Mock(side_effect=requests.exceptions.HTTPError('429')))
+        with mock.patch.object(tasks, 'NewsAPIService', return_value=service), \
+                mock.patch.object(tasks, '_defer_if_backlogged', return_value=False), \
+                mock.patch.object(tasks.fetch_alert_query_task, 'retry') as retry:
+            tasks.fetch_alert_query_task(['bitcoin'])
+        retry.assert_called_once()
+        self.assertFalse(AlertKeyword.objects.filter(keyword='bitcoin').exists())
+
+    def test_cutoff_follows_the_last_complete_query(self):
+        now = timezone.now()
+        record_queried(['bitcoin'], now - timedelta(hours=2))
+        record_queried(['bitcoin'], now - timedelta(hours=1), complete=False)
+        overlap = timedelta(minutes=30)
+        with override_settings(FETCH_STATE_OVERLAP_MINUTES=30, ALERT_QUERY_LOOKBACK_HOURS=24):
+            self.assertEqual(query_cutoff(['bitcoin'], now), now - timedelta(hours=2) - overlap)
+            self.assertEqual(query_cutoff(['bitcoin', 'quantum'], now), now - timedelta(hours=24))
+
+    def test_budget_spreads_remaining_quota_over_the_day(self):
+        for n in range(30):
+            self._alert('ann', f"topic {n:02d} " + 'x' * 40)
+        noon = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+        # 48 runs left today; 30% of 80 remaining is 24 queries, half a query per run
+        planner = AlertQueryPlanner(max_length=100, max_queries=10, budget_share=0.3, interval=15,
+                                    rate_limiter=StubBudgetLimiter(80))
+        self.assertEqual(len(planner.plan(noon)), 30)
+        self.assertEqual([len(planner.schedule(noon)) for _ in range(4)], [0, 1, 0, 1])
+
+        self.assertEqual(AlertQueryPlanner(rate_limiter=StubBudgetLimiter(0)).schedule(noon), [])
+
+
+@override_settings(DEFAULT_CATEGORIES=['business'], NEWS_FETCH_QUERIES=[], POLL_TARGET_NEW_ITEMS=5,
+                   POLL_INTERVAL_BOUNDS={'category': (60, 3600), 'feed': (60, 3600)})
+class PollScheduleTests(TestCase):
+    def setUp(self):
+        self.feed = FeedSource.objects.create(name='Example', url='https://example.com/feed.xml')
+        scheduler.sync_schedules()
+        self.now = timezone.now()
+
+    def test_sync_adds_configured_sources(self):
+        kinds = dict(PollSchedule.objects.values_list('kind', 'target'))
+        self.assertEqual(kinds[PollSchedule.KIND_CATEGORY], 'business')
+        self.assertEqual(kinds[PollSchedule.KIND_FEED], str(self.feed.pk))
+        self.assertIn(PollSchedule.KIND_ALERTS, kinds)
+        with override_settings(DEFAULT_CATEGORIES=['sports']):
+            scheduler.sync_schedules()
+        self.assertFalse(PollSchedule.objects.get(kind=PollSchedule.KIND_CATEGORY, target='business').is_active)
+
+    def test_interval_adapts(self):
+        entry = PollSchedule(kind=PollSchedule.KIND_FEED, interval=900)
+        entry.record_poll(new_items=10, now=self.now)
+        self.assertEqual(entry.interval, 450)
+        for _ in range(10):
+            entry.record_poll(new_items=0, now=self.now)
+        self.assertEqual(entry.interval, 3600)
+        entry.record_poll(failed=True, now=self.now)
+        self.assertEqual(entry.interval, 3600)
+        self.assertEqual(entry.consecutive_failures, 1)
+
+    def test_claim_is_exclusive(self):
+        claimed = scheduler.claim_due(now=self.now)
+        self.assertEqual(len(claimed), 3)
+        self.assertEqual(scheduler.claim_due(now=self.now), [])
+        # An expired lease is claimable again
+        self.assertEqual(len(scheduler.claim_due(now=self.now + timedelta(hours=1))), 3)
+
+    def test_stale_completion_is_ignored(self):
+        first = scheduler.claim_due(kinds=[PollSchedule.KIND_FEED], lease_seconds=60, now=self.now)[0]
+        later = self.now + timedelta(minutes=5)
+        second = scheduler.claim_due(kinds=[PollSchedule.KIND_FEED], now=later)[0]
+        self.assertFalse(scheduler.complete(first.pk, first.lease_token, new_items=3))
+        self.assertTrue(scheduler.complete(second.pk, second.lease_token, new_items=3))
+        entry = PollSchedule.objects.get(pk=first.pk)
+        self.assertEqual(entry.lease_token, '')
+        self.assertEqual(entry.last_new_items, 3)
+        self.assertGreater(entry.next_poll_at, later)
+
+    def test_retrying_fetch_keeps_its_lease(self):
+        entry = scheduler.claim_due(kinds=[PollSchedule.KIND_CATEGORY], now=self.now)[0]
+        with mock.patch('aggregator.pipeline.is_backlogged', return_value=False), \
+                mock.patch.object(tasks, 'NewsAPIService', side_effect=RuntimeError('upstream down')), \
+                mock.patch.object(tasks.fetch_articles_task, 'retry') as retry:
+            tasks.fetch_articles_task(category='business', schedule_id=entry.pk, lease=entry.lease_token)
+        retry.assert_called_once()
+        # Still leased once the retry delay is over
+        after_retry = timezone.now() + timedelta(seconds=tasks.fetch_articles_task.default_retry_delay)
+        self.assertEqual(scheduler.claim_due(kinds=[PollSchedule.KIND_CATEGORY],
+                                             now=after_retry + timedelta(seconds=60)), [])
+        self.assertEqual(PollSchedule.objects.get(pk=entry.pk).lease_token, entry.lease_token)
+
+    @override_settings(SEEN_FILTER_ENABLED=False)
+    def test_feed_entries_are_deduplicated_by_url(self):
+        self.feed.newest_entry_at = self.now
+        self.feed.save()
+        Article.objects.create(title='Stored', url='https://example.com/stored', source='Example',
+                               published_at=self.now)
+        entries = [
+            {'url': 'https://example.com/undated', 'title': 'Undated', 'publishedAt': None},
+            {'url': 'https://example.com/old', 'title': 'Old', 'publishedAt': '2020-01-01T00:00:00Z'},
+            {'url': 'https://example.com/stored', 'title': 'Stored', 'publishedAt': '2020-01-01T00:00:00Z'},
+        ]
+        with mock.patch.object(tasks.FeedService, 'poll', return_value=[(self.feed, entries, None)]), \
+                mock.patch.object(tasks, '_queue_articles', return_value=2) as queue:
+            tasks.poll_feeds_task()
+        # An old entry the pipeline never stored is queued again despite the newer mark
+        self.assertEqual([a['url'] for a in queue.call_args[0][0]],
+                         ['https://example.com/undated', 'https://example.com/old'])
+        self.assertEqual(FeedSource.objects.get(pk=self.feed.pk).newest_entry_at, self.now)
+        self.assertEqual(PollSchedule.objects.get(feed=self.feed).last_new_items, 2)
+
+    def test_feed_validators_are_kept_only_once_queued(self):
+        def poll(feeds):
+            for feed in feeds:
+                feed.etag = '"feed-v2"'
+                yield feed, [{'url': 'https://example.com/new', 'title': 'New', 'publishedAt': None}], None
+
+        with mock.patch.object(tasks.FeedService, 'poll', side_effect=poll), \
+                mock.patch.object(tasks, '_queue_articles', side_effect=RuntimeError('redis down')), \
+                mock.patch.object(tasks.poll_feeds_task, 'retry'):
+            tasks.poll_feeds_task()
+        self.assertEqual(FeedSource.objects.get(pk=self.feed.pk).etag, '')
+
+
+class FetchStateTests(TestCase):
+    def setUp(self):
+        self.state = FetchState.for_request('top-headlines', category='general')
+        self.stored = {'url': 'https://example.com/stored', 'publishedAt': '2024-01-02T12:00:00Z'}
+        self.queued = {'url': 'https://example.com/queued', 'publishedAt': '2024-01-02T08:00:00Z'}
+
+    def test_mark_holds_below_queued_articles(self):
+        self.state.advance([self.stored], queued=[self.queued])
+        state = FetchState.objects.get(pk=self.state.pk)
+        self.assertEqual(state.newest_published_at, parse_datetime(self.stored['publishedAt']))
+        # In flight, so not fetched again, but the cutoff stays below it
+        self.assertTrue(state.is_known(self.queued))
+        self.assertEqual(state.cutoff, parse_datetime(self.queued['publishedAt']))
+
+        FetchState.confirm(state.pk, [self.queued])
+        state = FetchState.objects.get(pk=self.state.pk)
+        self.assertEqual(state.pending_urls, {})
+        self.assertTrue(state.is_known(self.queued))
+        self.assertEqual(state.cutoff, state.newest_published_at - timedelta(minutes=30))
+
+    def test_persist_stage_confirms_the_fetch(self):
+        self.state.advance([], queued=[self.queued])
+        redis = InMemoryRedis()
+        enrichment = {'category': 'general', 'sentiment': 'neutral', 'sentiment_score': 1.0, 'urgency_score': 0.0,
+                      'summary': 'Summary', 'summary_tier': TIER_LEAD, 'summary_state': STATE_PLACEHOLDER,
+                      'summary_version': '', 'category_version': '', 'enriched_at': None}
+        batch_id = StagingStore(redis=redis).put([{
+            **self.queued, 'title': 'Queued', 'source': {'name': 'Example'}, 'content': 'Text',
+            'enrichment': enrichment, 'fetch_state_id': self.state.pk,
+        }])
+        with mock.patch('aggregator.pipeline.StagingStore', lambda: StagingStore(redis=redis)), \
+                mock.patch('aggregator.pipeline.is_backlogged', return_value=False), \
+                mock.patch.object(tasks.check_keyword_matches_batch, 'delay'):
+            tasks.persist_stage_task(batch_id)
+        state = FetchState.objects.get(pk=self.state.pk)
+        self.assertEqual(state.pending_urls, {})
+        self.assertEqual(state.newest_published_at, parse_datetime(self.queued['publishedAt']))
+
+    @override_settings(FETCH_STATE_PENDING_SECONDS=60, FETCH_STATE_PENDING_ATTEMPTS=2)
+    def test_lost_article_is_fetched_again_then_given_up(self):
+        self.state.advance([self.stored], queued=[self.queued])
+        later = timezone.now() + timedelta(seconds=120)
+        with mock.patch('aggregator.models.timezone.now', return_value=later):
+            # Never stored: it is fetched and queued again
+            self.assertFalse(self.state.is_known(self.queued))
+            self.state.advance([], queued=[self.queued])
+        digest = FetchState.url_digest(self.queued['url'])
+        self.assertEqual(FetchState.objects.get(pk=self.state.pk).pending_urls[digest][2], 2)
+
+        with mock.patch('aggregator.models.timezone.now', return_value=later + timedelta(seconds=120)):
+            self.state.advance([self.stored])
+        self.assertEqual(FetchState.objects.get(pk=self.state.pk).pending_urls, {})
+
+
+class LeaseTests(TestCase):
+    def setUp(self):
+        self.redis = InMemoryRedis()
+        self.leases = LeaseManager(redis=self.redis, ttl=60)
+
+    def test_lease_is_exclusive_and_fenced(self):
+        with self.leases.hold('fetch:general') as first:
+            with self.assertRaises(LeaseUnavailable):
+                with self.leases.hold('fetch:general'):
+                    pass
+        # Released on exit, and the next holder gets a newer token
+        second = self.leases.acquire('fetch:general')
+        self.assertGreater(second.token, first.token)
+        self.assertFalse(self.leases.release(first))
+        self.assertTrue(self.leases.renew(second))
+
+    def test_expired_lease_is_lost(self):
+        stale = self.leases.acquire('fetch:general')
+        self.redis.delete(f"{LeaseManager.KEY_PREFIX}:fetch:general")
+        current = self.leases.acquire('fetch:general')
+        self.assertFalse(self.leases.renew(stale))
+        self.assertTrue(stale.lost)
+
+        state = FetchState.for_request('top-headlines', category='general')
+        articles = [{'url': 'https://example.com/a', 'publishedAt': '2024-01-02T00:00:00Z'}]
+        self.assertTrue(state.advance(articles, fence=current.token))
+        self.assertFalse(state.advance(articles, fence=stale.token))
+        self.assertEqual(FetchState.objects.get(pk=state.pk).fence_token, current.token)
+
+    def test_nodes_split_keys(self):
+        registry = NodeRegistry(redis=self.redis, ttl=60)
+        registry.heartbeat('celery@a', now=0)
+        registry.heartbeat('celery@b', now=30)
+        self.assertEqual(registry.live_nodes(now=30), ['celery@a', 'celery@b'])
+        # a misses its heartbeat and drops out
+        self.assertEqual(registry.live_nodes(now=70), ['celery@b'])
+
+        keys = [f"feed:{i}" for i in range(100)]
+        owners = {key: shard_owner(key, ['celery@a', 'celery@b']) for key in keys}
+        self.assertEqual(set(owners.values()), {'celery@a', 'celery@b'})
+        # Adding a node only takes keys over; none move between the others
+        for key in keys:
+            owner = shard_owner(key, ['celery@a', 'celery@b', 'celery@c'])
+            self.assertIn(owner, {owners[key], 'celery@c'})
+
+    @override_settings(DEFAULT_CATEGORIES=['business', 'science'])
+    def test_fetch_command_holds_every_category_lease(self):
+        news_service = mock.Mock(endpoint_name=mock.Mock(return_value='top-headlines'))
+        command = fetch_articles.Command(stdout=mock.Mock(), stderr=mock.Mock())
+        with mock.patch.object(fetch_articles, 'LeaseManager', return_value=self.leases), \
+                mock.patch.object(fetch_articles, 'NewsAPIService', return_value=news_service), \
+                mock.patch.object(command, '_fetch') as fetch:
+            with self.leases.hold(fetch_lease_name('top-headlines', 'science')):
+                command.handle(notify=True)
+            fetch.assert_not_called()
+            # The leases taken before the contended one were handed back
+            self.assertIsNotNone(self.leases.acquire(fetch_lease_name('top-headlines')))
+
+    @override_settings(DEFAULT_CATEGORIES=['business'], NEWS_FETCH_QUERIES=[])
+    def test_overlapping_scheduled_fetch_releases_its_entry(self):
+        scheduler.sync_schedules()
+        entry = scheduler.claim_due(kinds=[PollSchedule.KIND_CATEGORY])[0]
+        news_service = mock.Mock(endpoint_name=mock.Mock(return_value='top-headlines'))
+        with mock.patch('aggregator.pipeline.is_backlogged', return_value=False), \
+                mock.patch.object(tasks, 'LeaseManager', return_value=self.leases), \
+                mock.patch.object(tasks, 'NewsAPIService', return_value=news_service):
+            with self.leases.hold(fetch_lease_name('top-headlines', 'business')):
+                result = tasks.fetch_articles_task(category='business', schedule_id=entry.pk,
+                                                   lease=entry.lease_token)
+        self.assertTrue(result.startswith('Skipped'))
+        entry.refresh_from_db()
+        self.assertEqual(entry.lease_token, '')
+        self.assertIsNone(entry.last_polled_at)
+        self.assertGreater(entry.next_poll_at, timezone.now())
+
+    @override_settings(DEFAULT_CATEGORIES=['business'], NEWS_FETCH_QUERIES=[])
+    def test_failed_newsapi_request_counts_as_a_failed_poll(self):
+        scheduler.sync_schedules()
+        entry = scheduler.claim_due(kinds=[PollSchedule.KIND_CATEGORY])[0]
+        with FakeUpstream(newsapi=FaultProfile(rate_limit_rate=1.0)) as upstream:
+            news_service = NewsAPIService(api_key='test', base_url=upstream.newsapi_url, session=requests.Session(),
+                                          rate_limiter=UnthrottledRateLimiter(), use_cache=False)
+            with mock.patch('aggregator.pipeline.is_backlogged', return_value=False), \
+                    mock.patch.object(tasks, 'LeaseManager', return_value=self.leases), \
+                    mock.patch.object(tasks, 'NewsAPIService', return_value=news_service):
+                result = tasks.fetch_articles_task.apply(
+                    kwargs={'category': 'business', 'schedule_id': entry.pk, 'lease': entry.lease_token},
+                    retries=tasks.fetch_articles_task.max_retries
+                ).get()
+        self.assertIn('error', result)
+        entry.refresh_from_db()
+        self.assertEqual(entry.consecutive_failures, 1)
+        self.assertEqual(entry.lease_token, '')
@@ -12,9 +12,13 @@ urlpatterns = [
     path('dashboard/', views.user_dashboard, name='user_dashboard'),
     path('keywords/', views.manage_keywords, name='manage_keywords'),
     path('keywords/delete/<str:keyword>/', views.delete_keyword, name='delete_keyword'),
+    path('article/<int:article_id>/summary/', views.article_summary, name='article_summary'),
     path('bookmark/add/<int:article_id>/', views.add_bookmark, name='add_bookmark'),
     path('bookmark/remove/<int:article_id>/', views.remove_bookmark, name='remove_bookmark'),
     path('follow/<str:category>/', views.follow_topic, name='follow_topic'),
     path('unfollow/<str:category>/', views.unfollow_topic, name='unfollow_topic'),
+    path('api/metrics/', views.ingest_metrics, name='ingest_metrics'),
+    path('api/ingest/articles/', views.bulk_ingest, name='bulk_ingest'),
+    path('websub/callback/<str:token>/', views.websub_callback, name='websub_callback'),
     path('alert-click/<int:article_id>/<str:keyword>/', views.alert_click, name='alert_click'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,16 +1,39 @@
-from django.shortcuts import render, redirect
+import hmac
+import json
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.db.models import Q, Count
-from django.http import HttpResponseRedirect
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseNotFound,
+    HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+)
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
 from .models import (
     Article, Bookmark, TopicFollow, UserPreference,
-    KeywordAlert, AlertClick
+    KeywordAlert, AlertClick, WebSubSubscription
 )
 from .forms import PreferenceForm
+from .summarization import request_summary
+from .rate_limiter import NewsAPIRateLimiter
+from .http_client import get_circuit_states
+from .leases import NodeRegistry
+from .feeds import XML_ERRORS, parse_feed
+from .websub import verify_signature
+from .bulk_ingest import BulkIngestor, iter_lines
+from .tasks import ingest_pushed_entries_task
+from . import metrics, pipeline, scheduler
 from collections import Counter
 from aggregator.models import Bookmark
+
+logger = logging.getLogger(__name__)
+
 def signup(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
@@ -51,6 +74,138 @@ def home(request):
     })
 
 
+def article_summary(request, article_id):
+    article = get_object_or_404(Article, id=article_id)
+    # Placeholders are summarized on the workers; the page polls until the state is complete
+    summary = request_summary(article)
+    return JsonResponse({
+        'id': article.id,
+        'summary': summary,
+        'state': article.summary_state,
+    })
+
+
+def _websub_verify(request, subscription):
+    """Answer the hub's verification of a subscribe/unsubscribe request, or record a denial."""
+    mode = request.GET.get('hub.mode')
+    if request.GET.get('hub.topic') != subscription.topic_url:
+        return HttpResponseNotFound()
+    if mode == 'denied':
+        subscription.state = 'denied'
+        subscription.save(update_fields=['state'])
+        return HttpResponse('')
+    if mode == 'subscribe':
+        try:
+            lease_seconds = int(request.GET.get('hub.lease_seconds') or 0) or None
+        except ValueError:
+            return HttpResponseBadRequest()
+        if lease_seconds is not None and lease_seconds < 0:
+            return HttpResponseBadRequest()
+        subscription.state = 'verified'
+        subscription.lease_seconds = lease_seconds
+        subscription.lease_expires_at = timezone.now() + timedelta(
+            seconds=lease_seconds or getattr(settings, 'WEBSUB_LEASE_SECONDS', 60 * 60 * 24 * 7))
+        subscription.verified_at = timezone.now()
+    elif mode == 'unsubscribe':
+        subscription.state = 'unsubscribed'
+    else:
+        return HttpResponseBadRequest()
+    subscription.save()
+    return HttpResponse(request.GET.get('hub.challenge', ''), content_type='text/plain')
+
+
+def _websub_deliver(request, subscription):
+    """Queue the entries of a content delivery for ingestion."""
+    # Content for a subscription we never verified, or have given up, is
+    # refused; 410 tells the hub to stop delivering it
+    if subscription.state != 'verified':
+        metrics.incr('websub.unwanted_delivery')
+        return HttpResponse(status=410)
+    body = request.body
+    # Invalid signatures are acknowledged but ignored, as the spec requires
+    if not verify_signature(subscription, body, request.headers.get('X-Hub-Signature')):
+        logger.warning(f"Ignoring WebSub delivery with a bad signature for {subscription.topic_url}")
+        metrics.incr('websub.bad_signature')
+        return HttpResponse(status=202)
+    try:
+        articles = list(parse_feed([body], subscription.feed.name))
+    except XML_ERRORS:
+        return HttpResponseBadRequest()
+
+    subscription.last_delivery_at = timezone.now()
+    subscription.save(update_fields=['last_delivery_at'])
+    metrics.incr('websub.deliveries')
+    metrics.incr('websub.entries', len(articles))
+    if articles:
+        ingest_pushed_entries_task.delay(articles)
+    return HttpResponse(status=202)
+
+
+@csrf_exempt
+def websub_callback(request, token):
+    """
+    WebSub subscriber callback.
+
+    GET requests are the hub verifying a subscribe/unsubscribe request (or
+    reporting a denial); POST requests deliver new feed content, which is
+    queued for ingestion.
+    """
+    subscription = get_object_or_404(WebSubSubscription, token=token)
+
+    if request.method == 'GET':
+        return _websub_verify(request, subscription)
+    if request.method == 'POST':
+        return _websub_deliver(request, subscription)
+    return HttpResponseNotAllowed(['GET', 'POST'])
+
+
+def _ingest_authorized(request):
+    # Bearer tokens only: the view is CSRF-exempt, so a session cookie must not authorize it
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return False
+    return any(hmac.compare_digest(token.strip(), allowed)
+               for allowed in getattr(settings, 'INGEST_API_TOKENS', []))
+
+
+@csrf_exempt
+def bulk_ingest(request):
+    """
+    Bulk article ingest: a POST body of NDJSON article records.
+
+    The body is read and stored in batches as it arrives, and the response
+    streams one NDJSON result per input line followed by a summary line.
+    Pass ?enrich=1 to queue NLP enrichment of the new articles on the
+    enrich queue instead of leaving it to reprocess_articles.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    if not _ingest_authorized(request):
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    ingestor = BulkIngestor(enrich=request.GET.get('enrich') in ('1', 'true'))
+    lines = iter_lines(request, getattr(settings, 'INGEST_API_MAX_LINE_BYTES', 1024 * 1024))
+
+    def stream():
+        for result in ingestor.ingest(lines):
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'summary': ingestor.stats, 'truncated': ingestor.truncated}) + '\n'
+
+    return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+
+
+@staff_member_required
+def ingest_metrics(request):
+    return JsonResponse({
+        'newsapi': NewsAPIRateLimiter().get_metrics(),
+        'metrics': metrics.snapshot(),
+        'circuits': get_circuit_states(),
+        'pipeline': pipeline.stage_depths(),
+        'poll_queue': scheduler.queue_stats(),
+        'ingest_nodes': NodeRegistry().live_nodes(),
+    })
+
+
 @login_required
 def add_bookmark(request, article_id):
     article = Article.objects.get(id=article_id)
@@ -1,12 +1,16 @@
 import json
 import logging
+
+import requests
 from django.conf import settings
 from django.urls import reverse
-from webpush import send_user_notification
+from pywebpush import webpush, WebPushException
 from django.contrib.auth import get_user_model
 from datetime import timedelta
 from django.utils import timezone
 
+from .http_client import get_session, get_upstream_config
+
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
@@ -15,6 +19,66 @@ class WebPushService:
     Service for sending WebPush notifications to users' browsers.
     """
     
+    @staticmethod
+    def push_to_user(user, payload, ttl=0):
+        """
+        Deliver a payload to every browser subscription of a user.
+        
+        Pushes go through the shared 'webpush' session, so connections to push
+        services are pooled and reused. Subscriptions the push service reports
+        as gone (404/410) are deleted; other failures are logged and the
+        remaining subscriptions are still tried.
+        
+        Args:
+            user: User to notify
+            payload (dict): Notification payload
+            ttl (int): Time to live in seconds
+            
+        Returns:
+            int: Number of subscriptions the payload was delivered to
+            
+        Raises:
+            Exception: The last delivery error, if no subscription could be reached
+        """
+        vapid = settings.WEBPUSH_SETTINGS
+        session = get_session('webpush')
+        timeout = get_upstream_config('webpush')['timeout']
+        data = json.dumps(payload)
+        delivered = 0
+        error = None
+        
+        for info in user.webpush_info.select_related('subscription'):
+            subscription = info.subscription
+            try:
+                webpush(
+                    subscription_info={
+                        'endpoint': subscription.endpoint,
+                        'keys': {'p256dh': subscription.p256dh, 'auth': subscription.auth},
+                    },
+                    data=data,
+                    ttl=ttl,
+                    vapid_private_key=vapid['VAPID_PRIVATE_KEY'],
+                    vapid_claims={'sub': f"mailto:{vapid['VAPID_ADMIN_EMAIL']}"},
+                    timeout=timeout,
+                    requests_session=session,
+                )
+                delivered += 1
+            except WebPushException as e:
+                if e.response is not None and e.response.status_code in (404, 410):
+                    subscription.delete()
+                    logger.info(f"Removed expired push subscription for user {user.id}")
+                else:
+                    error = e
+                    logger.warning(f"Push to subscription {subscription.pk} of user {user.id} failed: {str(e)}")
+            except requests.exceptions.RequestException as e:
+                # Includes an open circuit for this push service's host
+                error = e
+                logger.warning(f"Push to subscription {subscription.pk} of user {user.id} failed: {str(e)}")
+        
+        if error is not None and not delivered:
+            raise error
+        return delivered
+    
     @staticmethod
     def send_notification(user_id, title, message, url=None, icon=None, ttl=86400):
         """
@@ -49,11 +113,7 @@ class WebPushService:
             }
             
             # Send the notification
-            send_user_notification(
-                user=user,
-                payload=payload,
-                ttl=ttl
-            )
+            WebPushService.push_to_user(user, payload, ttl=ttl)
             
             logger.info(f"WebPush notification sent to user {user_id}: {title}")
             return True
@@ -0,0 +1,152 @@
+import hashlib
+import hmac
+import logging
+import secrets
+from typing import Iterable, Optional, Tuple
+
+import requests
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .feeds import ATOM, XML_ERRORS, iter_xml_events
+from .http_client import get_session
+from .models import WebSubSubscription
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_ALGORITHMS = {'sha1': hashlib.sha1, 'sha256': hashlib.sha256, 'sha384': hashlib.sha384,
+                        'sha512': hashlib.sha512}
+
+
+def discover_hub(chunks: Iterable[bytes]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Find the hub and self links a feed advertises.
+
+    Reads only the feed header: parsing stops at the first item or entry.
+
+    Args:
+        chunks: Byte chunks of the feed document
+
+    Returns:
+        Tuple of (hub URL, topic URL); either is None if not advertised
+    """
+    hub = topic = None
+    try:
+        for _, element in iter_xml_events(chunks, events=('start',)):
+            if element.tag in ('item', f'{ATOM}entry'):
+                return hub, topic
+            if element.tag == f'{ATOM}link':
+                rel = element.get('rel')
+                if rel == 'hub' and not hub:
+                    hub = element.get('href')
+                elif rel == 'self' and not topic:
+                    topic = element.get('href')
+    except XML_ERRORS as e:
+        logger.warning(f"Could not parse feed while discovering its hub: {str(e)}")
+    return hub, topic
+
+
+def callback_url(subscription: WebSubSubscription) -> str:
+    return f"{settings.SITE_URL.rstrip('/')}{reverse('websub_callback', args=[subscription.token])}"
+
+
+def verify_signature(subscription: WebSubSubscription, body: bytes, header: str) -> bool:
+    """
+    Check the X-Hub-Signature of a content distribution request.
+
+    Args:
+        subscription: Subscription the delivery is for
+        body: Raw request body
+        header: Value of the X-Hub-Signature header, e.g. "sha256=<hex>"
+
+    Returns:
+        True if the signature matches the subscription's secret
+    """
+    algorithm, _, signature = (header or '').partition('=')
+    digest = SIGNATURE_ALGORITHMS.get(algorithm.lower())
+    if not digest or not signature:
+        return False
+    expected = hmac.new(subscription.secret.encode('utf-8'), body, digest).hexdigest()
+    return hmac.compare_digest(expected, signature.strip())
+
+
+class WebSubService:
+    """
+    Service for managing WebSub subscriptions with publisher hubs.
+
+    Subscribing registers a callback with the hub; the hub then verifies it
+    with a GET to the callback and pushes new entries to it with signed POSTs,
+    so those feeds no longer need frequent polling.
+    """
+
+    def __init__(self, session: requests.Session = None):
+        """
+        Initialize the WebSub service.
+
+        Args:
+            session: Session to use instead of the shared feeds session
+        """
+        self.session = session or get_session('feeds')
+        self.lease_seconds = getattr(settings, 'WEBSUB_LEASE_SECONDS', 60 * 60 * 24 * 7)
+
+    def discover(self, feed) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Fetch a feed's header and return the hub and topic it advertises.
+
+        Args:
+            feed: FeedSource instance
+
+        Returns:
+            Tuple of (hub URL, topic URL); the topic falls back to the feed URL
+        """
+        with self.session.get(feed.url, stream=True) as response:
+            response.raise_for_status()
+            hub, topic = discover_hub(response.iter_content(chunk_size=8 * 1024))
+        return hub, topic or feed.url
+
+    def subscribe(self, feed) -> Optional[WebSubSubscription]:
+        """
+        Subscribe to a feed's hub, if it advertises one.
+
+        Args:
+            feed: FeedSource instance
+
+        Returns:
+            The pending subscription, or None if the feed has no hub
+        """
+        hub, topic = self.discover(feed)
+        if not hub:
+            return None
+        subscription, _ = WebSubSubscription.objects.get_or_create(
+            hub_url=hub, topic_url=topic,
+            defaults={'feed': feed, 'token': secrets.token_urlsafe(32), 'secret': secrets.token_hex(32)}
+        )
+        self.request(subscription, 'subscribe')
+        return subscription
+
+    def request(self, subscription: WebSubSubscription, mode: str = 'subscribe'):
+        """
+        Send a subscribe or unsubscribe request to the hub.
+
+        The hub confirms asynchronously through the callback, which moves the
+        subscription to verified (or denied).
+
+        Args:
+            subscription: WebSubSubscription to (re)subscribe or cancel
+            mode: 'subscribe' or 'unsubscribe'
+
+        Raises:
+            requests.exceptions.RequestException: If the hub rejected the request
+        """
+        response = self.session.post(subscription.hub_url, data={
+            'hub.mode': mode,
+            'hub.topic': subscription.topic_url,
+            'hub.callback': callback_url(subscription),
+            'hub.lease_seconds': self.lease_seconds,
+            'hub.secret': subscription.secret,
+        })
+        response.raise_for_status()
+        subscription.requested_at = timezone.now()
+        subscription.save(update_fields=['requested_at'])
+        logger.info(f"Sent WebSub {mode} for {subscription.topic_url} to {subscription.hub_url}")
@@ -1,4 +1,5 @@
 import os
+import socket
 import sys
 from pathlib import Path
 from datetime import timedelta
@@ -149,11 +150,49 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Ingestion stages run on their own queues (see aggregator.pipeline), e.g.
+#   celery -A config worker -Q ingest.fetch,ingest.extract --concurrency=16
+#   celery -A config worker -Q ingest.enrich --concurrency=2
+#   celery -A config worker -Q ingest.persist,ingest.alerts,celery
+CELERY_TASK_ROUTES = {
+    'aggregator.tasks.fetch_articles_task': {'queue': 'ingest.fetch'},
+    'aggregator.tasks.fetch_alert_query_task': {'queue': 'ingest.fetch'},
+    'aggregator.tasks.dispatch_polls_task': {'queue': 'ingest.fetch'},
+    'aggregator.tasks.poll_feeds_task': {'queue': 'ingest.fetch'},
+    'aggregator.tasks.ingest_pushed_entries_task': {'queue': 'ingest.fetch'},
+    'aggregator.tasks.extract_stage_task': {'queue': 'ingest.extract'},
+    'aggregator.tasks.enrich_stage_task': {'queue': 'ingest.enrich'},
+    'aggregator.tasks.upgrade_summaries_task': {'queue': 'ingest.enrich'},
+    'aggregator.tasks.summarize_article_task': {'queue': 'ingest.enrich'},
+    'aggregator.tasks.enrich_articles_task': {'queue': 'ingest.enrich'},
+    'aggregator.tasks.persist_stage_task': {'queue': 'ingest.persist'},
+    'aggregator.tasks.check_keyword_matches_batch': {'queue': 'ingest.alerts'},
+}
+# Distributed ingest (aggregator.leases): each NewsAPI source is fetched under
+# an INGEST_LEASE_SECONDS Redis lease with a fencing token. With
+# INGEST_SHARDING on, ingest nodes split the poll queue between them; each
+# node polls on its own worker queue, and a node missing heartbeats for
+# INGEST_NODE_TTL seconds hands its share to the others
+INGEST_LEASE_SECONDS = int(os.getenv('INGEST_LEASE_SECONDS', '600'))
+INGEST_SHARDING = os.getenv('INGEST_SHARDING', 'False') == 'True'
+INGEST_NODE_TTL = int(os.getenv('INGEST_NODE_TTL', '60'))
+CELERY_WORKER_DIRECT = INGEST_SHARDING
+POLL_DISPATCH_SECONDS = int(os.getenv('POLL_DISPATCH_SECONDS', '15'))
 CELERY_BEAT_SCHEDULE = {
-    'fetch-articles-every-hour': {
-        'task': 'aggregator.tasks.fetch_articles_task',
+    # Ingestion polls are scheduled by the poll queue (aggregator.scheduler);
+    # this only wakes the dispatcher
+    'dispatch-due-polls': {
+        'task': 'aggregator.tasks.dispatch_polls_task',
+        'schedule': timedelta(seconds=POLL_DISPATCH_SECONDS),
+    },
+    'renew-websub-leases-every-hour': {
+        'task': 'aggregator.tasks.renew_websub_leases_task',
         'schedule': timedelta(hours=1),
     },
+    'upgrade-summaries-every-10-minutes': {
+        'task': 'aggregator.tasks.upgrade_summaries_task',
+        'schedule': timedelta(minutes=10),
+    },
     'send-daily-digest': {
         'task': 'aggregator.tasks.send_daily_digest',
         'schedule': timedelta(days=1),
@@ -250,9 +289,188 @@ if os.getenv('SENTRY_DSN'):
 # NLP Settings
 NLP_MODEL_NAME = os.getenv('NLP_MODEL_NAME', 'sentence-transformers/all-mpnet-base-v2')
 SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', '0.75'))
+# Bump when the summarization logic changes so existing summaries are reprocessed
+NLP_SUMMARIZER_VERSION = os.getenv('NLP_SUMMARIZER_VERSION', '1')
+# Optional .npz with trained 'category', 'sentiment' and 'urgency' head matrices
+NLP_HEAD_WEIGHTS_PATH = os.getenv('NLP_HEAD_WEIGHTS_PATH', '')
+# Urgency calibration written by `manage.py calibrate_urgency` from labelled
+# articles; it supplies the breaking-news threshold. Without one, pushes fall
+# back to BREAKING_NEWS_URGENCY_THRESHOLD on the uncalibrated score
+NLP_URGENCY_CALIBRATION_PATH = os.getenv('NLP_URGENCY_CALIBRATION_PATH', '')
+BREAKING_NEWS_URGENCY_THRESHOLD = float(os.getenv('BREAKING_NEWS_URGENCY_THRESHOLD', '0.6'))
+# Share of pushed articles that must be breaking news on the labelled set
+BREAKING_NEWS_MIN_PRECISION = float(os.getenv('BREAKING_NEWS_MIN_PRECISION', '0.9'))
+
+# Summarization scheduling (tiers: 'abstractive', 'extractive', 'lead')
+SUMMARY_ABSTRACTIVE_MODEL = os.getenv('SUMMARY_ABSTRACTIVE_MODEL', 'facebook/bart-large-cnn')
+SUMMARY_MAX_TIER = os.getenv('SUMMARY_MAX_TIER', 'abstractive')
+SUMMARY_TIME_BUDGET_SECONDS = float(os.getenv('SUMMARY_TIME_BUDGET_SECONDS', '120'))
+SUMMARY_PRIORITY_SOURCES = [s for s in os.getenv('SUMMARY_PRIORITY_SOURCES', '').split(',') if s]
+SUMMARY_UPGRADE_BATCH_SIZE = int(os.getenv('SUMMARY_UPGRADE_BATCH_SIZE', '20'))
+SUMMARY_UPGRADE_TIME_BUDGET_SECONDS = float(os.getenv('SUMMARY_UPGRADE_TIME_BUDGET_SECONDS', '240'))
+# Articles whose upgrade fell short this many times are no longer picked
+SUMMARY_UPGRADE_MAX_ATTEMPTS = int(os.getenv('SUMMARY_UPGRADE_MAX_ATTEMPTS', '3'))
+# Upgrades only run while the enrich stage queue holds at most this many messages
+SUMMARY_UPGRADE_IDLE_QUEUE_DEPTH = int(os.getenv('SUMMARY_UPGRADE_IDLE_QUEUE_DEPTH', '0'))
+
+# Lazy summarization: 'eager' summarizes everything at ingest, 'lazy' stores a
+# placeholder and summarizes on first read, except for allowlisted articles
+SUMMARY_MODE = os.getenv('SUMMARY_MODE', 'eager')
+SUMMARY_LAZY_TIER = os.getenv('SUMMARY_LAZY_TIER', '')
+SUMMARY_LAZY_WAIT_SECONDS = float(os.getenv('SUMMARY_LAZY_WAIT_SECONDS', '10'))
+# Reads only queue the computation; a read after this many seconds re-queues it
+SUMMARY_LAZY_QUEUE_SECONDS = int(os.getenv('SUMMARY_LAZY_QUEUE_SECONDS', '60'))
+SUMMARY_EAGER_CATEGORIES = [c for c in os.getenv('SUMMARY_EAGER_CATEGORIES', '').split(',') if c]
+SUMMARY_EAGER_FOLLOWED_CATEGORIES = os.getenv('SUMMARY_EAGER_FOLLOWED_CATEGORIES', 'True') == 'True'
+SUMMARY_EAGER_ALERT_HITS = os.getenv('SUMMARY_EAGER_ALERT_HITS', 'True') == 'True'
 
 # NewsAPI Settings
 NEWS_API_KEY = os.getenv('NEWS_API_KEY')
+# API root; point at a local fake (run_fake_upstream) for offline benchmarks
+NEWS_API_BASE_URL = os.getenv('NEWS_API_BASE_URL', 'https://newsapi.org/v2')
+NEWS_API_MAX_PAGES = int(os.getenv('NEWS_API_MAX_PAGES', '5'))
+NEWS_API_BACKFILL_MAX_PAGES = int(os.getenv('NEWS_API_BACKFILL_MAX_PAGES', '20'))
+# /everything queries fetched on every scheduled run, alongside DEFAULT_CATEGORIES
+NEWS_FETCH_QUERIES = [q for q in os.getenv('NEWS_FETCH_QUERIES', '').split(',') if q]
+# Keyword alert queries (aggregator.query_planner): active alert keywords are
+# packed into /everything OR-queries every ALERT_QUERY_INTERVAL minutes, using
+# at most ALERT_QUERY_BUDGET_SHARE of the remaining daily NewsAPI budget
+ALERT_QUERY_INTERVAL = int(os.getenv('ALERT_QUERY_INTERVAL', '15'))
+ALERT_QUERY_MAX_PER_RUN = int(os.getenv('ALERT_QUERY_MAX_PER_RUN', '10'))
+ALERT_QUERY_BUDGET_SHARE = float(os.getenv('ALERT_QUERY_BUDGET_SHARE', '0.3'))
+ALERT_QUERY_MAX_LENGTH = int(os.getenv('ALERT_QUERY_MAX_LENGTH', '500'))
+ALERT_QUERY_MAX_PAGES = int(os.getenv('ALERT_QUERY_MAX_PAGES', '1'))
+ALERT_QUERY_LOOKBACK_HOURS = int(os.getenv('ALERT_QUERY_LOOKBACK_HOURS', '24'))
+ALERT_HIT_HALF_LIFE_DAYS = float(os.getenv('ALERT_HIT_HALF_LIFE_DAYS', '7'))
+# Incremental fetching: re-check this window before the high-water mark, and
+# remember this many recent URLs per (endpoint, category, query)
+FETCH_STATE_OVERLAP_MINUTES = int(os.getenv('FETCH_STATE_OVERLAP_MINUTES', '30'))
+FETCH_STATE_SEEN_URLS = int(os.getenv('FETCH_STATE_SEEN_URLS', '1000'))
+# Fetched articles not stored within this many seconds are fetched again, up to this many times
+FETCH_STATE_PENDING_SECONDS = int(os.getenv('FETCH_STATE_PENDING_SECONDS', '3600'))
+FETCH_STATE_PENDING_ATTEMPTS = int(os.getenv('FETCH_STATE_PENDING_ATTEMPTS', '3'))
+# Rows per INSERT when articles are persisted with a bulk upsert
+INGEST_BULK_BATCH_SIZE = int(os.getenv('INGEST_BULK_BATCH_SIZE', '500'))
+# NDJSON bulk ingest API (api/ingest/articles/): partners authenticate with
+# one of these bearer tokens; records are stored INGEST_API_BATCH_SIZE at a time
+INGEST_API_TOKENS = [token for token in os.getenv('INGEST_API_TOKENS', '').split(',') if token]
+INGEST_API_BATCH_SIZE = int(os.getenv('INGEST_API_BATCH_SIZE', '500'))
+INGEST_API_MAX_RECORDS = int(os.getenv('INGEST_API_MAX_RECORDS', '100000'))
+INGEST_API_MAX_LINE_BYTES = int(os.getenv('INGEST_API_MAX_LINE_BYTES', str(1024 * 1024)))
+# Staged pipeline: articles per batch handed between stages, seconds a batch
+# waits in Redis, and queue depths above which the stage feeding a queue backs
+# off for INGEST_BACKPRESSURE_DELAY seconds
+INGEST_STAGE_BATCH_SIZE = int(os.getenv('INGEST_STAGE_BATCH_SIZE', '50'))
+INGEST_STAGING_TTL = int(os.getenv('INGEST_STAGING_TTL', str(60 * 60 * 6)))
+INGEST_STAGE_MAX_DEPTH = {
+    'extract': int(os.getenv('INGEST_MAX_DEPTH_EXTRACT', '50')),
+    'enrich': int(os.getenv('INGEST_MAX_DEPTH_ENRICH', '20')),
+    'persist': int(os.getenv('INGEST_MAX_DEPTH_PERSIST', '50')),
+    'alerts': int(os.getenv('INGEST_MAX_DEPTH_ALERTS', '200')),
+}
+INGEST_BACKPRESSURE_DELAY = int(os.getenv('INGEST_BACKPRESSURE_DELAY', '30'))
+# Download publisher pages and extract full text before enrichment
+INGEST_EXTRACT_FULL_TEXT = os.getenv('INGEST_EXTRACT_FULL_TEXT', 'True') == 'True'
+# Raw HTML of downloaded pages, zstd-compressed in append-only segments, so
+# `reprocess_articles --reextract` can re-run extraction without downloading.
+# Each node appends to its own HTML_ARCHIVE_NODE subdirectory; pages written
+# by other nodes are only readable where HTML_ARCHIVE_DIR is shared storage
+HTML_ARCHIVE_ENABLED = os.getenv('HTML_ARCHIVE_ENABLED', 'True') == 'True'
+HTML_ARCHIVE_DIR = os.getenv('HTML_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+HTML_ARCHIVE_SEGMENT_BYTES = int(os.getenv('HTML_ARCHIVE_SEGMENT_BYTES', str(64 * 1024 * 1024)))
+HTML_ARCHIVE_MAX_BYTES = int(os.getenv('HTML_ARCHIVE_MAX_BYTES', str(20 * 1024 ** 3)))
+HTML_ARCHIVE_NODE = os.getenv('HTML_ARCHIVE_NODE', socket.gethostname())
+HTML_ARCHIVE_LEVEL = int(os.getenv('HTML_ARCHIVE_LEVEL', '10'))
+# Redis Bloom filter of seen article URLs, one bitmap per day, consulted
+# before any download or database lookup (rebuild with rebuild_seen_filter)
+SEEN_FILTER_ENABLED = os.getenv('SEEN_FILTER_ENABLED', 'True') == 'True'
+SEEN_FILTER_CAPACITY = int(os.getenv('SEEN_FILTER_CAPACITY', '50000'))
+SEEN_FILTER_ERROR_RATE = float(os.getenv('SEEN_FILTER_ERROR_RATE', '0.001'))
+SEEN_FILTER_DAYS = int(os.getenv('SEEN_FILTER_DAYS', '30'))
+
+# RSS/Atom feeds (FeedSource): feeds are polled when due; each feed's interval
+# adapts between these bounds to how often it publishes
+FEED_POLL_WORKERS = int(os.getenv('FEED_POLL_WORKERS', '32'))
+FEED_POLL_BATCH = int(os.getenv('FEED_POLL_BATCH', '500'))
+FEED_MAX_ENTRIES = int(os.getenv('FEED_MAX_ENTRIES', '200'))
+FEED_MIN_INTERVAL = int(os.getenv('FEED_MIN_INTERVAL', '60'))
+FEED_MAX_INTERVAL = int(os.getenv('FEED_MAX_INTERVAL', str(60 * 60 * 6)))
+# Adaptive polling (aggregator.scheduler): categories, queries and feeds are
+# polled when due; each interval moves within its kind's (min, max) seconds so
+# a poll finds about POLL_TARGET_NEW_ITEMS new items, as learned by an EWMA.
+# Dispatched polls hold a POLL_LEASE_SECONDS lease on their queue entry,
+# renewed while a poll waits out a retry or a backpressure delay
+POLL_INTERVAL_BOUNDS = {
+    'category': (int(os.getenv('POLL_CATEGORY_MIN_INTERVAL', '120')),
+                 int(os.getenv('POLL_CATEGORY_MAX_INTERVAL', str(60 * 60 * 3)))),
+    'query': (int(os.getenv('POLL_QUERY_MIN_INTERVAL', '300')),
+              int(os.getenv('POLL_QUERY_MAX_INTERVAL', str(60 * 60 * 6)))),
+    'feed': (FEED_MIN_INTERVAL, FEED_MAX_INTERVAL),
+}
+POLL_TARGET_NEW_ITEMS = float(os.getenv('POLL_TARGET_NEW_ITEMS', '5'))
+POLL_EWMA_ALPHA = float(os.getenv('POLL_EWMA_ALPHA', '0.3'))
+POLL_LEASE_SECONDS = int(os.getenv('POLL_LEASE_SECONDS', '900'))
+POLL_DISPATCH_BATCH = int(os.getenv('POLL_DISPATCH_BATCH', '1000'))
+# WebSub push: feeds that advertise a hub deliver new entries to the callback
+# under SITE_URL and are only polled every FEED_MAX_INTERVAL as a safety net
+SITE_URL = os.getenv('SITE_URL', 'http://localhost:8000')
+WEBSUB_LEASE_SECONDS = int(os.getenv('WEBSUB_LEASE_SECONDS', str(60 * 60 * 24 * 7)))
+WEBSUB_RENEW_BEFORE_SECONDS = int(os.getenv('WEBSUB_RENEW_BEFORE_SECONDS', str(60 * 60 * 24)))
+# Cluster-wide NewsAPI rate limiting (shared through Redis by every process).
+# Lower priority classes may only use their share of the daily budget.
+NEWS_API_DAILY_BUDGET = int(os.getenv('NEWS_API_DAILY_BUDGET', '100'))
+NEWS_API_REQUESTS_PER_SECOND = float(os.getenv('NEWS_API_REQUESTS_PER_SECOND', '1'))
+NEWS_API_BURST = int(os.getenv('NEWS_API_BURST', '5'))
+NEWS_API_PRIORITY_SHARES = {
+    'breaking': float(os.getenv('NEWS_API_SHARE_BREAKING', '1.0')),
+    'default': float(os.getenv('NEWS_API_SHARE_DEFAULT', '0.85')),
+    'backfill': float(os.getenv('NEWS_API_SHARE_BACKFILL', '0.5')),
+}
+NEWS_API_RATE_LIMIT_TIMEOUT = float(os.getenv('NEWS_API_RATE_LIMIT_TIMEOUT', '30'))
+# Request handlers skip a NewsAPI call rather than wait longer than this for the limiter
+NEWS_API_RATE_LIMIT_REQUEST_TIMEOUT = float(os.getenv('NEWS_API_RATE_LIMIT_REQUEST_TIMEOUT', '0'))
+NEWS_API_DEFAULT_RETRY_AFTER = int(os.getenv('NEWS_API_DEFAULT_RETRY_AFTER', '60'))
+# NewsAPI response cache: seconds each endpoint is served without revalidation
+NEWS_API_CACHE_ENABLED = os.getenv('NEWS_API_CACHE_ENABLED', 'True') == 'True'
+NEWS_API_CACHE_TTLS = {
+    'sources': int(os.getenv('NEWS_API_CACHE_TTL_SOURCES', str(60 * 60 * 24))),
+    'top-headlines': int(os.getenv('NEWS_API_CACHE_TTL_HEADLINES', '300')),
+    'everything': int(os.getenv('NEWS_API_CACHE_TTL_EVERYTHING', '120')),
+}
+HTTP_CACHE_RETENTION_SECONDS = int(os.getenv('HTTP_CACHE_RETENTION_SECONDS', str(60 * 60 * 24)))
+HTTP_CACHE_LOCK_TIMEOUT = float(os.getenv('HTTP_CACHE_LOCK_TIMEOUT', '10'))
+
+# Article page downloads
+ARTICLE_DOWNLOAD_WORKERS = int(os.getenv('ARTICLE_DOWNLOAD_WORKERS', '16'))
+ARTICLE_DOWNLOAD_PER_HOST = int(os.getenv('ARTICLE_DOWNLOAD_PER_HOST', '4'))
+ARTICLE_DOWNLOAD_TIMEOUT = float(os.getenv('ARTICLE_DOWNLOAD_TIMEOUT', '10'))
+ARTICLE_DOWNLOAD_RETRIES = int(os.getenv('ARTICLE_DOWNLOAD_RETRIES', '2'))
+ARTICLE_DOWNLOAD_BACKOFF = float(os.getenv('ARTICLE_DOWNLOAD_BACKOFF', '0.5'))
+
+# Shared HTTP client (aggregator.http_client): per-upstream pool, retry and timeout
+# overrides on top of the defaults in http_client.DEFAULT_UPSTREAMS
+HTTP_CLIENT_UPSTREAMS = {
+    'newsapi': {
+        'timeout': float(os.getenv('NEWS_API_TIMEOUT', '10')),
+    },
+    'publishers': {
+        'pool_maxsize': ARTICLE_DOWNLOAD_PER_HOST,
+        'timeout': ARTICLE_DOWNLOAD_TIMEOUT,
+    },
+    'webpush': {
+        'timeout': float(os.getenv('WEBPUSH_TIMEOUT', '10')),
+    },
+}
+HTTP_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('HTTP_CIRCUIT_FAILURE_THRESHOLD', '5'))
+HTTP_CIRCUIT_RESET_SECONDS = float(os.getenv('HTTP_CIRCUIT_RESET_SECONDS', '30'))
+
+# Article extraction pool of the fetch_articles command and replays (EXTRACTION_WORKERS
+# defaults to the number of cores); the extract stage task parses in its own process
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', '0')) or None
+EXTRACTION_CHUNK_SIZE = int(os.getenv('EXTRACTION_CHUNK_SIZE', '4'))
+EXTRACTION_TIMEOUT = float(os.getenv('EXTRACTION_TIMEOUT', '20'))
+# Workers are spawned so they inherit neither the loaded NLP model nor DB sockets
+EXTRACTION_START_METHOD = os.getenv('EXTRACTION_START_METHOD', 'spawn')
 
 # Email Digest Settings
 DIGEST_EMAIL_HOUR = int(os.getenv('DIGEST_EMAIL_HOUR', '8'))